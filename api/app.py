@@ -1,56 +1,115 @@
 from __future__ import annotations
 
-from datetime import date, timedelta
+from types import MappingProxyType
 
-from flask import Flask, Response, jsonify, render_template, request
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 
 try:
     from api.data import FORMAT_RULES, PITCH_TYPES, TEAM_DATA, TOP_ODI_TEAMS, VENUES, WEATHER_TYPES
     from api.engine import (
+        SessionNotFound,
         backtest_report,
+        backtest_stream,
+        chase_surface_stats,
+        close_session,
+        compare_matrix,
+        compare_matrix_cache_stats,
         compare_teams,
+        create_session,
         dls_target,
         explain_score,
         format_key,
         gemini_live_brief,
+        generate_fixtures,
         ingest_live_state,
         live_analytics_pack,
         live_demo_matches,
         recent_match_scenarios,
         live_provider_profiles,
         model_card,
+        optimize_batting_order,
+        optimize_batting_order_batch,
+        optimize_xi,
+        plan_bowling_overs,
+        player_name_cache_stats,
+        predict_grid,
         predict_score,
+        predict_score_batch,
         reproducibility_pdf,
         run_trajectory,
+        run_trajectory_batch,
+        session_snapshot,
+        session_update,
+        simulate_score,
+        simulate_tournament,
+        team_alias_cache_stats,
         uncertainty_fan,
         viva_report_pdf,
         win_probability,
+        venue_resolver_cache_stats,
+        xi_profile_cache_stats,
     )
 except ModuleNotFoundError:
     from data import FORMAT_RULES, PITCH_TYPES, TEAM_DATA, TOP_ODI_TEAMS, VENUES, WEATHER_TYPES
     from engine import (
+        SessionNotFound,
         backtest_report,
+        backtest_stream,
+        chase_surface_stats,
+        close_session,
+        compare_matrix,
+        compare_matrix_cache_stats,
         compare_teams,
+        create_session,
         dls_target,
         explain_score,
         format_key,
         gemini_live_brief,
+        generate_fixtures,
         ingest_live_state,
         live_analytics_pack,
         live_demo_matches,
         recent_match_scenarios,
         live_provider_profiles,
         model_card,
+        optimize_batting_order,
+        optimize_batting_order_batch,
+        optimize_xi,
+        plan_bowling_overs,
+        player_name_cache_stats,
+        predict_grid,
         predict_score,
+        predict_score_batch,
         reproducibility_pdf,
         run_trajectory,
+        run_trajectory_batch,
+        session_snapshot,
+        session_update,
+        simulate_score,
+        simulate_tournament,
+        team_alias_cache_stats,
         uncertainty_fan,
         viva_report_pdf,
         win_probability,
+        venue_resolver_cache_stats,
+        xi_profile_cache_stats,
     )
 
+
+class EngineJSONProvider(DefaultJSONProvider):
+    """Serializes the read-only mappings the engine returns from its cached XI profiles."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, MappingProxyType):
+            return dict(o)
+        return DefaultJSONProvider.default(o)
+
+
 app = Flask(__name__)
+app.json = EngineJSONProvider(app)
 CORS(app)
 
 
@@ -64,6 +123,20 @@ def status():
     return jsonify({"status": "ok", "service": "cricket-predictor", "formats": list(FORMAT_RULES.keys())})
 
 
+@app.route("/api/cache_stats", methods=["GET"])
+def cache_stats():
+    return jsonify(
+        {
+            "xi_profiles": xi_profile_cache_stats(),
+            "venue_resolver": venue_resolver_cache_stats(),
+            "chase_surfaces": chase_surface_stats(),
+            "compare_matrix": compare_matrix_cache_stats(),
+            "player_names": player_name_cache_stats(),
+            "team_aliases": team_alias_cache_stats(),
+        }
+    )
+
+
 @app.route("/api/meta", methods=["GET"])
 def meta():
     fmt = format_key(request.args.get("format"))
@@ -115,21 +188,28 @@ def squad():
     if len(players) != 15:
         return jsonify({"error": "Squad data misconfigured, expected 15 players"}), 500
 
-    return jsonify(
-        {
-            "team": team,
-            "flag": TEAM_DATA[team]["flag"],
-            "flag_img": TEAM_DATA[team].get("flag_img"),
-            "format": fmt,
-            "players": players,
-        }
-    )
+    body = {
+        "team": team,
+        "flag": TEAM_DATA[team]["flag"],
+        "flag_img": TEAM_DATA[team].get("flag_img"),
+        "format": fmt,
+        "players": players,
+    }
+    if request.args.get("optimize") in {"1", "true"}:
+        best = optimize_xi({"team": team, "format": fmt, "top_k": 1})["xis"][0]
+        body["suggested_xi"] = best["players"]
+    return jsonify(body)
 
 
 @app.route("/api/predict_score", methods=["POST"])
 def api_predict_score():
     try:
         payload = request.get_json(force=True)
+        if not isinstance(payload, dict):
+            raise ValueError("Request body must be a JSON object")
+        mode = request.args.get("mode") or payload.get("mode")
+        if mode == "simulate":
+            return jsonify(simulate_score(payload))
         return jsonify(predict_score(payload))
     except ValueError as exc:
         return jsonify({"error": str(exc)}), 400
@@ -137,6 +217,72 @@ def api_predict_score():
         return jsonify({"error": "Unable to process score prediction"}), 500
 
 
+@app.route("/api/predict_score_batch", methods=["POST"])
+def api_predict_score_batch():
+    try:
+        payload = request.get_json(force=True)
+        return jsonify(predict_score_batch(payload))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception:
+        return jsonify({"error": "Unable to process batch score prediction"}), 500
+
+
+@app.route("/api/predict_grid", methods=["POST"])
+def api_predict_grid():
+    try:
+        payload = request.get_json(force=True)
+        return jsonify(predict_grid(payload))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception:
+        return jsonify({"error": "Unable to process grid prediction"}), 500
+
+
+@app.route("/api/session", methods=["POST"])
+def api_create_session():
+    try:
+        payload = request.get_json(force=True)
+        return jsonify(create_session(payload))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception:
+        return jsonify({"error": "Unable to start match session"}), 500
+
+
+@app.route("/api/session/<session_id>", methods=["GET"])
+def api_session_snapshot(session_id: str):
+    try:
+        return jsonify(session_snapshot(session_id, request.args.get("include")))
+    except SessionNotFound as exc:
+        return jsonify({"error": str(exc)}), 404
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception:
+        return jsonify({"error": "Unable to read match session"}), 500
+
+
+@app.route("/api/session/<session_id>/ball", methods=["POST"])
+def api_session_ball(session_id: str):
+    try:
+        payload = request.get_json(force=True)
+        return jsonify(session_update(session_id, payload))
+    except SessionNotFound as exc:
+        return jsonify({"error": str(exc)}), 404
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception:
+        return jsonify({"error": "Unable to update match session"}), 500
+
+
+@app.route("/api/session/<session_id>", methods=["DELETE"])
+def api_close_session(session_id: str):
+    try:
+        return jsonify(close_session(session_id))
+    except SessionNotFound as exc:
+        return jsonify({"error": str(exc)}), 404
+
+
 @app.route("/api/explain_score", methods=["POST"])
 def api_explain_score():
     try:
@@ -172,33 +318,18 @@ def api_live_providers():
 @app.route("/api/fixtures", methods=["GET"])
 def api_fixtures():
     fmt = format_key(request.args.get("format"))
-    teams = [t["name"] for t in TOP_ODI_TEAMS]
-    start = date.today()
-    fixtures = []
-    day_jump = 2 if fmt == "t20" else 4
-    idx = 0
-    for i, team1 in enumerate(teams):
-        for team2 in teams[i + 1 :]:
-            d = start + timedelta(days=idx * day_jump)
-            status = "upcoming"
-            if d == start:
-                status = "live"
-            elif d < start:
-                status = "recent"
-            fixtures.append(
-                {
-                    "date": d.isoformat(),
-                    "format": fmt,
-                    "team1": team1,
-                    "team2": team2,
-                    "title": f"{team1} vs {team2}",
-                    "home": team1,
-                    "away": team2,
-                    "status": status,
-                }
-            )
-            idx += 1
-    return jsonify({"fixtures": fixtures[:24]})
+    return jsonify({"fixtures": generate_fixtures(fmt)[:24]})
+
+
+@app.route("/api/tournament", methods=["POST"])
+def api_tournament():
+    try:
+        payload = request.get_json(force=True)
+        return jsonify(simulate_tournament(payload))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception:
+        return jsonify({"error": "Unable to simulate tournament"}), 500
 
 
 @app.route("/api/model_card", methods=["GET"])
@@ -274,6 +405,9 @@ def api_compare():
             xi2=payload.get("xi2", []),
             venue=payload.get("venue"),
             weather=payload.get("weather"),
+            simulate=str(request.args.get("simulate", payload.get("simulate", ""))).lower() in {"1", "true", "yes"},
+            simulations=int(payload.get("simulations", 5000)),
+            seed=int(payload.get("seed", 42)),
         )
         return jsonify(result)
     except ValueError as exc:
@@ -282,6 +416,61 @@ def api_compare():
         return jsonify({"error": "Unable to compare teams"}), 500
 
 
+@app.route("/api/compare_matrix", methods=["POST"])
+def api_compare_matrix():
+    try:
+        payload = request.get_json(force=True)
+        return jsonify(compare_matrix(payload))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception:
+        return jsonify({"error": "Unable to build comparison matrix"}), 500
+
+
+@app.route("/api/optimize_xi", methods=["POST"])
+def api_optimize_xi():
+    try:
+        payload = request.get_json(force=True)
+        return jsonify(optimize_xi(payload))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception:
+        return jsonify({"error": "Unable to optimize playing XI"}), 500
+
+
+@app.route("/api/batting_order", methods=["POST"])
+def api_batting_order():
+    try:
+        payload = request.get_json(force=True)
+        return jsonify(optimize_batting_order(payload))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception:
+        return jsonify({"error": "Unable to optimize batting order"}), 500
+
+
+@app.route("/api/batting_order_batch", methods=["POST"])
+def api_batting_order_batch():
+    try:
+        payload = request.get_json(force=True)
+        return jsonify(optimize_batting_order_batch(payload))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception:
+        return jsonify({"error": "Unable to optimize batting orders"}), 500
+
+
+@app.route("/api/bowling_plan", methods=["POST"])
+def api_bowling_plan():
+    try:
+        payload = request.get_json(force=True)
+        return jsonify(plan_bowling_overs(payload))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception:
+        return jsonify({"error": "Unable to plan bowling overs"}), 500
+
+
 @app.route("/api/uncertainty", methods=["POST"])
 def api_uncertainty():
     try:
@@ -304,6 +493,17 @@ def api_backtest():
         return jsonify({"error": "Unable to run backtest"}), 500
 
 
+@app.route("/api/backtest/stream", methods=["POST"])
+def api_backtest_stream():
+    try:
+        payload = request.get_json(force=True)
+        return Response(stream_with_context(backtest_stream(payload)), mimetype="application/x-ndjson")
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception:
+        return jsonify({"error": "Unable to run backtest"}), 500
+
+
 @app.route("/api/repro_pdf", methods=["POST"])
 def api_repro_pdf():
     try:
@@ -343,5 +543,16 @@ def api_trajectory():
         return jsonify({"error": "Unable to generate run trajectory"}), 500
 
 
+@app.route("/api/trajectory_batch", methods=["POST"])
+def api_trajectory_batch():
+    try:
+        payload = request.get_json(force=True)
+        return jsonify(run_trajectory_batch(payload))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception:
+        return jsonify({"error": "Unable to generate run trajectories"}), 500
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,432 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import time
+from itertools import combinations
+from typing import Any, Callable
+
+import numpy as np
+
+try:
+    from api import engine
+    from api.data import FORMAT_RULES, PITCH_TYPES, TEAM_DATA, VENUES, WEATHER_TYPES
+    from api.engine import DLS_20, TEAM_ALIASES, DLS_50, _interpolate, dls_resource_grid_lookup, dls_resource_remaining, get_team_players, optimize_xi, predict_grid, predict_score, predict_score_batch, run_trajectory, run_trajectory_batch, simulate_score, team_breakdown, xi_validator
+except ModuleNotFoundError:
+    import engine
+    from data import FORMAT_RULES, PITCH_TYPES, TEAM_DATA, VENUES, WEATHER_TYPES
+    from engine import DLS_20, TEAM_ALIASES, DLS_50, _interpolate, dls_resource_grid_lookup, dls_resource_remaining, get_team_players, optimize_xi, predict_grid, predict_score, predict_score_batch, run_trajectory, run_trajectory_batch, simulate_score, team_breakdown, xi_validator
+
+
+def _timed(fn: Callable[[], Any], repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench_dls(states: int = 200_000, seed: int = 7) -> dict[str, Any]:
+    """Grid lookup vs the table interpolation it replaces, plus knot and per-ball equality checks."""
+    report: dict[str, Any] = {}
+    rng = np.random.default_rng(seed)
+    for fmt, table in (("t20", DLS_20), ("odi", DLS_50)):
+        max_balls = FORMAT_RULES[fmt]["max_overs"] * 6
+        knots_equal = all(
+            dls_resource_remaining(fmt, float(k), w) == table[w][k] for w in range(10) for k in table[w]
+        )
+        balls_equal = all(
+            dls_resource_remaining(fmt, b / 6.0, w) == _interpolate(table[w], b / 6.0)
+            for w in range(10)
+            for b in range(max_balls + 1)
+        )
+        balls = rng.integers(0, max_balls + 1, size=states)
+        wickets = rng.integers(0, 10, size=states)
+        overs = (balls / 6.0).tolist()
+        wkts = wickets.tolist()
+        pairs = list(zip(overs, wkts))
+
+        reference = _timed(lambda: [_interpolate(table[w], o) for o, w in pairs], repeat=3)
+        scalar = _timed(lambda: [dls_resource_remaining(fmt, o, w) for o, w in pairs], repeat=3)
+        vector = _timed(lambda: dls_resource_grid_lookup(fmt, balls, wickets))
+        vector_equal = dls_resource_grid_lookup(fmt, balls, wickets).tolist() == [
+            _interpolate(table[w], o) for o, w in pairs
+        ]
+        report[fmt] = {
+            "states": states,
+            "knots_equal": knots_equal,
+            "every_ball_equal": balls_equal,
+            "vector_equal": vector_equal,
+            "interpolate_ns_per_lookup": round(reference / states * 1e9, 1),
+            "grid_ns_per_lookup": round(scalar / states * 1e9, 1),
+            "vector_ns_per_lookup": round(vector / states * 1e9, 2),
+            "scalar_speedup": round(reference / scalar, 2),
+            "vector_speedup": round(reference / vector, 1),
+        }
+    return report
+
+
+def bench_grid(states: int = 600, seed: int = 7) -> dict[str, Any]:
+    """20 x 10 x 120 T20 predict_grid vs scalar predict_score on a random sample of the same states."""
+    context = {"format": "t20", "batting_team": "India", "bowling_team": "Australia", "venue": "Eden Gardens"}
+    payload = {
+        **context,
+        "score_axis": {"start": 10, "stop": 200, "step": 10},
+        "wickets_axis": {"start": 0, "stop": 9},
+        "balls_axis": {"start": 1, "stop": 120},
+    }
+    grid = predict_grid(payload)
+    vector = _timed(lambda: predict_grid(payload))
+    rng = np.random.default_rng(seed)
+    picks = [tuple(int(rng.integers(0, n)) for n in grid["shape"]) for _ in range(states)]
+    axes = grid["axes"]
+    sample = [
+        ({**context, "score": axes["score"][i], "wickets": axes["wickets"][j], "overs": axes["overs"][k]}, (i, j, k))
+        for i, j, k in picks
+    ]
+    scalar = _timed(lambda: [predict_score(p) for p, _ in sample], repeat=3)
+    matches = all(
+        (r["low"], r["avg"], r["high"]) == tuple(grid[key][i][j][k] for key in ("low", "avg", "high"))
+        for r, (i, j, k) in ((predict_score(p), idx) for p, idx in sample)
+    )
+    per_state = scalar / states
+    return {
+        "shape": grid["shape"],
+        "states": grid["states"],
+        "grid_ms": round(vector * 1000.0, 2),
+        "grid_us_per_state": round(vector / grid["states"] * 1e6, 3),
+        "scalar_us_per_state": round(per_state * 1e6, 1),
+        "scalar_sample": states,
+        "speedup": round(per_state * grid["states"] / vector, 1),
+        "matches_scalar": matches,
+    }
+
+
+def bench_batch(states: int = 2000, seed: int = 7) -> dict[str, Any]:
+    """predict_score_batch vs one predict_score call per state, from shared fixtures to all-distinct contexts."""
+    rng = np.random.default_rng(seed)
+    teams = list(TEAM_DATA)
+    venues = [v["name"] for v in VENUES]
+
+    def setup() -> dict[str, Any]:
+        batting, bowling = rng.choice(len(teams), size=2, replace=False)
+        return {"batting_team": teams[batting], "bowling_team": teams[bowling], "venue": venues[int(rng.integers(len(venues)))]}
+
+    def conditions(fixture: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "pitch": PITCH_TYPES[int(rng.integers(len(PITCH_TYPES)))]["type"],
+            "weather": WEATHER_TYPES[int(rng.integers(len(WEATHER_TYPES)))]["label"],
+            "toss_winner": fixture[("batting_team", "bowling_team")[int(rng.integers(2))]],
+            "toss_decision": ("bat", "bowl")[int(rng.integers(2))],
+        }
+
+    def live(fmt: str) -> dict[str, Any]:
+        balls = int(rng.integers(1, FORMAT_RULES[fmt]["max_overs"] * 6))
+        return {"format": fmt, "score": int(balls * rng.uniform(0.8, 1.5)), "wickets": int(rng.integers(0, 10)), "overs": float(f"{balls // 6}.{balls % 6}")}
+
+    fixtures = [setup() for _ in range(40)]
+    scenarios: dict[str, list[dict[str, Any]]] = {"shared_fixtures": [], "shared_teams_and_venue": [], "all_distinct": []}
+    for i in range(states):
+        fmt = "t20" if i % 2 else "odi"
+        fixture = fixtures[i % len(fixtures)]
+        scenarios["shared_fixtures"].append({**fixture, **live(fmt)})
+        scenarios["shared_teams_and_venue"].append({**fixture, **conditions(fixture), **live(fmt)})
+        distinct = setup()
+        scenarios["all_distinct"].append({**distinct, **conditions(distinct), **live(fmt)})
+
+    report: dict[str, Any] = {"states": states}
+    for name, payloads in scenarios.items():
+        batch = _timed(lambda: predict_score_batch({"states": payloads}), repeat=3)
+        scalar = _timed(lambda: [predict_score(p) for p in payloads], repeat=3)
+        report[name] = {
+            "batch_ms": round(batch * 1000.0, 1),
+            "scalar_ms": round(scalar * 1000.0, 1),
+            "speedup": round(scalar / batch, 1),
+            "matches_scalar": predict_score_batch({"states": payloads})["results"] == [predict_score(p) for p in payloads],
+        }
+    return report
+
+
+def bench_trajectory(states: int = 5000, seed: int = 7) -> dict[str, Any]:
+    """run_trajectory_batch vs one run_trajectory call per state, half of them chases."""
+    rng = np.random.default_rng(seed)
+    payloads = []
+    for i in range(states):
+        fmt = "t20" if i % 2 else "odi"
+        max_balls = FORMAT_RULES[fmt]["max_overs"] * 6
+        balls = int(rng.integers(1, max_balls))
+        state = {"format": fmt, "score": int(rng.integers(0, balls * 2)), "wickets": int(rng.integers(0, 10)), "overs": float(f"{balls // 6}.{balls % 6}")}
+        if i % 4 < 2:
+            state["target"] = int(rng.integers(120, 360))
+        payloads.append(state)
+    batch = _timed(lambda: run_trajectory_batch({"states": payloads}), repeat=3)
+    scalar = _timed(lambda: [run_trajectory(p) for p in payloads], repeat=1)
+    results = run_trajectory_batch({"states": payloads})["results"]
+    matches = all(r == s for r, s in zip(results, (run_trajectory(p) for p in payloads)))
+    return {
+        "states": states,
+        "batch_ms": round(batch * 1000.0, 1),
+        "scalar_ms": round(scalar * 1000.0, 1),
+        "speedup": round(scalar / batch, 1),
+        "matches_scalar": matches,
+    }
+
+
+def bench_xi(states: int = 0) -> dict[str, Any]:
+    """optimize_xi for every squad vs a scalar team_breakdown / xi_validator pass over all 1365 XIs."""
+    squads = [(team, fmt) for fmt in ("t20", "odi") for team in TEAM_DATA]
+    vector = _timed(lambda: [optimize_xi({"team": t, "format": f, "top_k": 1}) for t, f in squads])
+
+    def scalar_best(team: str, fmt: str) -> tuple[int, float]:
+        squad = get_team_players(team, fmt)
+        best = (99, 0.0)
+        for combo in combinations(range(len(squad)), 11):
+            xi = [squad[i] for i in combo]
+            if len({p["name"] for p in xi}) < 11:
+                continue
+            breakdown = team_breakdown(xi, fmt)
+            unmet = len(xi_validator(xi, fmt)["warnings"]) + (breakdown["roles"]["WK-Batter"] < 1)
+            best = min(best, (unmet, -breakdown["overall"]))
+        return best
+
+    started = time.perf_counter()
+    expected = [scalar_best(t, f) for t, f in squads]
+    scalar = time.perf_counter() - started
+    results = [optimize_xi({"team": t, "format": f, "top_k": 1})["xis"][0] for t, f in squads]
+    return {
+        "squads": len(squads),
+        "optimizer_ms_per_squad": round(vector * 1000.0 / len(squads), 2),
+        "scalar_ms_per_squad": round(scalar * 1000.0 / len(squads), 1),
+        "speedup": round(scalar / vector, 1),
+        "matches_scalar": all((len(r["unmet"]), -r["breakdown"]["overall"]) == e for r, e in zip(results, expected)),
+    }
+
+
+def _legacy_canonical_team(name: Any) -> str:
+    """The per-call regex resolver that _canonical_team replaced, kept as the reference."""
+    raw_name = str(name or "").strip()
+    if not raw_name:
+        return raw_name
+    key = raw_name.lower()
+    if key in TEAM_ALIASES:
+        return TEAM_ALIASES[key]
+    norm = re.sub(r"\s+", " ", re.sub(r"[^a-z ]+", " ", key)).strip()
+    stop_words = {"cricket", "score", "scorecard", "live", "match", "result", "commentary", "full", "card"}
+    norm = " ".join(t for t in norm.split() if t not in stop_words)
+    if norm in TEAM_ALIASES:
+        return TEAM_ALIASES[norm]
+    for pattern, team in (
+        (r"\bsa\b", "South Africa"),
+        (r"\bnz\b", "New Zealand"),
+        (r"\bwi\b|\bwindies\b", "West Indies"),
+        (r"\beng\b", "England"),
+        (r"\bind\b", "India"),
+        (r"\bpak\b", "Pakistan"),
+        (r"\bban\b", "Bangladesh"),
+        (r"\bafg\b", "Afghanistan"),
+        (r"\baus\b", "Australia"),
+        (r"\bsl\b", "Sri Lanka"),
+    ):
+        if re.search(pattern, norm):
+            return team
+    for team in TEAM_DATA:
+        tl = team.lower()
+        if tl in norm or norm in tl:
+            return team
+    return raw_name
+
+
+def _synthetic_page(rng: np.random.Generator, teams: list[str], spellings: dict[str, list[str]]) -> tuple[str, str, str]:
+    """Commentary text plus the escaped scorecard JSON a Cricbuzz match page embeds."""
+    t1, t2 = (teams[i] for i in rng.choice(len(teams), size=2, replace=False))
+
+    def spell(team: str) -> str:
+        options = spellings[team]
+        return options[int(rng.integers(0, len(options)))]
+
+    lines = [f"{spell(t1)} vs {spell(t2)}, {int(rng.integers(1, 6))}th T20I - Live Cricket Score, Commentary"]
+    score = wickets = 0
+    for over in range(1, 21):
+        score += int(rng.integers(2, 15))
+        wickets = min(9, wickets + int(rng.random() < 0.25))
+        filler = ("after the drinks break", "Match delayed by rain", "Toss won by", "Live Score Card")[over % 4]
+        lines.append(f"{filler} {spell(t1)} {score}/{wickets} ({over} ov) need quick runs")
+    json_blob = []
+    for innings_id, (bat, bowl) in enumerate(((t1, t2), (t2, t1)), start=1):
+        bats = ",".join(f'{{\\"batName\\":\\"Batter {bat[:3]} {i}\\"}}' for i in range(11))
+        bowls = ",".join(f'{{\\"bowlName\\":\\"Bowler {bowl[:3]} {i}\\"}}' for i in range(6))
+        json_blob.append(
+            f'{{\\"inningsId\\":{innings_id},\\"batTeamDetails\\":{{\\"batTeamName\\":\\"{spell(bat)}\\",[{bats}]}},'
+            f'\\"bowlTeamDetails\\":{{\\"bowlTeamName\\":\\"{spell(bowl)}\\",[{bowls}]}},'
+            f'\\"scoreDetails\\":{{\\"overs\\":20,\\"runs\\":{score},\\"wickets\\":{wickets}}}}}'
+        )
+    return "\n".join(lines), "".join(json_blob), f"{t1}|{t2}"
+
+
+def _recorded_pages(path: str) -> list[tuple[str, str, str]]:
+    """Saved match pages (one HTML file each) in the (text, html, "team1|team2") shape of _synthetic_page."""
+    pages = []
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name), encoding="utf-8", errors="replace") as fh:
+            html = fh.read()
+        text = engine._to_text(html)
+        pages.append((text, html, "|".join(engine._find_teams_from_text(text))))
+    if not pages:
+        raise ValueError(f"No pages found in {path}")
+    return pages
+
+
+def bench_canonical(states: int = 400, seed: int = 7, pages_dir: str | None = None) -> dict[str, Any]:
+    """Team-name canonicalization inside the page parsers, compiled resolver vs the regex one.
+
+    Runs on saved match pages when pages_dir is given, otherwise on synthetic ones. page_speedup_ceiling is the page
+    speedup if canonicalization cost nothing at all, which bounds what any resolver can win per page.
+    """
+    if pages_dir:
+        pages = _recorded_pages(pages_dir)
+    else:
+        rng = np.random.default_rng(seed)
+        by_team: dict[str, list[str]] = {team: [team, team.upper(), f"{team} Cricket"] for team in TEAM_DATA}
+        for alias, team in TEAM_ALIASES.items():
+            if team in by_team:
+                by_team[team].append(alias.upper() if len(alias) <= 3 else alias.title())
+        pages = [_synthetic_page(rng, list(TEAM_DATA), by_team) for _ in range(states)]
+    states = len(pages)
+
+    def parse_all() -> list[Any]:
+        out = []
+        for text, html, pair in pages:
+            t1, t2 = pair.split("|")
+            out.append(
+                (
+                    engine._find_teams_from_text(text),
+                    engine._extract_team_score_events(text, t1, t2),
+                    engine._extract_cricbuzz_innings(html),
+                    engine._extract_cricbuzz_xi_raw(html, t1, t2),
+                )
+            )
+        return out
+
+    compiled = engine._canonical_team
+    seen: list[Any] = []
+
+    def counting(name: Any) -> str:
+        seen.append(name)
+        return _legacy_canonical_team(name)
+
+    try:
+        engine._canonical_team = counting
+        expected = parse_all()
+        engine._canonical_team = _legacy_canonical_team
+        legacy = _timed(parse_all, repeat=3)
+    finally:
+        engine._canonical_team = compiled
+    engine._canonical_team_cached.cache_clear()
+    started = time.perf_counter()
+    cold_results = parse_all()
+    cold = time.perf_counter() - started
+    warm = _timed(parse_all, repeat=3)
+    legacy_names = _timed(lambda: [_legacy_canonical_team(n) for n in seen], repeat=3)
+    uncached = engine._canonical_team_cached.__wrapped__
+    uncached_names = _timed(lambda: [uncached(str(n or "").strip()) for n in seen], repeat=3)
+    warm_names = _timed(lambda: [compiled(n) for n in seen], repeat=3)
+    return {
+        "pages": states,
+        "source": pages_dir or "synthetic",
+        "canonical_calls_per_page": round(len(seen) / states, 1),
+        "legacy_ms_per_page": round(legacy * 1000.0 / states, 3),
+        "compiled_cold_ms_per_page": round(cold * 1000.0 / states, 3),
+        "compiled_ms_per_page": round(warm * 1000.0 / states, 3),
+        "page_speedup": round(legacy / warm, 1),
+        "legacy_canonical_share_pct": round(min(1.0, legacy_names / legacy) * 100.0, 1),
+        "page_speedup_ceiling": round(legacy / max(1e-9, legacy - legacy_names), 1),
+        "legacy_us_per_call": round(legacy_names * 1e6 / len(seen), 2),
+        "uncached_us_per_call": round(uncached_names * 1e6 / len(seen), 2),
+        "compiled_us_per_call": round(warm_names * 1e6 / len(seen), 3),
+        "call_speedup": round(legacy_names / warm_names, 1),
+        "cache": engine.team_alias_cache_stats(),
+        "matches_legacy": cold_results == expected and parse_all() == expected,
+    }
+
+
+# simulate_score's mean may sit this far from predict_score's avg for the same state: the larger of
+# CALIBRATION_TOLERANCE_RUNS and CALIBRATION_TOLERANCE_PCT of the projection. At 4000 simulations the
+# Monte Carlo standard error of the mean is about half a run.
+CALIBRATION_TOLERANCE_RUNS = 2.0
+CALIBRATION_TOLERANCE_PCT = 1.0
+
+
+def bench_calibration(states: int = 200, seed: int = 7) -> dict[str, Any]:
+    """simulate_score's mean against predict_score's avg over random squads, venues and live states."""
+    rng = np.random.default_rng(seed)
+    teams = list(TEAM_DATA)
+    venues = [None] + [v["name"] for v in VENUES]
+    worst: dict[str, Any] = {}
+    diffs = []
+    started = time.perf_counter()
+    for i in range(states):
+        fmt = "t20" if i % 2 else "odi"
+        max_balls = FORMAT_RULES[fmt]["max_overs"] * 6
+        batting, bowling = rng.choice(len(teams), size=2, replace=False)
+        balls = int(rng.integers(1, max_balls - 6))
+        # Realistic scoring rates and wickets that fall with the overs bowled.
+        per_over = rng.uniform(6.0, 10.0) if fmt == "t20" else rng.uniform(4.5, 7.0)
+        wickets = int(min(9, rng.binomial(10, min(0.95, 0.8 * balls / max_balls))))
+        payload = {
+            "format": fmt,
+            "batting_team": teams[batting],
+            "bowling_team": teams[bowling],
+            "venue": venues[int(rng.integers(len(venues)))],
+            "score": int(balls * per_over / 6.0),
+            "wickets": wickets,
+            "overs": float(f"{balls // 6}.{balls % 6}"),
+            "simulations": 4000,
+            "seed": i,
+        }
+        avg = predict_score(payload)["avg"]
+        diff = simulate_score(payload)["mean"] - avg
+        diffs.append(diff)
+        allowed = max(CALIBRATION_TOLERANCE_RUNS, avg * CALIBRATION_TOLERANCE_PCT / 100.0)
+        if not worst or abs(diff) / allowed > worst["share_of_tolerance"]:
+            worst = {"state": payload, "predict_avg": avg, "sim_mean": round(avg + diff, 1), "share_of_tolerance": round(abs(diff) / allowed, 2)}
+    elapsed = time.perf_counter() - started
+    gaps = np.abs(diffs)
+    return {
+        "states": states,
+        "mean_diff_runs": round(float(np.mean(diffs)), 2),
+        "max_abs_diff_runs": round(float(gaps.max()), 2),
+        "tolerance": f"max({CALIBRATION_TOLERANCE_RUNS:g} runs, {CALIBRATION_TOLERANCE_PCT:g}%)",
+        "worst": worst,
+        "within_tolerance": worst["share_of_tolerance"] <= 1.0,
+        "ms_per_state": round(elapsed * 1000.0 / states, 1),
+    }
+
+
+BENCHMARKS: dict[str, Callable[..., dict[str, Any]]] = {
+    "dls": bench_dls,
+    "grid": bench_grid,
+    "batch": bench_batch,
+    "trajectory": bench_trajectory,
+    "xi": bench_xi,
+    "canonical": bench_canonical,
+    "calibration": bench_calibration,
+}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Engine micro-benchmarks")
+    parser.add_argument("name", choices=sorted(BENCHMARKS))
+    parser.add_argument("--states", type=int, default=None)
+    parser.add_argument("--pages", default=None, help="directory of saved match pages (canonical only)")
+    args = parser.parse_args(argv)
+    kwargs = {"states": args.states} if args.states else {}
+    if args.pages:
+        kwargs["pages_dir"] = args.pages
+    print(json.dumps(BENCHMARKS[args.name](**kwargs), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any
+
+import numpy as np
+
+try:
+    from api.engine import COEFFICIENTS_PATH, SCORE_COEFFICIENTS, _historical_states, _score_blend_arrays, _score_inputs
+    from api.history import DEFAULT_STORE, open_store
+except ModuleNotFoundError:
+    from engine import COEFFICIENTS_PATH, SCORE_COEFFICIENTS, _historical_states, _score_blend_arrays, _score_inputs
+    from history import DEFAULT_STORE, open_store
+
+# (low, high, initial step) for every fitted coefficient; anything not listed keeps its current value.
+# blend_par is not searched: it is always 1 - blend_dls - blend_pace, so the three blend weights stay on
+# the simplex and explain_score's step-by-step attribution remains exact.
+FIT_SPACE: dict[str, tuple[float, float, float]] = {
+    "blend_dls": (0.0, 1.0, 0.08),
+    "blend_pace": (0.0, 1.0, 0.08),
+    "rr_bias": (0.0, 14.0, 1.0),
+    "phase_accel": (0.6, 1.6, 0.08),
+    "wickets_exp": (0.2, 1.5, 0.1),
+    "tempo_wickets": (0.0, 0.8, 0.06),
+    "base_weight": (0.4, 1.2, 0.06),
+    "batter_weight": (0.0, 0.6, 0.06),
+    "rr_cap_base": (4.0, 14.0, 0.6),
+    "rr_cap_wicket": (0.0, 1.0, 0.08),
+    "rr_cap_late": (0.0, 2.0, 0.2),
+    "spread_base": (2, 40, 3),
+    "spread_over": (0.2, 3.0, 0.2),
+    "spread_wicket": (0.0, 3.0, 0.2),
+}
+TARGET_COVERAGE = 0.8
+COVERAGE_WEIGHT = 0.5
+
+_FIT_DATA: dict[str, dict[str, Any]] = {}
+
+
+def _init_worker(data: dict[str, dict[str, Any]]) -> None:
+    _FIT_DATA.clear()
+    _FIT_DATA.update(data)
+
+
+def _metrics(fmt: str, coef: dict[str, Any], data: dict[str, Any]) -> dict[str, float]:
+    out = _score_blend_arrays(fmt, data["score"], data["wickets"], data["balls_bowled"], data["cols"], coef)
+    actual = data["actual"]
+    err = out["avg"] - actual
+    mae = float(np.abs(err).mean())
+    coverage = float(((out["low"] <= actual) & (actual <= out["high"])).mean())
+    return {
+        "objective": mae + (COVERAGE_WEIGHT * abs(coverage - TARGET_COVERAGE) * 100.0),
+        "mae": mae,
+        "rmse": float(np.sqrt((err.astype(float) ** 2).mean())),
+        "coverage": coverage,
+        "bias": float(err.mean()),
+    }
+
+
+def _evaluate(fmt: str, coef: dict[str, Any]) -> float:
+    return _metrics(fmt, coef, _FIT_DATA[f"{fmt}:train"])["objective"]
+
+
+def _fit_data(payload: dict[str, Any], store: Any, holdout_every: int) -> dict[str, dict[str, Any]]:
+    """Blend inputs for every checkpoint state, split train/holdout by innings so no innings is in both."""
+    replay = _historical_states(payload, store)
+    actual = np.array(replay["actual"])
+    holdout = np.array(replay["rows"]) % holdout_every == 0
+    _, blocks = _score_inputs(replay["states"])
+    data = {}
+    for fmt, block in blocks.items():
+        idx = np.array([r[0] for r in block["rows"]])
+        for split, mask in (("train", ~holdout[idx]), ("holdout", holdout[idx])):
+            data[f"{fmt}:{split}"] = {
+                "score": block["score"][mask],
+                "wickets": block["wickets"][mask],
+                "balls_bowled": block["balls_bowled"][mask],
+                "cols": {k: v[mask] if v.shape == mask.shape else v for k, v in block["cols"].items()},
+                "actual": actual[idx][mask],
+            }
+    return data
+
+
+def _on_simplex(coef: dict[str, Any]) -> dict[str, Any] | None:
+    """coef with blend_par set to close the blend weights to 1, or None when blend_dls + blend_pace exceed 1."""
+    rest = 1.0 - coef["blend_dls"] - coef["blend_pace"]
+    if rest < -1e-9:
+        return None
+    return {**coef, "blend_par": max(0.0, rest)}
+
+
+def _candidates(coef: dict[str, Any], steps: dict[str, float]) -> list[tuple[str, Any]]:
+    moves = []
+    for key, (lo, hi, _) in FIT_SPACE.items():
+        for k in (-2, -1, 1, 2):
+            value = min(hi, max(lo, coef[key] + (k * steps[key])))
+            if isinstance(coef[key], int):
+                value = int(round(value))
+            if value != coef[key] and _on_simplex({**coef, key: value}) is not None:
+                moves.append((key, value))
+    return moves
+
+
+def fit_format(fmt: str, pool: Any, rounds: int, start: dict[str, Any]) -> tuple[dict[str, Any], list[float]]:
+    """Parallel coordinate search: score every single-coefficient move, keep the best ones, halve steps when stuck."""
+    coef = dict(start)
+    steps = {k: s for k, (_, _, s) in FIT_SPACE.items()}
+    best = _evaluate(fmt, coef)
+    history = [best]
+    for _ in range(rounds):
+        moves = _candidates(coef, steps)
+        scores = list(pool.map(_evaluate, [fmt] * len(moves), [_on_simplex({**coef, key: value}) for key, value in moves]))
+        per_key: dict[str, tuple[float, Any]] = {}
+        for (key, value), score in zip(moves, scores):
+            if score < best and score < per_key.get(key, (float("inf"), None))[0]:
+                per_key[key] = (score, value)
+        if not per_key:
+            steps = {k: v / 2.0 for k, v in steps.items()}
+            if all(steps[k] < FIT_SPACE[k][2] / 64.0 for k in steps):
+                break
+            continue
+        # Take every improving coordinate at once; fall back to the single best move if they interfere.
+        combined = _on_simplex({**coef, **{k: v for k, (_, v) in per_key.items()}})
+        combined_score = _evaluate(fmt, combined) if combined is not None else float("inf")
+        single_key = min(per_key, key=lambda k: per_key[k][0])
+        if combined is not None and combined_score <= per_key[single_key][0]:
+            coef, best = combined, combined_score
+        else:
+            coef, best = _on_simplex({**coef, single_key: per_key[single_key][1]}), per_key[single_key][0]
+        history.append(best)
+    return coef, history
+
+
+def calibrate(
+    store_path: str | None = None,
+    out: str | None = None,
+    formats: list[str] | None = None,
+    rounds: int = 40,
+    workers: int | None = None,
+    holdout_every: int = 5,
+    filters: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    started = time.perf_counter()
+    store = open_store(store_path)
+    payload = {**(filters or {}), "formats": formats or ["t20", "odi"]}
+    data = _fit_data(payload, store, holdout_every)
+    workers = max(1, min(8, os.cpu_count() or 1)) if workers is None else max(1, int(workers))
+
+    fitted: dict[str, dict[str, Any]] = {}
+    report: dict[str, Any] = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as pool:
+        _init_worker(data)
+        for fmt in payload["formats"]:
+            if f"{fmt}:train" not in data:
+                continue
+            coef, history = fit_format(fmt, pool, rounds, SCORE_COEFFICIENTS[fmt])
+            fitted[fmt] = coef
+            report[fmt] = {
+                "states": {split: int(len(data[f"{fmt}:{split}"]["actual"])) for split in ("train", "holdout")},
+                "rounds": len(history) - 1,
+                "before": {split: _metrics(fmt, SCORE_COEFFICIENTS[fmt], data[f"{fmt}:{split}"]) for split in ("train", "holdout")},
+                "after": {split: _metrics(fmt, coef, data[f"{fmt}:{split}"]) for split in ("train", "holdout")},
+            }
+    if not fitted:
+        raise ValueError("No historical states to fit")
+
+    now = datetime.now(timezone.utc)
+    doc = {
+        "version": f"fit-{now.strftime('%Y%m%dT%H%M%SZ')}",
+        "created": now.isoformat(timespec="seconds"),
+        "objective": f"MAE + {COVERAGE_WEIGHT} x |band coverage - {TARGET_COVERAGE:.0%}| (pp)",
+        "fitted_on": {"store": store.path, "matches": len(store), "filters": filters or {}, "holdout_every": holdout_every},
+        "metrics": report,
+        "formats": fitted,
+    }
+    out = out or COEFFICIENTS_PATH
+    tmp = f"{out}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(doc, fh, indent=2)
+    os.replace(tmp, out)
+    return {"out": out, "version": doc["version"], "metrics": report, "workers": workers, "elapsed_sec": round(time.perf_counter() - started, 1)}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Fit predict_score coefficients on the local history store")
+    parser.add_argument("--store", default=DEFAULT_STORE)
+    parser.add_argument("--out", default=COEFFICIENTS_PATH)
+    parser.add_argument("--formats", nargs="+", default=["t20", "odi"])
+    parser.add_argument("--rounds", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--from", dest="date_from", default=None, help="first match date, YYYY[-MM-DD]")
+    parser.add_argument("--to", dest="date_to", default=None)
+    args = parser.parse_args(argv)
+    filters = {k: v for k, v in (("from", args.date_from), ("to", args.date_to)) if v}
+    print(json.dumps(calibrate(args.store, args.out, args.formats, args.rounds, args.workers, filters=filters), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from copy import deepcopy
+from typing import Callable
 
 FORMAT_RULES = {
     "t20": {
@@ -500,6 +501,30 @@ TEAM_DATA = {
     for t in TOP_ODI_TEAMS
 }
 
+_SQUAD_RELOAD_HOOKS: list[Callable[[], None]] = []
+
+
+def on_squads_reloaded(hook: Callable[[], None]) -> Callable[[], None]:
+    """Register a callback (e.g. a cache clear) to run whenever squad data is reloaded."""
+    _SQUAD_RELOAD_HOOKS.append(hook)
+    return hook
+
+
+def reload_squads(odi_squads: dict[str, list[dict]] | None = None) -> None:
+    """Rebuild squads in place, optionally replacing ODI squads for some teams, then notify listeners."""
+    if odi_squads:
+        ODI_SQUADS.update(deepcopy(odi_squads))
+    T20_SQUADS.clear()
+    T20_SQUADS.update(build_t20_squads())
+    for t in TOP_ODI_TEAMS:
+        TEAM_DATA[t["name"]]["squads"] = {
+            "odi": ODI_SQUADS[t["name"]],
+            "t20": T20_SQUADS[t["name"]],
+        }
+    for hook in list(_SQUAD_RELOAD_HOOKS):
+        hook()
+
+
 TEAM_RECENT_FORM = {
     "India": {"odi": "W W W L W", "t20": "W W L W W"},
     "Australia": {"odi": "W L W W W", "t20": "L W W W L"},
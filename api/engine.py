@@ -1,21 +1,35 @@
 from __future__ import annotations
 
 import json
+import logging
 import math
 import os
 import re
+import threading
 import time
 import urllib.request
 import urllib.parse
+import uuid
+from bisect import bisect_left
+from collections import OrderedDict
+from functools import lru_cache
 from html import unescape
+from itertools import combinations
 from urllib.parse import urlparse
-from datetime import datetime, timezone, date
-from typing import Any
+from datetime import datetime, timezone, date, timedelta
+from types import MappingProxyType
+from typing import Any, NamedTuple
+
+import numpy as np
 
 try:
-    from api.data import FORMAT_RULES, H2H_DATA, PITCH_TYPES, TEAM_DATA, TEAM_RECENT_FORM, TOP_ODI_TEAMS, VENUES, WEATHER_TYPES
+    from api.data import FORMAT_RULES, H2H_DATA, PITCH_TYPES, TEAM_DATA, TEAM_RECENT_FORM, TOP_ODI_TEAMS, VENUES, WEATHER_TYPES, on_squads_reloaded
+    from api.history import FORMAT_CODES, GENDER_CODES, TEAM_TYPE_CODES, open_store
+    from api.players import PLAYER_STORE, ROLE_CODES, ROLES, SquadColumns, player_name_cache_stats, resolve_player
 except ModuleNotFoundError:
-    from data import FORMAT_RULES, H2H_DATA, PITCH_TYPES, TEAM_DATA, TEAM_RECENT_FORM, TOP_ODI_TEAMS, VENUES, WEATHER_TYPES
+    from data import FORMAT_RULES, H2H_DATA, PITCH_TYPES, TEAM_DATA, TEAM_RECENT_FORM, TOP_ODI_TEAMS, VENUES, WEATHER_TYPES, on_squads_reloaded
+    from history import FORMAT_CODES, GENDER_CODES, TEAM_TYPE_CODES, open_store
+    from players import PLAYER_STORE, ROLE_CODES, ROLES, SquadColumns, player_name_cache_stats, resolve_player
 
 DLS_20 = {
     0: {20: 100.0, 15: 85.1, 10: 62.7, 5: 33.5, 1: 8.4, 0: 0.0},
@@ -225,11 +239,53 @@ def _interpolate(table: dict[int, float], overs_remaining: float) -> float:
     return low_val + ((high_val - low_val) * (overs_remaining - lower) / (upper - lower))
 
 
+def _interpolate_knots(keys: list[int], values: list[float], overs_remaining: float) -> float:
+    if overs_remaining <= keys[0]:
+        return values[0]
+    if overs_remaining >= keys[-1]:
+        return values[-1]
+    i = bisect_left(keys, overs_remaining)
+    if keys[i] == overs_remaining:
+        return values[i]
+    lower, upper = keys[i - 1], keys[i]
+    low_val, high_val = values[i - 1], values[i]
+    return low_val + ((high_val - low_val) * (overs_remaining - lower) / (upper - lower))
+
+
+_DLS_KNOTS = {
+    fmt: (sorted(table[0].keys()), [[table[w][k] for k in sorted(table[w].keys())] for w in range(10)])
+    for fmt, table in (("t20", DLS_20), ("odi", DLS_50))
+}
+
+# Resource % at every ball of the innings: row = balls remaining, column = wickets lost.
+DLS_GRID = {
+    fmt: np.array(
+        [[_interpolate(table[w], b / 6.0) for w in range(10)] for b in range(FORMAT_RULES[fmt]["max_overs"] * 6 + 1)]
+    )
+    for fmt, table in (("t20", DLS_20), ("odi", DLS_50))
+}
+_DLS_GRID_ROWS = {fmt: grid.tolist() for fmt, grid in DLS_GRID.items()}
+
+
 def dls_resource_remaining(fmt: str, overs_remaining: float, wickets_lost: int) -> float:
     overs_remaining = max(0.0, overs_remaining)
     wickets = max(0, min(9, int(wickets_lost)))
-    table = DLS_20 if fmt == "t20" else DLS_50
-    return _interpolate(table[wickets], overs_remaining)
+    key = "t20" if fmt == "t20" else "odi"
+    rows = _DLS_GRID_ROWS[key]
+    if overs_remaining >= FORMAT_RULES[key]["max_overs"]:
+        return rows[-1][wickets]
+    balls = int(round(overs_remaining * 6))
+    if balls / 6.0 == overs_remaining:
+        return rows[balls][wickets]
+    keys, values = _DLS_KNOTS[key]
+    return _interpolate_knots(keys, values[wickets], overs_remaining)
+
+
+def dls_resource_grid_lookup(fmt: str, balls_remaining: np.ndarray, wickets_lost: np.ndarray) -> np.ndarray:
+    """Vectorized dls_resource_remaining for whole-ball states."""
+    grid = DLS_GRID["t20" if fmt == "t20" else "odi"]
+    balls = np.clip(np.asarray(balls_remaining, dtype=int), 0, grid.shape[0] - 1)
+    return grid[balls, np.clip(np.asarray(wickets_lost, dtype=int), 0, 9)]
 
 
 def get_team_players(team: str, fmt: str) -> list[dict]:
@@ -238,30 +294,163 @@ def get_team_players(team: str, fmt: str) -> list[dict]:
     return TEAM_DATA[team]["squads"][fmt]
 
 
-def pick_players(players: list[dict], selected_names: list[str] | None) -> list[dict]:
-    if not selected_names:
-        return players[:11]
-    selected_set = set(selected_names)
-    chosen = [p for p in players if p["name"] in selected_set]
-    if len(chosen) < 11:
-        raise ValueError("Select exactly 11 players for each team")
-    return chosen[:11]
+def _venue_key(text: str) -> str:
+    key = str(text or "").lower().replace("&", " and ").replace("'", "")
+    return re.sub(r"[^a-z0-9]+", " ", key).strip()
+
+
+def _trigrams(key: str) -> frozenset[str]:
+    padded = f" {key} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+# Words most venue names share; they never identify a ground on their own.
+_VENUE_GENERIC_WORDS = frozenset(
+    {"the", "and", "of", "co", "stadium", "cricket", "ground", "oval", "park", "international", "intl", "national", "club", "sports", "complex", "academy", "centre", "center", "events"}
+)
+
+
+def _venue_required_words(name_key: str, city_key: str) -> frozenset[str]:
+    """Words a scraped string must contain to name this ground; all-generic names also need their city."""
+    words = {w for w in name_key.split() if len(w) > 1}
+    required = words - _VENUE_GENERIC_WORDS
+    return frozenset(required or (words | set(city_key.split())) - {"the"})
+
+
+def _build_venue_index() -> dict[str, Any]:
+    by_name = {v["name"]: v for v in VENUES}
+    by_key: dict[str, str] = {}
+    doc_grams: list[frozenset[str]] = []
+    name_forms: list[list[frozenset[str]]] = []
+    name_words: list[frozenset[str]] = []
+    city_words: list[frozenset[str]] = []
+    postings: dict[str, list[int]] = {}
+    for vid, v in enumerate(VENUES):
+        name_key = _venue_key(v["name"])
+        city_key = _venue_key(v["city"])
+        # "Perth Stadium (Optus Stadium)" is also known by the bracketed name alone.
+        forms = [_venue_key(re.sub(r"\(.*?\)", " ", v["name"]))] + [_venue_key(a) for a in re.findall(r"\((.*?)\)", v["name"])]
+        for alias in [name_key, f"{name_key} {city_key}"] + forms:
+            by_key.setdefault(alias, v["name"])
+        name_forms.append([(required, frozenset().union(*map(_trigrams, required))) for required in (_venue_required_words(form, city_key) for form in forms)])
+        name_words.append(frozenset(name_key.split()))
+        city_words.append(frozenset(city_key.split()))
+        doc = _trigrams(name_key) | _trigrams(city_key)
+        doc_grams.append(doc)
+        for g in doc:
+            postings.setdefault(g, []).append(vid)
+    # Trigrams from words every venue shares ("stadium", "cricket") carry little evidence.
+    idf = {g: math.log((1.0 + len(VENUES)) / len(ids)) for g, ids in postings.items()}
+    return {
+        "by_name": by_name,
+        "by_key": by_key,
+        "doc_mass": [sum(idf[g] for g in grams) for grams in doc_grams],
+        "name_forms": name_forms,
+        "name_words": name_words,
+        "city_words": city_words,
+        "postings": postings,
+        "idf": idf,
+    }
+
+
+_VENUE_INDEX = _build_venue_index()
+_VENUE_MIN_NAME_COVERAGE = 0.6
+
+
+def _venue_names_ground(vid: int, words: set[str], joined: str) -> bool:
+    """Every identifying word of one of the venue's names is in the query, and the overlap is more than its city."""
+    # Long words may be run together or prefixed in scraped text ("Woolloongabba", "Sher-e-Bangla").
+    present = lambda w: w in words or (len(w) >= 5 and w in joined)  # noqa: E731
+    if not {w for w in _VENUE_INDEX["name_words"][vid] if present(w)} - _VENUE_INDEX["city_words"][vid]:
+        return False
+    return any(all(present(w) for w in required) for required, _ in _VENUE_INDEX["name_forms"][vid])
+
+
+def _venue_name_coverage(vid: int, query: frozenset[str]) -> float:
+    """Best share, over the venue's names, of the identifying words' trigrams found in the query (idf-weighted)."""
+    idf = _VENUE_INDEX["idf"]
+    rare = math.log(1.0 + len(VENUES))
+    best = 0.0
+    for _, grams in _VENUE_INDEX["name_forms"][vid]:
+        total = sum(idf.get(g, rare) for g in grams)
+        if total:
+            best = max(best, sum(idf.get(g, rare) for g in grams & query) / total)
+    return best
+
+
+def _venue_exact(venue_name: str) -> dict[str, Any] | None:
+    venue = _VENUE_INDEX["by_name"].get(venue_name)
+    if venue is None:
+        canonical = _VENUE_INDEX["by_key"].get(_venue_key(venue_name))
+        venue = _VENUE_INDEX["by_name"][canonical] if canonical else None
+    return venue
+
+
+@lru_cache(maxsize=1024)
+def resolve_venue(raw: str | None) -> str | None:
+    """Map a scraped venue string (e.g. "Wankhede, Mumbai") to a canonical VENUES name, or None.
+
+    Fuzzy matches must cover most of the venue's name and contain its identifying words, so a
+    different ground in the same city ("Marvel Stadium, Melbourne") or a bare city stays unresolved.
+    """
+    if not raw:
+        return None
+    if raw in _VENUE_INDEX["by_name"]:
+        return raw
+    key = _venue_key(raw)
+    if len(key) < 3:
+        return None
+    if key in _VENUE_INDEX["by_key"]:
+        return _VENUE_INDEX["by_key"][key]
+
+    idf = _VENUE_INDEX["idf"]
+    query = _trigrams(key)
+    words = set(key.split())
+    joined = key.replace(" ", "")
+    query_mass = sum(idf.get(g, math.log(1.0 + len(VENUES))) for g in query)
+    shared: dict[int, float] = {}
+    for g in query:
+        for vid in _VENUE_INDEX["postings"].get(g, ()):
+            shared[vid] = shared.get(vid, 0.0) + idf[g]
+    best_vid, best_score = -1, 0.0
+    for vid, mass in sorted(shared.items(), key=lambda kv: kv[1], reverse=True)[:8]:
+        dice = (2.0 * mass) / (query_mass + _VENUE_INDEX["doc_mass"][vid])
+        # Share of the venue name found in the query: lets "Eden Gardens, Kolkata, 2nd ODI" still resolve.
+        name_cov = _venue_name_coverage(vid, query)
+        if name_cov < _VENUE_MIN_NAME_COVERAGE or not _venue_names_ground(vid, words, joined):
+            continue
+        score = max(dice, (dice + name_cov) / 2.0)
+        if score > best_score:
+            best_vid, best_score = vid, score
+    if best_vid < 0:
+        return None
+    return VENUES[best_vid]["name"]
+
+
+def venue_resolver_cache_stats() -> dict[str, int]:
+    info = resolve_venue.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize or 0}
+
+
+def _venue_lookup(venue_name: str | None) -> dict[str, Any] | None:
+    """Venue for the scoring path: exact or normalized name only. Scraped text goes through resolve_venue first."""
+    if not venue_name:
+        return None
+    return _venue_exact(str(venue_name))
 
 
 def venue_average(fmt: str, venue_name: str | None) -> float:
     key = "t20_avg" if fmt == "t20" else "odi_avg"
-    if venue_name:
-        for venue in VENUES:
-            if venue["name"] == venue_name:
-                return float(venue[key])
+    venue = _venue_lookup(venue_name)
+    if venue is not None:
+        return float(venue[key])
     return FORMAT_RULES[fmt]["default_par"]
 
 
 def venue_profile(venue_name: str | None) -> dict[str, Any]:
-    if venue_name:
-        for venue in VENUES:
-            if venue["name"] == venue_name:
-                return venue
+    venue = _venue_lookup(venue_name)
+    if venue is not None:
+        return venue
     return {"pitch_type": "Standard / Balanced", "boundary_size": "Medium"}
 
 
@@ -269,6 +458,54 @@ def _clamp(value: float, low: float, high: float) -> float:
     return max(low, min(high, value))
 
 
+def _player_indices(fmt: str, bat_avg: np.ndarray, sr: np.ndarray, bowl_avg: np.ndarray, economy: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Clamped batting/bowling indices per player (0 where the player has no record) and their validity masks."""
+    t20 = fmt == "t20"
+    bat_ok = bat_avg > 0
+    bowl_ok = (bowl_avg > 0) & (economy > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bat_idx = ((bat_avg / (30.0 if t20 else 42.0)) * 55.0) + ((sr / (140.0 if t20 else 90.0)) * 45.0)
+        bowl_idx = (((23.0 if t20 else 32.0) / bowl_avg) * 60.0) + (((7.6 if t20 else 5.4) / economy) * 40.0)
+    bat_idx = np.where(bat_ok, np.clip(np.nan_to_num(bat_idx), 20.0, 140.0), 0.0)
+    bowl_idx = np.where(bowl_ok, np.clip(np.nan_to_num(bowl_idx), 20.0, 140.0), 0.0)
+    return bat_idx, bat_ok, bowl_idx, bowl_ok
+
+
+def _seq_mean(values: np.ndarray) -> float:
+    # cumsum adds left to right, so this matches sum(list) / len(list) to the last bit.
+    return float(np.cumsum(values)[-1]) / len(values) if len(values) else 0.0
+
+
+def _breakdown(fmt: str, bat_avg: np.ndarray, sr: np.ndarray, bowl_avg: np.ndarray, economy: np.ndarray, rating: np.ndarray, roles: dict[str, int]) -> dict[str, Any]:
+    bat_idx, bat_ok, bowl_idx, bowl_ok = _player_indices(fmt, bat_avg, sr, bowl_avg, economy)
+    return _rated_breakdown(_seq_mean(bat_idx[bat_ok]), _seq_mean(bowl_idx[bowl_ok]), _seq_mean(rating), roles)
+
+
+def _rated_breakdown(batting: float, bowling: float, rating_avg: float, roles: dict[str, int]) -> dict[str, Any]:
+    bowling_options = roles["Bowler"] + roles["All-Rounder"]
+    batting_depth = roles["Batter"] + roles["WK-Batter"] + roles["All-Rounder"]
+    wk_count = roles["WK-Batter"]
+    role_balance = 100.0
+    if wk_count == 0:
+        role_balance -= 12.0
+    if bowling_options < 5:
+        role_balance -= (5 - bowling_options) * 7.0
+    if batting_depth < 6:
+        role_balance -= (6 - batting_depth) * 5.0
+    role_balance = _clamp(role_balance, 50.0, 100.0)
+    overall = (batting * 0.30) + (bowling * 0.30) + (rating_avg * 0.25) + (role_balance * 0.15)
+
+    return {
+        "batting": round(batting, 2),
+        "bowling": round(bowling, 2),
+        "overall": round(_clamp(overall, 40.0, 99.0), 2),
+        "role_balance": round(role_balance, 2),
+        "bowling_options": bowling_options,
+        "batting_depth": batting_depth,
+        "roles": roles,
+    }
+
+
 def team_breakdown(players: list[dict], fmt: str = "odi") -> dict[str, float]:
     bat_scores: list[float] = []
     bowl_scores: list[float] = []
@@ -292,28 +529,14 @@ def team_breakdown(players: list[dict], fmt: str = "odi") -> dict[str, float]:
     batting = sum(bat_scores) / max(1, len(bat_scores))
     bowling = sum(bowl_scores) / max(1, len(bowl_scores))
     rating = sum(rating_scores) / max(1, len(rating_scores))
-    bowling_options = roles["Bowler"] + roles["All-Rounder"]
-    batting_depth = roles["Batter"] + roles["WK-Batter"] + roles["All-Rounder"]
-    wk_count = roles["WK-Batter"]
-    role_balance = 100.0
-    if wk_count == 0:
-        role_balance -= 12.0
-    if bowling_options < 5:
-        role_balance -= (5 - bowling_options) * 7.0
-    if batting_depth < 6:
-        role_balance -= (6 - batting_depth) * 5.0
-    role_balance = _clamp(role_balance, 50.0, 100.0)
-    overall = (batting * 0.30) + (bowling * 0.30) + (rating * 0.25) + (role_balance * 0.15)
+    return _rated_breakdown(batting, bowling, rating, roles)
 
-    return {
-        "batting": round(batting, 2),
-        "bowling": round(bowling, 2),
-        "overall": round(_clamp(overall, 40.0, 99.0), 2),
-        "role_balance": round(role_balance, 2),
-        "bowling_options": bowling_options,
-        "batting_depth": batting_depth,
-        "roles": roles,
-    }
+
+def squad_breakdown(cols: SquadColumns, idx: np.ndarray) -> dict[str, Any]:
+    """team_breakdown for squad rows idx, straight from the player store columns."""
+    role = cols.role[idx]
+    counts = np.bincount(role[role >= 0], minlength=len(ROLES))
+    return _breakdown(cols.fmt, cols.bat_avg[idx], cols.strike_rate[idx], cols.bowl_avg[idx], cols.economy[idx], cols.rating[idx], dict(zip(ROLES, counts.tolist())))
 
 
 def condition_multiplier(pitch: str | None, weather: str | None) -> float:
@@ -345,29 +568,47 @@ def toss_adjustment(fmt: str, toss_winner: str | None, toss_decision: str | None
     return 0.0
 
 
-def xi_validator(players: list[dict], fmt: str) -> dict[str, Any]:
-    batter_like = [p for p in players if p["role"] in {"Batter", "WK-Batter", "All-Rounder"}]
-    opener_cut_sr = 130 if fmt == "t20" else 88
-    opener_cut_avg = 28 if fmt == "t20" else 35
-    finisher_cut_sr = 145 if fmt == "t20" else 98
-    openers = [p for p in batter_like if p.get("strike_rate", 0) >= opener_cut_sr and p.get("bat_avg", 0) >= opener_cut_avg]
-    finishers = [p for p in batter_like if p.get("strike_rate", 0) >= finisher_cut_sr]
-    bowling_options = len([p for p in players if p["role"] in {"Bowler", "All-Rounder"}])
+def _xi_checks(fmt: str, role: np.ndarray, sr: np.ndarray, bat_avg: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-player opener / finisher / bowling-option flags: xi_validator's checks over squad columns."""
+    batter_like = (role == ROLE_CODES["Batter"]) | (role == ROLE_CODES["WK-Batter"]) | (role == ROLE_CODES["All-Rounder"])
+    openers = batter_like & (sr >= (130 if fmt == "t20" else 88)) & (bat_avg >= (28 if fmt == "t20" else 35))
+    finishers = batter_like & (sr >= (145 if fmt == "t20" else 98))
+    bowlers = (role == ROLE_CODES["Bowler"]) | (role == ROLE_CODES["All-Rounder"])
+    return openers, finishers, bowlers
+
+
+def _validation(openers: int, finishers: int, bowling_options: int) -> dict[str, Any]:
     warnings: list[str] = []
-    if len(openers) < 2:
+    if openers < 2:
         warnings.append("XI may be short of specialist openers.")
-    if len(finishers) < 2:
+    if finishers < 2:
         warnings.append("XI may be short of finishers for end overs.")
     if bowling_options < 5:
         warnings.append("XI has fewer than 5 bowling options.")
     return {
-        "openers": len(openers),
-        "finishers": len(finishers),
+        "openers": openers,
+        "finishers": finishers,
         "bowling_options": bowling_options,
         "warnings": warnings,
     }
 
 
+def xi_validator(players: list[dict], fmt: str) -> dict[str, Any]:
+    batter_like = [p for p in players if p["role"] in {"Batter", "WK-Batter", "All-Rounder"}]
+    opener_cut_sr = 130 if fmt == "t20" else 88
+    opener_cut_avg = 28 if fmt == "t20" else 35
+    finisher_cut_sr = 145 if fmt == "t20" else 98
+    openers = [p for p in batter_like if p.get("strike_rate", 0) >= opener_cut_sr and p.get("bat_avg", 0) >= opener_cut_avg]
+    finishers = [p for p in batter_like if p.get("strike_rate", 0) >= finisher_cut_sr]
+    bowling_options = len([p for p in players if p["role"] in {"Bowler", "All-Rounder"}])
+    return _validation(len(openers), len(finishers), bowling_options)
+
+
+def squad_validation(cols: SquadColumns, idx: np.ndarray) -> dict[str, Any]:
+    openers, finishers, bowlers = _xi_checks(cols.fmt, cols.role[idx], cols.strike_rate[idx], cols.bat_avg[idx])
+    return _validation(int(openers.sum()), int(finishers.sum()), int(bowlers.sum()))
+
+
 def toss_impact(fmt: str, venue_name: str | None, weather: str | None) -> dict[str, Any]:
     venue = venue_profile(venue_name)
     boundary = venue.get("boundary_size", "Medium")
@@ -459,6 +700,205 @@ def death_bowling_impact(fmt: str, bowl_xi: list[dict]) -> dict[str, Any]:
     }
 
 
+class XIProfile(NamedTuple):
+    team: str
+    fmt: str
+    players: tuple
+    breakdown: MappingProxyType
+    validation: MappingProxyType
+    death_bowling: MappingProxyType
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+@lru_cache(maxsize=256)
+def _xi_profile_cached(team: str, fmt: str, selected: frozenset) -> XIProfile:
+    cols = PLAYER_STORE.squad(team, fmt)
+    idx = cols.select(selected) if selected else np.arange(min(11, len(cols)))
+    if selected and len(idx) < 11:
+        raise ValueError("Select exactly 11 players for each team")
+    idx = idx[:11]
+    xi = cols.players(idx)
+    return XIProfile(
+        team=team,
+        fmt=fmt,
+        players=_freeze(xi),
+        breakdown=_freeze(squad_breakdown(cols, idx)),
+        validation=_freeze(squad_validation(cols, idx)),
+        death_bowling=_freeze(death_bowling_impact(fmt, xi)),
+    )
+
+
+def xi_profile(team: str, fmt: str, selected_names: list[str] | None) -> XIProfile:
+    """Immutable XI profile (players, breakdown, validation, death bowling) memoized per team/format/XI."""
+    return _xi_profile_cached(team, fmt, frozenset(selected_names or ()))
+
+
+def xi_profile_cache_stats() -> dict[str, int]:
+    info = _xi_profile_cached.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize or 0}
+
+
+on_squads_reloaded(_xi_profile_cached.cache_clear)
+
+
+_XI_MAX_SQUAD = 18
+
+
+@lru_cache(maxsize=8)
+def _xi_membership(n: int) -> np.ndarray:
+    """(C(n, 11), n) 0/1 matrix, one row per XI in itertools.combinations order."""
+    combos = np.array(list(combinations(range(n), 11)), dtype=np.intp)
+    member = np.zeros((len(combos), n))
+    member[np.arange(len(combos))[:, None], combos] = 1.0
+    member.setflags(write=False)
+    return member
+
+
+@lru_cache(maxsize=64)
+def _squad_columns(team: str, fmt: str) -> MappingProxyType:
+    """Per-player team_breakdown / xi_validator inputs as float columns for the XI optimizer."""
+    cols = PLAYER_STORE.squad(team, fmt)
+    bat_idx, bat_ok, bowl_idx, bowl_ok = _player_indices(fmt, cols.bat_avg, cols.strike_rate, cols.bowl_avg, cols.economy)
+    openers, finishers, _ = _xi_checks(fmt, cols.role, cols.strike_rate, cols.bat_avg)
+    return MappingProxyType(
+        {
+            "names": cols.names,
+            "bat_idx": bat_idx,
+            "bat_ok": bat_ok.astype(float),
+            "bowl_idx": bowl_idx,
+            "bowl_ok": bowl_ok.astype(float),
+            "rating": cols.rating,
+            "roles": (cols.role[:, None] == np.arange(len(ROLES))[None, :]).astype(float),
+            "opener": openers.astype(float),
+            "finisher": finishers.astype(float),
+        }
+    )
+
+
+on_squads_reloaded(_squad_columns.cache_clear)
+
+
+def _xi_condition_tilt(fmt: str, venue: str | None, pitch: str | None, weather: str | None) -> float:
+    """Positive on batting-friendly venues/conditions: shifts optimizer weight from bowling to batting."""
+    pitch_bowling = next((p["bowling_impact"] for p in PITCH_TYPES if p["type"] == pitch), 0.0)
+    venue_edge = (venue_average(fmt, venue) / FORMAT_RULES[fmt]["default_par"]) - 1.0
+    return _clamp((condition_multiplier(pitch, weather) - 1.0) - pitch_bowling + venue_edge, -0.25, 0.25)
+
+
+def _xi_names(squad: SquadColumns, names: Any, label: str) -> list[tuple[int, ...]]:
+    """Squad rows of each named player (a name listed twice in the squad has two rows)."""
+    unknown = [n for n in names or [] if n not in squad.index]
+    if unknown:
+        raise ValueError(f"Unknown {label} player(s): {', '.join(map(str, unknown))}")
+    return [squad.index[n] for n in dict.fromkeys(names or [])]
+
+
+def optimize_xi(payload: dict[str, Any]) -> dict[str, Any]:
+    """Score every 11-player subset of the squad at once and return the best top_k XIs.
+
+    XIs meeting the wicketkeeper / bowling-options / openers / finishers checks rank ahead of those
+    that do not; within each group the condition-weighted team_breakdown score decides.
+    """
+    started = time.perf_counter()
+    fmt = format_key(payload.get("format"))
+    team = payload.get("team")
+    if team not in TEAM_DATA:
+        raise ValueError("Unknown team")
+    cols = _squad_columns(team, fmt)
+    squad = PLAYER_STORE.squad(team, fmt)
+    n = len(cols["names"])
+    if not 11 <= n <= _XI_MAX_SQUAD or len(squad.index) < 11:
+        raise ValueError(f"Squad must have between 11 and {_XI_MAX_SQUAD} players")
+    top_k = max(1, min(50, int(payload.get("top_k", 5))))
+    include = _xi_names(squad, payload.get("include"), "included")
+    exclude = _xi_names(squad, payload.get("exclude"), "excluded")
+    if set(include) & set(exclude):
+        raise ValueError("A player cannot be both included and excluded")
+    if len(include) > 11 or len(squad.index) - len(exclude) < 11:
+        raise ValueError("include/exclude leave no valid XI")
+    venue, pitch, weather = payload.get("venue"), payload.get("pitch"), payload.get("weather")
+    tilt = _xi_condition_tilt(fmt, venue, pitch, weather)
+
+    member = _xi_membership(n)
+    keep = np.ones(len(member), dtype=bool)
+    # A player listed twice in the squad may fill only one of the eleven places.
+    for rows in squad.index.values():
+        if len(rows) > 1:
+            keep &= member[:, list(rows)].sum(axis=1) <= 1
+    for rows in include:
+        keep &= member[:, list(rows)].sum(axis=1) >= 1
+    for rows in exclude:
+        keep &= member[:, list(rows)].sum(axis=1) == 0
+    member = member[keep]
+
+    batting = (member @ cols["bat_idx"]) / np.maximum(1.0, member @ cols["bat_ok"])
+    bowling = (member @ cols["bowl_idx"]) / np.maximum(1.0, member @ cols["bowl_ok"])
+    rating = (member @ cols["rating"]) / 11.0
+    roles = member @ cols["roles"]
+    bowling_options = roles[:, 2] + roles[:, 3]
+    batting_depth = roles[:, 0] + roles[:, 1] + roles[:, 2]
+    role_balance = 100.0 - np.where(roles[:, 1] == 0, 12.0, 0.0)
+    role_balance -= np.maximum(0.0, 5.0 - bowling_options) * 7.0
+    role_balance -= np.maximum(0.0, 6.0 - batting_depth) * 5.0
+    role_balance = np.clip(role_balance, 50.0, 100.0)
+    score = (batting * 0.30 * (1.0 + tilt)) + (bowling * 0.30 * (1.0 - tilt)) + (rating * 0.25) + (role_balance * 0.15)
+
+    checks = {
+        "wicketkeeper": roles[:, 1] < 1,
+        "bowling_options": bowling_options < 5,
+        "openers": (member @ cols["opener"]) < 2,
+        "finishers": (member @ cols["finisher"]) < 2,
+    }
+    violations = sum(v.astype(np.int8) for v in checks.values())
+    order = np.lexsort((-score, violations))
+    if len(squad.index) < n:
+        # The same eleven names can come from either row of a duplicated player; keep the better one.
+        seen: set[frozenset] = set()
+        distinct = []
+        for row in order:
+            names = frozenset(cols["names"][i] for i in np.flatnonzero(member[row]))
+            if names not in seen:
+                seen.add(names)
+                distinct.append(row)
+                if len(distinct) == top_k:
+                    break
+        order = np.array(distinct, dtype=np.intp)
+    order = order[:top_k]
+
+    xis = []
+    for rank, row in enumerate(order, start=1):
+        picked = np.flatnonzero(member[row])
+        xi = squad.players(picked)
+        players = [p["name"] for p in xi]
+        xis.append(
+            {
+                "rank": rank,
+                "players": players,
+                "bench": [name for name in dict.fromkeys(cols["names"]) if name not in players],
+                "score": round(float(score[row]), 2),
+                "breakdown": squad_breakdown(squad, picked),
+                "validation": squad_validation(squad, picked),
+                "unmet": [name for name, failed in checks.items() if failed[row]],
+            }
+        )
+    return {
+        "team": team,
+        "format": fmt,
+        "conditions": {"venue": venue, "pitch": pitch, "weather": weather, "batting_tilt": round(tilt, 3)},
+        "evaluated": int(len(member)),
+        "feasible": int((violations == 0).sum()),
+        "xis": xis,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 2),
+    }
+
+
 def batter_remaining_simulation(
     fmt: str,
     xi: list[dict],
@@ -612,6 +1052,69 @@ def phase_projections(fmt: str, overs_done: float, score: int, projected_total:
     return {"phases": out}
 
 
+def _phase_projection_rows(fmt: str, balls_bowled: np.ndarray, score: np.ndarray, projected_total: np.ndarray) -> list[dict[str, Any]]:
+    """phase_projections for many states: the same float steps as arrays, one phases dict per state."""
+    max_overs = FORMAT_RULES[fmt]["max_overs"]
+    if fmt == "t20":
+        phases = [("Powerplay", 0, 6, 1.05), ("Middle", 6, 15, 0.95), ("Death", 15, 20, 1.25)]
+    else:
+        phases = [("Powerplay", 0, 10, 0.98), ("Middle", 10, 40, 0.94), ("Death", 40, 50, 1.15)]
+    overs_done = balls_bowled / 6.0
+    current_rr = score / np.maximum(0.1, overs_done)
+    remaining_total = np.maximum(0, projected_total - score)
+    lengths, played, remaining, raw_add = [], [], [], []
+    for _, start, end, mult in phases:
+        phase_len = max(0.0, min(end, max_overs) - start)
+        lengths.append(phase_len)
+        done = np.minimum(np.maximum(overs_done - start, 0.0), phase_len)
+        left = np.maximum(0.0, phase_len - done)
+        played.append(done)
+        remaining.append(left)
+        raw_add.append(np.maximum(0.0, left * current_rr * mult))
+    # Closed phases add 0.0, so summing all three matches the scalar sum over open phases.
+    total_raw = 0 + raw_add[0] + raw_add[1] + raw_add[2]
+    is_open = [left > 0 for left in remaining]
+    last_open = np.where(is_open[2], 2, np.where(is_open[1], 1, 0))
+    allocated = np.zeros(len(score), dtype=np.int64)
+    runs = []
+    for k in range(3):
+        share = np.rint((raw_add[k] / np.where(total_raw > 0, total_raw, 1.0)) * remaining_total).astype(np.int64)
+        add = np.where(last_open == k, np.maximum(0, remaining_total - allocated), share)
+        add = np.where(is_open[k] & (total_raw > 0), add, 0)
+        allocated += np.where(is_open[k] & (last_open != k), add, 0)
+        runs.append(np.maximum(0, add))
+    cumulative = []
+    prev = score.astype(np.int64)
+    for k in range(3):
+        prev = prev + np.where(is_open[k], runs[k], 0)
+        cumulative.append(np.minimum(projected_total, prev))
+
+    columns = [
+        (name, start, min(end, max_overs), phase_len, done.tolist(), left.tolist(), add.tolist(), cum.tolist())
+        for (name, start, end, _), phase_len, done, left, add, cum in zip(phases, lengths, played, remaining, runs, cumulative)
+    ]
+    rows = []
+    for j in range(len(score)):
+        out = []
+        for name, start, phase_end, phase_len, done, left, add, cum in columns:
+            remaining_j = left[j]
+            out.append(
+                {
+                    "phase": name,
+                    "start_over": start,
+                    "end_over": phase_end,
+                    "status": "completed" if remaining_j <= 0 else ("live" if done[j] > 0 else "upcoming"),
+                    # A fully played phase clamps to its (integer) length, as _clamp does on the scalar path.
+                    "played_overs": round(done[j], 2) if done[j] < phase_len else phase_len,
+                    "remaining_overs": round(remaining_j, 2),
+                    "runs": add[j],
+                    "cumulative": cum[j] if remaining_j > 0 else None,
+                }
+            )
+        rows.append({"phases": out})
+    return rows
+
+
 def head_to_head_overlay(team1: str, team2: str, fmt: str) -> dict[str, Any]:
     key = tuple(sorted([team1, team2]))
     pair = H2H_DATA.get(key, {})
@@ -623,7 +1126,163 @@ def head_to_head_overlay(team1: str, team2: str, fmt: str) -> dict[str, Any]:
     return {"team1_wins": h2h_fmt[team1], "team2_wins": h2h_fmt[team2], "total": h2h_fmt[team1] + h2h_fmt[team2]}
 
 
-def predict_score(payload: dict[str, Any]) -> dict[str, Any]:
+# predict_score blend weights, caps and spreads. The defaults are the hand-tuned values;
+# `python -m api.calibrate` fits them on the history store and writes a versioned JSON file.
+DEFAULT_SCORE_COEFFICIENTS: dict[str, dict[str, Any]] = {
+    "t20": {
+        "blend_dls": 0.38,
+        "blend_pace": 0.34,
+        "blend_par": 0.28,
+        "rr_bias": 7.0,
+        "phase_accel": 1.06,
+        "wickets_exp": 0.62,
+        "tempo_wickets": 0.38,
+        "base_weight": 0.82,
+        "batter_weight": 0.18,
+        "par_cap": None,
+        "rr_cap_base": 8.4,
+        "rr_cap_wicket": 0.3,
+        "rr_cap_late": 0.6,
+        "rr_cap_late_overs": 4.0,
+        "spread_base": 7,
+        "spread_over": 1.15,
+        "spread_wicket": 1.2,
+        "spread_min": 4,
+    },
+    "odi": {
+        "blend_dls": 0.38,
+        "blend_pace": 0.34,
+        "blend_par": 0.28,
+        "rr_bias": 3.2,
+        "phase_accel": 1.02,
+        "wickets_exp": 0.75,
+        "tempo_wickets": 0.25,
+        "base_weight": 0.82,
+        "batter_weight": 0.18,
+        "par_cap": 95,
+        "rr_cap_base": 6.2,
+        "rr_cap_wicket": 0.22,
+        "rr_cap_late": 0.35,
+        "rr_cap_late_overs": 10.0,
+        "spread_base": 11,
+        "spread_over": 0.9,
+        "spread_wicket": 0.9,
+        "spread_min": 6,
+    },
+}
+_INT_COEFFICIENTS = ("spread_base", "spread_min", "par_cap")
+COEFFICIENTS_PATH = os.environ.get("CRICKET_COEFFICIENTS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "coefficients.json"))
+
+
+def load_score_coefficients(path: str | None = None) -> tuple[str, dict[str, dict[str, Any]]]:
+    """(version, per-format coefficients): a fitted file overrides the defaults key by key; no file means defaults."""
+    path = path or COEFFICIENTS_PATH
+    coefficients = {fmt: dict(values) for fmt, values in DEFAULT_SCORE_COEFFICIENTS.items()}
+    if not os.path.exists(path):
+        return "default", coefficients
+    with open(path, encoding="utf-8") as fh:
+        doc = json.load(fh)
+    for fmt, values in (doc.get("formats") or {}).items():
+        if fmt not in coefficients:
+            raise ValueError(f"Unknown format '{fmt}' in coefficients file {path}")
+        unknown = set(values) - set(coefficients[fmt])
+        if unknown:
+            raise ValueError(f"Unknown coefficients {sorted(unknown)} in {path}")
+        for key, value in values.items():
+            if value is None:
+                coefficients[fmt][key] = None
+            else:
+                coefficients[fmt][key] = int(round(value)) if key in _INT_COEFFICIENTS else float(value)
+    for fmt, coef in coefficients.items():
+        # explain_score's attribution steps are only additive when the blend weights sum to 1.
+        blend = [coef["blend_dls"], coef["blend_pace"], coef["blend_par"]]
+        if min(blend) < 0 or abs(sum(blend) - 1.0) > 1e-6:
+            raise ValueError(f"Blend weights for {fmt} in {path} must be non-negative and sum to 1")
+    return str(doc.get("version", "unversioned")), coefficients
+
+
+def _startup_coefficients() -> tuple[str, dict[str, dict[str, Any]]]:
+    """load_score_coefficients for import time: a broken coefficients file must not take the app down."""
+    try:
+        return load_score_coefficients()
+    except (OSError, ValueError, TypeError, AttributeError) as exc:
+        logging.getLogger(__name__).warning("Ignoring coefficients file %s, using defaults: %s", COEFFICIENTS_PATH, exc)
+        return "default", {fmt: dict(values) for fmt, values in DEFAULT_SCORE_COEFFICIENTS.items()}
+
+
+SCORE_COEFFICIENTS_VERSION, SCORE_COEFFICIENTS = _startup_coefficients()
+
+
+@lru_cache(maxsize=16)
+def _wickets_curve(exp: float) -> np.ndarray:
+    return np.array([max(0.62, ((10 - w) / 10.0) ** exp) for w in range(11)])
+
+
+def _batting_context(fmt: str, batting_team: str, selected_xi: Any) -> dict[str, Any]:
+    profile = xi_profile(batting_team, fmt, selected_xi)
+    return {"xi": profile.players, "team_profile": profile.breakdown, "xi_check": profile.validation}
+
+
+def _bowling_context(fmt: str, bowling_team: str, bowling_xi: Any) -> dict[str, Any]:
+    warnings: list[str] = []
+    bowling_impact = death_bowling_impact(fmt, [])
+    bowl_xi: tuple = ()
+    if bowling_team and bowling_team in TEAM_DATA:
+        try:
+            bowl_profile = xi_profile(bowling_team, fmt, bowling_xi)
+        except ValueError:
+            warnings.append("Bowling XI incomplete; using default bowling profile.")
+            bowl_profile = xi_profile(bowling_team, fmt, None)
+        bowling_impact = bowl_profile.death_bowling
+        bowl_xi = bowl_profile.players
+    return {"warnings": warnings, "bowling_impact": bowling_impact, "bowl_xi": bowl_xi}
+
+
+def _ground_context(fmt: str, venue_name: Any, pitch: Any, weather: Any) -> dict[str, Any]:
+    venue = venue_profile(venue_name)
+    par = venue_average(fmt, venue_name)
+    return {
+        "par": par,
+        "boundary_factor": {"Small": 1.03, "Medium": 1.0, "Large": 0.97}.get(venue.get("boundary_size", "Medium"), 1.0),
+        "death_context": death_overs_venue_factor(fmt, venue, pitch, weather, par),
+        "condition": condition_multiplier(pitch, weather),
+        "toss_impact": toss_impact(fmt, venue_name, weather),
+        "has_venue": bool(venue_name),
+    }
+
+
+def _predict_context(payload: dict[str, Any], fmt: str, parts: dict[tuple, dict[str, Any]] | None = None) -> dict[str, Any]:
+    """Resolve everything predict_score needs that does not depend on score, balls or wickets.
+
+    The batting, bowling and ground parts are built once per key in parts when a batch passes one in.
+    """
+    parts = {} if parts is None else parts
+    batting_team = str(payload.get("batting_team", ""))
+    bowling_team = str(payload.get("bowling_team", "")).strip()
+    bat_key = ("bat", fmt, batting_team, tuple(payload.get("selected_xi") or ()))
+    if bat_key not in parts:
+        parts[bat_key] = _batting_context(fmt, batting_team, payload.get("selected_xi", []))
+    bowl_key = ("bowl", fmt, bowling_team, tuple(payload.get("bowling_xi") or ()))
+    if bowl_key not in parts:
+        parts[bowl_key] = _bowling_context(fmt, bowling_team, payload.get("bowling_xi", []))
+    ground_key = ("ground", fmt, payload.get("venue"), payload.get("pitch"), payload.get("weather"))
+    if ground_key not in parts:
+        parts[ground_key] = _ground_context(fmt, payload.get("venue"), payload.get("pitch"), payload.get("weather"))
+    return {
+        "batting_team": batting_team,
+        **parts[bat_key],
+        **parts[bowl_key],
+        **parts[ground_key],
+        "toss": toss_adjustment(fmt, payload.get("toss_winner"), payload.get("toss_decision"), batting_team=batting_team),
+    }
+
+
+def predict_score(payload: dict[str, Any], trace: dict[str, Any] | None = None) -> dict[str, Any]:
+    """Score projection; pass a dict as trace (or "trace": true in the payload) to record every intermediate step."""
+    if trace is None and payload.get("trace"):
+        trace = {}
+        result = predict_score({k: v for k, v in payload.items() if k != "trace"}, trace)
+        return {**result, "trace": trace}
     fmt = format_key(payload.get("format"))
     rules = FORMAT_RULES[fmt]
     warnings: list[str] = []
@@ -639,13 +1298,12 @@ def predict_score(payload: dict[str, Any]) -> dict[str, Any]:
     if balls_bowled == 0:
         raise ValueError("Overs must be greater than 0")
 
-    overs_done = balls_bowled / 6.0
     balls_left = (rules["max_overs"] * 6) - balls_bowled
-    overs_left = balls_left / 6.0
-
     if wickets >= 10 or balls_left <= 0:
         if wickets >= 10:
             warnings.append("All out: innings is already closed.")
+        if trace is not None:
+            trace.update({"components": {}, "multipliers": {}, "caps": [], "steps": [{"step": "Innings Closed", "value": float(score), "delta": float(score)}]})
         return {
             "low": score,
             "avg": score,
@@ -658,20 +1316,22 @@ def predict_score(payload: dict[str, Any]) -> dict[str, Any]:
             "warnings": warnings,
         }
 
-    batting_team = str(payload.get("batting_team", ""))
-    selected = payload.get("selected_xi", [])
-    team_players = get_team_players(batting_team, fmt)
-    xi = pick_players(team_players, selected)
-    team_profile = team_breakdown(xi, fmt)
-    xi_check = xi_validator(xi, fmt)
-    bowling_team = str(payload.get("bowling_team", "")).strip()
-    bowl_xi: list[dict] = []
-    if bowling_team and bowling_team in TEAM_DATA:
-        try:
-            bowl_xi = pick_players(get_team_players(bowling_team, fmt), payload.get("bowling_xi", []))
-        except ValueError:
-            warnings.append("Bowling XI incomplete; using default bowling profile.")
-            bowl_xi = get_team_players(bowling_team, fmt)[:11]
+    return _predict_from_context(fmt, _predict_context(payload, fmt), score, wickets, balls_bowled, trace)
+
+
+def _predict_from_context(
+    fmt: str, ctx: dict[str, Any], score: int, wickets: int, balls_bowled: int, trace: dict[str, Any] | None = None
+) -> dict[str, Any]:
+    """The score/wickets/balls-dependent half of predict_score, for an innings still in progress."""
+    rules = FORMAT_RULES[fmt]
+    coef = SCORE_COEFFICIENTS[fmt]
+    warnings = list(ctx["warnings"])
+    overs_done = balls_bowled / 6.0
+    balls_left = (rules["max_overs"] * 6) - balls_bowled
+    overs_left = balls_left / 6.0
+    xi = ctx["xi"]
+    team_profile = ctx["team_profile"]
+    xi_check = ctx["xi_check"]
 
     crr = score / overs_done
     dls_remaining = dls_resource_remaining(fmt, overs_left, wickets)
@@ -680,37 +1340,48 @@ def predict_score(payload: dict[str, Any]) -> dict[str, Any]:
 
     wickets_in_hand = 10 - wickets
     phase_ratio = overs_done / rules["max_overs"]
-    venue = venue_profile(payload.get("venue"))
-    boundary_factor = {"Small": 1.03, "Medium": 1.0, "Large": 0.97}.get(venue.get("boundary_size", "Medium"), 1.0)
-    base_accel = 1.06 if fmt == "t20" else 1.02
-    phase_accel = 0.95 + (phase_ratio * base_accel)
-    wickets_curve = max(0.62, (wickets_in_hand / 10.0) ** (0.62 if fmt == "t20" else 0.75))
-    tempo_factor = phase_accel * (0.82 + wickets_curve * (0.38 if fmt == "t20" else 0.25))
+    boundary_factor = ctx["boundary_factor"]
+    phase_accel = 0.95 + (phase_ratio * coef["phase_accel"])
+    wickets_curve = max(0.62, (wickets_in_hand / 10.0) ** coef["wickets_exp"])
+    tempo_factor = phase_accel * (0.82 + wickets_curve * coef["tempo_wickets"])
     pace_projection = score + (crr * overs_left * tempo_factor * boundary_factor)
-    par = venue_average(fmt, payload.get("venue"))
-    death_context = death_overs_venue_factor(fmt, venue, payload.get("pitch"), payload.get("weather"), par)
-    bowling_impact = death_bowling_impact(fmt, bowl_xi)
-
-    live_rr_bias = (crr - (par / rules["max_overs"])) * (7.0 if fmt == "t20" else 3.2)
-    combined = (dls_projection * 0.38) + (pace_projection * 0.34) + (par * 0.28) + live_rr_bias
-    combined *= condition_multiplier(payload.get("pitch"), payload.get("weather"))
-    combined *= 1 + ((team_profile["overall"] - 75.0) / 700.0)
-    combined *= 1 + toss_adjustment(
-        fmt,
-        payload.get("toss_winner"),
-        payload.get("toss_decision"),
-        batting_team=batting_team,
-    )
+    par = ctx["par"]
+    death_context = ctx["death_context"]
+    bowling_impact = ctx["bowling_impact"]
+
+    live_rr_bias = (crr - (par / rules["max_overs"])) * coef["rr_bias"]
+    combined = (dls_projection * coef["blend_dls"]) + (pace_projection * coef["blend_pace"]) + (par * coef["blend_par"]) + live_rr_bias
+    # Running value after each stage; consecutive differences are exact additive attributions.
+    steps: list[tuple[str, float]] = [
+        ("Venue Baseline", par),
+        ("DLS Resource Projection", par + (dls_projection - par) * coef["blend_dls"]),
+        ("Live Pace Projection", par + (dls_projection - par) * coef["blend_dls"] + (pace_projection - par) * coef["blend_pace"]),
+        ("Live Momentum", combined),
+    ]
     death_influence = _clamp((phase_ratio - 0.45) / 0.55, 0.0, 1.0)
-    combined *= 1 + ((death_context["multiplier"] - 1.0) * (0.2 + death_influence * 0.8))
-    combined *= 1 + ((bowling_impact["multiplier"] - 1.0) * (0.2 + death_influence * 0.8))
-
-    if fmt == "odi":
-        max_reasonable = min(rules["score_ceiling"], par + 95)
+    multipliers = {
+        "Pitch + Weather": ctx["condition"],
+        "XI Strength": 1 + ((team_profile["overall"] - 75.0) / 700.0),
+        "Toss": 1 + ctx["toss"],
+        "Death Venue Effect": 1 + ((death_context["multiplier"] - 1.0) * (0.2 + death_influence * 0.8)),
+        "Opposition Death Bowling": 1 + ((bowling_impact["multiplier"] - 1.0) * (0.2 + death_influence * 0.8)),
+    }
+    for name, mult in multipliers.items():
+        combined *= mult
+        steps.append((name, combined))
+
+    caps: list[str] = []
+    if coef["par_cap"] is not None:
+        max_reasonable = min(rules["score_ceiling"], par + coef["par_cap"])
+        if combined > max_reasonable:
+            caps.append(f"{fmt.upper()} ceiling par+{coef['par_cap']} ({max_reasonable:.0f})")
         combined = min(combined, max_reasonable)
 
+    if not rules["score_floor"] <= combined <= rules["score_ceiling"]:
+        caps.append("Format score floor/ceiling")
     combined = max(rules["score_floor"], min(rules["score_ceiling"], combined))
     avg_base = max(score, int(round(combined)))
+    steps.append(("Score Limits", avg_base))
 
     # Build a phase-aware remaining-runs envelope instead of a flat % spread.
     # This keeps late-innings (death overs) ranges realistic and always anchored
@@ -719,43 +1390,77 @@ def predict_score(payload: dict[str, Any]) -> dict[str, Any]:
     phase_weight = _clamp(0.45 + (phase_ratio * 0.5), 0.45, 0.9)
     base_rr = (crr * phase_weight) + (model_rr * (1.0 - phase_weight))
     batter_projection = batter_remaining_simulation(fmt, xi, wickets, balls_left, score)
-    avg = int(round((avg_base * 0.82) + (batter_projection["projected_total"] * 0.18)))
+    avg = int(round((avg_base * coef["base_weight"]) + (batter_projection["projected_total"] * coef["batter_weight"])))
+    steps.append(("Remaining Batters Upside", avg))
     avg = max(score, min(rules["score_ceiling"], avg))
 
     # Late-innings realism cap: avoid exaggerated jumps from current score.
-    if fmt == "t20":
-        rr_cap = 8.4 + (wickets_in_hand * 0.3) + (0.6 if overs_left <= 4.0 else 0.0)
-    else:
-        rr_cap = 6.2 + (wickets_in_hand * 0.22) + (0.35 if overs_left <= 10.0 else 0.0)
+    rr_cap = coef["rr_cap_base"] + (wickets_in_hand * coef["rr_cap_wicket"]) + (coef["rr_cap_late"] if overs_left <= coef["rr_cap_late_overs"] else 0.0)
     max_context_total = score + int(round(max(0.0, overs_left) * rr_cap))
+    if avg > max_context_total:
+        caps.append(f"Late-innings run-rate cap {rr_cap:.2f} ({max_context_total})")
     avg = min(avg, max_context_total)
+    steps.append(("Late-Innings Cap", avg))
 
     # Construct symmetric band around avg; avg is always midpoint.
-    base_spread = (7 if fmt == "t20" else 11) + int(round(overs_left * (1.15 if fmt == "t20" else 0.9)))
-    wicket_adj = int(round((10 - wickets_in_hand) * (1.2 if fmt == "t20" else 0.9)))
-    spread = max(4 if fmt == "t20" else 6, base_spread - wicket_adj)
+    base_spread = coef["spread_base"] + int(round(overs_left * coef["spread_over"]))
+    wicket_adj = int(round((10 - wickets_in_hand) * coef["spread_wicket"]))
+    spread = max(coef["spread_min"], base_spread - wicket_adj)
 
     low = max(score, avg - spread)
     high = min(rules["score_ceiling"], avg + spread)
     if high <= low:
         high = min(rules["score_ceiling"], low + (2 if fmt == "t20" else 4))
     avg = int(round((low + high) / 2.0))
+    steps.append(("Band Centring", avg))
 
     shock = wicket_shock_model(fmt, score, avg, wickets, balls_left, base_rr, bowling_impact["multiplier"])
+    if shock["if_wicket_next_over_total"] < low:
+        caps.append(f"Wicket-shock floor ({shock['if_wicket_next_over_total']})")
     low = max(score, min(low, shock["if_wicket_next_over_total"]))
     if high <= low:
         high = min(rules["score_ceiling"], low + (2 if fmt == "t20" else 4))
     avg = int(round((low + high) / 2.0))
+    steps.append(("Wicket Shock", avg))
     uncertainty = (high - low) / max(1.0, float(avg))
     confidence = 38.0 + (phase_ratio * 34.0) + ((1.0 - _clamp(uncertainty, 0.0, 1.0)) * 22.0)
     confidence -= len(xi_check["warnings"]) * 4.0
-    if not payload.get("venue"):
+    if not ctx["has_venue"]:
         confidence -= 3.0
     if wickets >= 4 and overs_left > (6 if fmt == "t20" else 14):
         confidence -= 5.0
     confidence = _clamp(confidence, 20.0, 96.0)
     confidence_band = "High" if confidence >= 72 else ("Medium" if confidence >= 50 else "Low")
 
+    if trace is not None:
+        prev = 0.0
+        trace_steps = []
+        for name, value in steps:
+            trace_steps.append({"step": name, "value": float(value), "delta": float(value) - prev})
+            prev = float(value)
+        trace.update(
+            {
+                "components": {
+                    "crr": crr,
+                    "par": par,
+                    "par_rr": par / rules["max_overs"],
+                    "dls_used": dls_used,
+                    "dls_projection": dls_projection,
+                    "tempo_factor": tempo_factor,
+                    "pace_projection": pace_projection,
+                    "live_rr_bias": live_rr_bias,
+                    "death_influence": death_influence,
+                    "avg_base": avg_base,
+                    "batter_total": batter_projection["projected_total"],
+                    "max_context_total": max_context_total,
+                    "spread": spread,
+                },
+                "multipliers": multipliers,
+                "caps": caps,
+                "steps": trace_steps,
+            }
+        )
+
     return {
         "low": low,
         "avg": avg,
@@ -763,9 +1468,9 @@ def predict_score(payload: dict[str, Any]) -> dict[str, Any]:
         "par": int(round(par)),
         "resource_used": round(dls_used, 1),
         "team_overall": team_profile["overall"],
-        "warnings": warnings + xi_check["warnings"],
+        "warnings": warnings + list(xi_check["warnings"]),
         "xi_validation": xi_check,
-        "toss_impact": toss_impact(fmt, payload.get("venue"), payload.get("weather")),
+        "toss_impact": ctx["toss_impact"],
         "phase_projection": phase_projections(fmt, overs_done, score, avg),
         "death_context": death_context,
         "opponent_death_bowling": bowling_impact,
@@ -776,54 +1481,1253 @@ def predict_score(payload: dict[str, Any]) -> dict[str, Any]:
     }
 
 
-def explain_score(payload: dict[str, Any]) -> dict[str, Any]:
-    fmt = format_key(payload.get("format"))
-    base = predict_score(payload)
-    rules = FORMAT_RULES[fmt]
-    max_overs = rules["max_overs"]
-    score = int(payload.get("score", 0))
-    wickets = int(payload.get("wickets", 0))
-    balls_bowled = overs_to_balls(float(payload.get("overs", 0.0)), max_overs)
-    overs_done = max(0.1, balls_bowled / 6.0)
-    crr = score / overs_done
-    par_rr = float(base["par"]) / max_overs
-    wickets_in_hand = max(0, 10 - wickets)
-    overs_left = max(0.0, (max_overs * 6 - balls_bowled) / 6.0)
+def _score_blend_arrays(
+    fmt: str,
+    score: np.ndarray,
+    wickets: np.ndarray,
+    balls_bowled: np.ndarray,
+    ctx: dict[str, np.ndarray],
+    coef: dict[str, Any] | None = None,
+) -> dict[str, np.ndarray]:
+    """Vectorized twin of the predict_score blend; every step mirrors the scalar path operation for operation."""
+    rules = FORMAT_RULES[fmt]
+    coef = coef or SCORE_COEFFICIENTS[fmt]
+    t20 = fmt == "t20"
+    max_overs = rules["max_overs"]
+    ceiling = rules["score_ceiling"]
+    score_f = score.astype(float)
+    overs_done = balls_bowled / 6.0
+    balls_left = (max_overs * 6) - balls_bowled
+    overs_left = balls_left / 6.0
+
+    crr = score_f / overs_done
+    dls_remaining = dls_resource_grid_lookup(fmt, balls_left, wickets)
+    dls_used = np.maximum(1.0, 100.0 - dls_remaining)
+    dls_projection = score_f * (100.0 / dls_used)
+
+    wickets_in_hand = 10 - wickets
+    phase_ratio = overs_done / max_overs
+    phase_accel = 0.95 + (phase_ratio * coef["phase_accel"])
+    tempo_factor = phase_accel * (0.82 + _wickets_curve(coef["wickets_exp"])[wickets] * coef["tempo_wickets"])
+    pace_projection = score_f + (crr * overs_left * tempo_factor * ctx["boundary_factor"])
+    par = ctx["par"]
+
+    live_rr_bias = (crr - (par / max_overs)) * coef["rr_bias"]
+    combined = (dls_projection * coef["blend_dls"]) + (pace_projection * coef["blend_pace"]) + (par * coef["blend_par"]) + live_rr_bias
+    combined = combined * ctx["condition"]
+    combined = combined * (1 + ((ctx["overall"] - 75.0) / 700.0))
+    combined = combined * (1 + ctx["toss"])
+    death_influence = np.maximum(0.0, np.minimum(1.0, (phase_ratio - 0.45) / 0.55))
+    combined = combined * (1 + ((ctx["death_mult"] - 1.0) * (0.2 + death_influence * 0.8)))
+    combined = combined * (1 + ((ctx["bowl_mult"] - 1.0) * (0.2 + death_influence * 0.8)))
+
+    if coef["par_cap"] is not None:
+        combined = np.minimum(combined, np.minimum(ceiling, par + coef["par_cap"]))
+    combined = np.maximum(rules["score_floor"], np.minimum(ceiling, combined))
+    avg_base = np.maximum(score_f, np.rint(combined))
+
+    model_rr = avg_base / max_overs
+    phase_weight = np.maximum(0.45, np.minimum(0.9, 0.45 + (phase_ratio * 0.5)))
+    base_rr = (crr * phase_weight) + (model_rr * (1.0 - phase_weight))
+    avg = np.rint((avg_base * coef["base_weight"]) + (ctx["batter_total"] * coef["batter_weight"]))
+    avg = np.maximum(score_f, np.minimum(ceiling, avg))
+
+    rr_cap = coef["rr_cap_base"] + (wickets_in_hand * coef["rr_cap_wicket"]) + np.where(overs_left <= coef["rr_cap_late_overs"], coef["rr_cap_late"], 0.0)
+    avg = np.minimum(avg, score_f + np.rint(np.maximum(0.0, overs_left) * rr_cap))
+
+    base_spread = coef["spread_base"] + np.rint(overs_left * coef["spread_over"])
+    wicket_adj = np.rint((10 - wickets_in_hand) * coef["spread_wicket"])
+    spread = np.maximum(coef["spread_min"], base_spread - wicket_adj)
+    bump = 2 if t20 else 4
+
+    low = np.maximum(score_f, avg - spread)
+    high = np.minimum(ceiling, avg + spread)
+    high = np.where(high <= low, np.minimum(ceiling, low + bump), high)
+    avg = np.rint((low + high) / 2.0)
+
+    # wicket_shock_model, vectorized.
+    phase_shock = np.where(balls_left <= 18, 0.09, np.where(balls_left <= 36, 0.06, 0.03))
+    wicket_load = np.maximum(0, wickets - 3) * 0.05
+    bowling_shock = np.maximum(0.0, (1.0 / np.maximum(0.5, ctx["bowl_mult"])) - 1.0) * 0.35
+    shock_prob = np.maximum(0.12, np.minimum(0.72, 0.12 + phase_shock + wicket_load + bowling_shock))
+    run_penalty = base_rr * (1.7 if t20 else 2.3) * (1 + shock_prob * 0.9)
+    shock_total = np.maximum(score_f, np.rint(avg - run_penalty))
+
+    low = np.maximum(score_f, np.minimum(low, shock_total))
+    high = np.where(high <= low, np.minimum(ceiling, low + bump), high)
+    avg = np.rint((low + high) / 2.0)
+    uncertainty = (high - low) / np.maximum(1.0, avg)
+    confidence = 38.0 + (phase_ratio * 34.0) + ((1.0 - np.maximum(0.0, np.minimum(1.0, uncertainty))) * 22.0)
+    confidence = confidence - ctx["warn_count"] * 4.0
+    confidence = np.where(ctx["has_venue"], confidence, confidence - 3.0)
+    confidence = np.where((wickets >= 4) & (overs_left > (6 if t20 else 14)), confidence - 5.0, confidence)
+    confidence = np.maximum(20.0, np.minimum(96.0, confidence))
+
+    return {
+        "low": low.astype(int),
+        "avg": avg.astype(int),
+        "high": high.astype(int),
+        "dls_used": dls_used,
+        "shock_prob": shock_prob,
+        "shock_total": shock_total.astype(int),
+        "confidence": confidence,
+    }
+
+
+def _batter_projection_arrays(fmt: str, xi: list[dict], wickets: int, balls_left: np.ndarray) -> tuple[list[dict], np.ndarray, np.ndarray, np.ndarray]:
+    """batter_remaining_simulation for one XI/wickets pair across many balls_left values."""
+    active = xi[wickets:][:6]
+    ref_sr = 140.0 if fmt == "t20" else 90.0
+    ref_avg = 30.0 if fmt == "t20" else 42.0
+    weights: list[float] = []
+    for p in active:
+        intent = ((float(p.get("strike_rate", ref_sr)) / ref_sr) * 0.62) + ((float(p.get("bat_avg", ref_avg)) / ref_avg) * 0.38)
+        role = p.get("role", "")
+        if role == "All-Rounder":
+            intent += 0.06
+        elif role == "WK-Batter":
+            intent += 0.04
+        elif role == "Bowler":
+            intent -= 0.1
+        intent *= 1 + ((float(p.get("rating", 75.0)) - 75.0) / 520.0)
+        weights.append(max(0.05, intent))
+
+    total_w = sum(weights)
+    share = np.array([w / total_w for w in weights])
+    exact = share[None, :] * balls_left[:, None]
+    alloc = np.floor(exact).astype(int)
+    spill = balls_left - alloc.sum(axis=1)
+    order = np.argsort(-(exact - alloc), axis=1, kind="stable")
+    rank = np.empty_like(order)
+    np.put_along_axis(rank, order, np.arange(len(active))[None, :].repeat(len(balls_left), axis=0), axis=1)
+    alloc = alloc + (rank < spill[:, None])
+
+    death_boost = np.where((fmt == "t20") & (balls_left <= 30), 1.08, np.where(balls_left <= 60, 1.03, 1.0))
+    sr = np.array([float(p.get("strike_rate", ref_sr)) for p in active])
+    rpb = np.maximum(0.62, np.minimum(2.5 if fmt == "t20" else 1.75, (sr[None, :] / 100.0) * death_boost[:, None]))
+    runs = alloc * rpb
+    total = np.zeros(len(balls_left))
+    for j in range(len(active)):
+        total = total + np.where(alloc[:, j] > 0, runs[:, j], 0.0)
+    return active, alloc, runs, np.maximum(0, np.rint(total)).astype(int)
+
+
+def _batter_contributors(fmt: str, active: list[dict], alloc: list[int], runs: list[float]) -> list[dict[str, Any]]:
+    ref_sr = 140.0 if fmt == "t20" else 90.0
+    # Rank on rounded runs first (a stable sort, as on the scalar path) and only build the four rows kept.
+    ranked = sorted(((int(round(r)), i) for i, (balls, r) in enumerate(zip(alloc, runs)) if balls > 0), key=lambda x: x[0], reverse=True)
+    return [
+        {
+            "name": active[i]["name"],
+            "role": active[i].get("role", ""),
+            "balls": alloc[i],
+            "runs": r,
+            "strike_rate": round(float(active[i].get("strike_rate", ref_sr)), 1),
+        }
+        for r, i in ranked[:4]
+    ]
+
+
+def _context_columns(ctxs: list[dict[str, Any]]) -> dict[str, np.ndarray]:
+    return {
+        "par": np.array([c["par"] for c in ctxs], dtype=float),
+        "boundary_factor": np.array([c["boundary_factor"] for c in ctxs]),
+        "condition": np.array([c["condition"] for c in ctxs]),
+        "overall": np.array([c["team_profile"]["overall"] for c in ctxs]),
+        "toss": np.array([c["toss"] for c in ctxs], dtype=float),
+        "death_mult": np.array([c["death_context"]["multiplier"] for c in ctxs]),
+        "bowl_mult": np.array([c["bowling_impact"]["multiplier"] for c in ctxs], dtype=float),
+        "warn_count": np.array([len(c["xi_check"]["warnings"]) for c in ctxs]),
+        "has_venue": np.array([c["has_venue"] for c in ctxs]),
+    }
+
+
+def _score_inputs(states: list[Any]) -> tuple[list[dict[str, Any] | None], dict[str, dict[str, Any]]]:
+    """Per-format blend inputs for many states: context resolved once per distinct match setup.
+
+    Closed innings and invalid states are answered directly in the returned results list."""
+    results: list[dict[str, Any] | None] = [None] * len(states)
+    contexts: dict[tuple, dict[str, Any]] = {}
+    # Batting, bowling and ground parts shared by contexts that differ elsewhere (toss, the other side).
+    parts: dict[tuple, dict[str, Any]] = {}
+    pending: dict[str, list[tuple[int, tuple, int, int, int]]] = {f: [] for f in FORMAT_RULES}
+
+    for idx, payload in enumerate(states):
+        if not isinstance(payload, dict):
+            results[idx] = {"error": "Each state must be an object"}
+            continue
+        try:
+            fmt = format_key(payload.get("format"))
+            rules = FORMAT_RULES[fmt]
+            score = int(payload.get("score", 0))
+            wickets = int(payload.get("wickets", 0))
+            if score < 0:
+                raise ValueError("Score cannot be negative")
+            if wickets < 0 or wickets > 10:
+                raise ValueError("Wickets should be between 0 and 10")
+            balls_bowled = overs_to_balls(float(payload.get("overs", 0.0)), rules["max_overs"])
+            if balls_bowled == 0:
+                raise ValueError("Overs must be greater than 0")
+            balls_left = (rules["max_overs"] * 6) - balls_bowled
+            if wickets >= 10 or balls_left <= 0:
+                results[idx] = predict_score(payload)
+                continue
+
+            key = (
+                fmt,
+                str(payload.get("batting_team", "")),
+                tuple(payload.get("selected_xi") or ()),
+                str(payload.get("bowling_team", "")),
+                tuple(payload.get("bowling_xi") or ()),
+                payload.get("venue"),
+                payload.get("pitch"),
+                payload.get("weather"),
+                payload.get("toss_winner"),
+                payload.get("toss_decision"),
+            )
+            if key not in contexts:
+                contexts[key] = _predict_context(payload, fmt, parts)
+            pending[fmt].append((idx, key, score, wickets, balls_bowled))
+        except ValueError as exc:
+            results[idx] = {"error": str(exc)}
+        except (TypeError, KeyError):
+            results[idx] = {"error": "Unable to process score prediction"}
+
+    blocks: dict[str, dict[str, Any]] = {}
+    for fmt, rows in pending.items():
+        if not rows:
+            continue
+        score = np.array([r[2] for r in rows])
+        wickets = np.array([r[3] for r in rows])
+        balls_bowled = np.array([r[4] for r in rows])
+        balls_left = (FORMAT_RULES[fmt]["max_overs"] * 6) - balls_bowled
+        ctxs = [contexts[r[1]] for r in rows]
+        batter_add = np.zeros(len(rows), dtype=int)
+        batter_rows: list[Any] = [None] * len(rows)
+        # The batter projection only depends on the batting XI (format, team, selection) and wickets.
+        groups: dict[tuple, list[int]] = {}
+        for j, r in enumerate(rows):
+            groups.setdefault((r[1][:3], r[3]), []).append(j)
+        for (_, wk), members in groups.items():
+            key = rows[members[0]][1]
+            if len(members) < 8:
+                # Small groups are cheaper on the scalar path than through array setup.
+                for j in members:
+                    sim = batter_remaining_simulation(fmt, contexts[key]["xi"], wk, int(balls_left[j]), 0)
+                    batter_add[j] = sim["projected_additional_runs"]
+                    batter_rows[j] = sim["contributors"]
+                continue
+            members_arr = np.array(members)
+            active, alloc, runs, add = _batter_projection_arrays(fmt, contexts[key]["xi"], wk, balls_left[members_arr])
+            batter_add[members_arr] = add
+            for j, a_row, r_row in zip(members, alloc.tolist(), runs.tolist()):
+                batter_rows[j] = (active, a_row, r_row)
+        cols = _context_columns(ctxs)
+        cols["batter_total"] = score + batter_add
+        blocks[fmt] = {
+            "rows": rows,
+            "contexts": contexts,
+            "score": score,
+            "wickets": wickets,
+            "balls_bowled": balls_bowled,
+            "cols": cols,
+            "batter_add": batter_add,
+            "batter_rows": batter_rows,
+        }
+    return results, blocks
+
+
+def _predict_score_many(states: list[Any]) -> list[dict[str, Any]]:
+    """predict_score over many states: context parts resolved once per group, blend and phase split computed as arrays.
+
+    The gain over scalar calls comes from shared teams and venues; every state still gets its own response."""
+    results, blocks = _score_inputs(states)
+    for fmt, block in blocks.items():
+        rows, contexts = block["rows"], block["contexts"]
+        batter_add, batter_rows = block["batter_add"], block["batter_rows"]
+        out = _score_blend_arrays(fmt, block["score"], block["wickets"], block["balls_bowled"], block["cols"])
+        columns = {k: v.tolist() for k, v in out.items()}
+        phase_rows = _phase_projection_rows(fmt, block["balls_bowled"], block["score"], np.asarray(out["avg"]))
+
+        for j, (idx, key, sc, wk, bb) in enumerate(rows):
+            ctx = contexts[key]
+            add_runs = int(batter_add[j])
+            contributors = batter_rows[j] if isinstance(batter_rows[j], list) else _batter_contributors(fmt, *batter_rows[j])
+            low, avg, high = columns["low"][j], columns["avg"][j], columns["high"][j]
+            shock_prob = columns["shock_prob"][j]
+            confidence = columns["confidence"][j]
+            results[idx] = {
+                "low": low,
+                "avg": avg,
+                "high": high,
+                "par": int(round(ctx["par"])),
+                "resource_used": round(columns["dls_used"][j], 1),
+                "team_overall": ctx["team_profile"]["overall"],
+                "warnings": ctx["warnings"] + list(ctx["xi_check"]["warnings"]),
+                "xi_validation": ctx["xi_check"],
+                "toss_impact": ctx["toss_impact"],
+                "phase_projection": phase_rows[j],
+                "death_context": ctx["death_context"],
+                "opponent_death_bowling": ctx["bowling_impact"],
+                "batter_projection": {"projected_additional_runs": add_runs, "projected_total": sc + add_runs, "contributors": contributors},
+                "wicket_shock": {
+                    "next_over_wicket_prob": round(shock_prob * 100, 1),
+                    "if_wicket_next_over_total": columns["shock_total"][j],
+                    "label": "High" if shock_prob >= 0.42 else ("Moderate" if shock_prob >= 0.27 else "Low"),
+                },
+                "confidence": {"score": round(confidence, 1), "band": "High" if confidence >= 72 else ("Medium" if confidence >= 50 else "Low")},
+                "innings_closed": False,
+            }
+    return [r if r is not None else {"error": "Unable to process score prediction"} for r in results]
+
+
+def _grid_axis(spec: Any, name: str) -> list[float]:
+    """An axis is an explicit list or {"start", "stop", "step"} (stop inclusive)."""
+    if isinstance(spec, list):
+        values = [float(v) for v in spec]
+    elif isinstance(spec, dict):
+        start, stop, step = float(spec.get("start", 0)), float(spec.get("stop", 0)), float(spec.get("step", 1))
+        if step <= 0:
+            raise ValueError(f"{name} step must be positive")
+        count = int(math.floor(((stop - start) / step) + 1e-9)) + 1
+        values = [start + (i * step) for i in range(max(0, count))]
+    else:
+        raise ValueError(f"Provide '{name}' as a list or a {{start, stop, step}} range")
+    if not values:
+        raise ValueError(f"'{name}' axis is empty")
+    return values
+
+
+def predict_grid(payload: dict[str, Any]) -> dict[str, Any]:
+    """Projected low/avg/high over a (score x wickets x overs) grid for one match context, as nested arrays."""
+    fmt = format_key(payload.get("format"))
+    rules = FORMAT_RULES[fmt]
+    max_balls = rules["max_overs"] * 6
+    scores = [int(v) for v in _grid_axis(payload.get("score_axis"), "score_axis")]
+    wickets_axis = [int(v) for v in _grid_axis(payload.get("wickets_axis", {"start": 0, "stop": 9}), "wickets_axis")]
+    if "balls_axis" in payload:
+        balls_axis = [int(v) for v in _grid_axis(payload.get("balls_axis"), "balls_axis")]
+    else:
+        balls_axis = [overs_to_balls(v, rules["max_overs"]) for v in _grid_axis(payload.get("overs_axis"), "overs_axis")]
+    if min(scores) < 0:
+        raise ValueError("Score cannot be negative")
+    if min(wickets_axis) < 0 or max(wickets_axis) > 10:
+        raise ValueError("Wickets should be between 0 and 10")
+    if min(balls_axis) <= 0 or max(balls_axis) > max_balls:
+        raise ValueError(f"Overs must be greater than 0 and at most {rules['max_overs']}")
+    size = len(scores) * len(wickets_axis) * len(balls_axis)
+    if size > 200000:
+        raise ValueError("Grid is limited to 200000 states")
+
+    started = time.perf_counter()
+    ctx = _predict_context(payload, fmt)
+    shape = (len(scores), len(wickets_axis), len(balls_axis))
+    score = np.broadcast_to(np.array(scores)[:, None, None], shape).ravel()
+    wickets = np.broadcast_to(np.array(wickets_axis)[None, :, None], shape).ravel()
+    balls_bowled = np.broadcast_to(np.array(balls_axis)[None, None, :], shape).ravel()
+    balls_left = max_balls - balls_bowled
+
+    # The batter projection depends on (wickets, balls left) only; compute it once per pair.
+    batter_add = np.zeros(shape, dtype=int)
+    balls_left_axis = max_balls - np.array(balls_axis)
+    for j, wk in enumerate(wickets_axis):
+        if wk < 10:
+            batter_add[:, j, :] = _batter_projection_arrays(fmt, ctx["xi"], wk, balls_left_axis)[3][None, :]
+    cols = _context_columns([ctx])
+    cols["batter_total"] = score + batter_add.ravel()
+
+    live = (wickets < 10) & (balls_left > 0)
+    out = _score_blend_arrays(fmt, score[live], wickets[live], balls_bowled[live], {k: v if v.shape == (1,) else v[live] for k, v in cols.items()})
+    grids = {}
+    for key in ("low", "avg", "high"):
+        values = score.copy()
+        values[live] = out[key]
+        grids[key] = values.reshape(shape).tolist()
+    elapsed = max(1e-9, time.perf_counter() - started)
+    return {
+        "format": fmt,
+        "axes": {"score": scores, "wickets": wickets_axis, "balls": balls_axis, "overs": [float(f"{b // 6}.{b % 6}") for b in balls_axis]},
+        "shape": list(shape),
+        **grids,
+        "par": int(round(ctx["par"])),
+        "states": size,
+        "elapsed_ms": round(elapsed * 1000.0, 2),
+        "states_per_sec": round(size / elapsed, 1),
+    }
+
+
+def predict_score_batch(payload: dict[str, Any]) -> dict[str, Any]:
+    states = payload.get("states")
+    if not isinstance(states, list) or not states:
+        raise ValueError("Provide a non-empty 'states' list")
+    if len(states) > 5000:
+        raise ValueError("At most 5000 states per batch")
+    shared = payload.get("context") if isinstance(payload.get("context"), dict) else {}
+    if shared:
+        states = [{**shared, **s} if isinstance(s, dict) else s for s in states]
+
+    started = time.perf_counter()
+    results = _predict_score_many(states)
+    elapsed = max(1e-9, time.perf_counter() - started)
+    throughput: dict[str, Any] = {
+        "states": len(states),
+        "elapsed_ms": round(elapsed * 1000.0, 2),
+        "states_per_sec": round(len(states) / elapsed, 1),
+    }
+
+    if payload.get("compare_scalar"):
+        started = time.perf_counter()
+        scalar: list[dict[str, Any]] = []
+        for s in states:
+            try:
+                scalar.append(predict_score(s))
+            except ValueError as exc:
+                scalar.append({"error": str(exc)})
+            except Exception:
+                scalar.append({"error": "Each state must be an object" if not isinstance(s, dict) else "Unable to process score prediction"})
+        scalar_elapsed = max(1e-9, time.perf_counter() - started)
+        throughput["scalar_elapsed_ms"] = round(scalar_elapsed * 1000.0, 2)
+        throughput["scalar_states_per_sec"] = round(len(states) / scalar_elapsed, 1)
+        throughput["speedup"] = round(scalar_elapsed / elapsed, 2)
+        throughput["matches_scalar"] = scalar == results
+
+    return {"results": results, "throughput": throughput}
+
+
+# Per-ball outcome mix scaled by the target runs-per-ball m: P(6)=0.045m, P(4)=0.10m,
+# P(3)=0.005m, P(2)=0.06m, P(1)=0.195m, dot ball takes the rest. Mean runs is exactly m.
+_SIM_OUTCOME_EDGES = np.array([0.045, 0.145, 0.15, 0.21, 0.405])
+_SIM_OUTCOME_RUNS = np.array([6, 4, 3, 2, 1, 0])
+_SIM_PHASES = {
+    # (first over of phase, run factor, wicket factor)
+    "t20": ((0, 0.92, 0.95), (6, 0.93, 0.9), (15, 1.3, 1.35)),
+    "odi": ((0, 0.92, 0.95), (10, 0.92, 0.9), (40, 1.32, 1.3)),
+}
+# Striker slot for each (wickets down, other batter, latest arrival on strike) state of _sim_expected_runs.
+_SIM_STRIKER_SLOTS = np.stack(
+    [np.broadcast_to(np.arange(11)[None, :], (10, 11)), np.broadcast_to(np.arange(1, 11)[:, None], (10, 11))], axis=-1
+)
+_SIM_CHUNK = 5000
+_SIM_POOL_MIN = 40000
+_SIM_POOL: Any = None
+
+
+def _phase_factors(fmt: str) -> tuple[np.ndarray, np.ndarray]:
+    max_overs = FORMAT_RULES[fmt]["max_overs"]
+    runs = np.ones(max_overs)
+    wkts = np.ones(max_overs)
+    for start, run_f, wkt_f in _SIM_PHASES[fmt]:
+        runs[start:] = run_f
+        wkts[start:] = wkt_f
+    return runs / runs.mean(), wkts / wkts.mean()
+
+
+def _bowling_rotation(fmt: str, bowl_xi: list[dict]) -> list[dict[str, Any]]:
+    """Deterministic over-by-over bowler plan: best bowlers take the death overs, quotas and no back-to-back overs respected."""
+    max_overs = FORMAT_RULES[fmt]["max_overs"]
+    quota = max_overs // 5
+    ref_econ = 7.6 if fmt == "t20" else 5.4
+    ref_avg = 23.0 if fmt == "t20" else 32.0
+    options = [p for p in bowl_xi if float(p.get("economy", 0.0)) > 0 and float(p.get("bowl_avg", 0.0)) > 0]
+    options.sort(key=lambda p: (float(p["economy"]) / ref_econ) + (float(p["bowl_avg"]) / ref_avg))
+    part_timer = {"name": "Part-time", "economy": ref_econ * 1.15, "bowl_avg": ref_avg * 1.3}
+
+    plan: list[dict | None] = [None] * max_overs
+    left = [quota] * len(options)
+    death_start = _SIM_PHASES[fmt][-1][0]
+    order = list(range(max_overs - 1, death_start - 1, -1)) + list(range(death_start))
+    for over in order:
+        neighbours = {id(plan[o]) for o in (over - 1, over + 1) if 0 <= o < max_overs and plan[o] is not None}
+        pick = next((i for i, p in enumerate(options) if left[i] > 0 and id(p) not in neighbours), None)
+        if pick is None:
+            pick = next((i for i in range(len(options)) if left[i] > 0), None)
+        if pick is None:
+            plan[over] = part_timer
+        else:
+            plan[over] = options[pick]
+            left[pick] -= 1
+    return plan  # type: ignore[return-value]
+
+
+_PHASE_NAMES = ("Powerplay", "Middle", "Death")
+
+
+def _bowler_over_costs(fmt: str, bowlers: list[dict], overs: np.ndarray, wickets: int, par: float, condition: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Expected runs, wickets and net cost (runs less the future runs a wicket saves) per bowler per remaining over."""
+    max_overs = FORMAT_RULES[fmt]["max_overs"]
+    ref_econ = 7.6 if fmt == "t20" else 5.4
+    ref_avg = 23.0 if fmt == "t20" else 32.0
+    phase_run, phase_wkt = _phase_factors(fmt)
+    econ = np.array([float(p["economy"]) for p in bowlers])
+    strike = np.array([float(p["economy"]) / float(p["bowl_avg"]) for p in bowlers])
+    runs = (par / max_overs) * condition * np.clip(econ / ref_econ, 0.75, 1.3)[:, None] * phase_run[overs][None, :]
+    wkts = (ref_econ / ref_avg) * np.clip(strike / (ref_econ / ref_avg), 0.6, 1.6)[:, None] * phase_wkt[overs][None, :]
+    # A wicket mid-over costs the batting side the DLS resource gap between w and w + 1 wickets lost.
+    balls_left = (max_overs - overs) * 6 - 3
+    resource_gap = dls_resource_grid_lookup(fmt, balls_left, np.full(len(overs), wickets)) - dls_resource_grid_lookup(fmt, balls_left, np.full(len(overs), wickets + 1))
+    wicket_value = par * resource_gap / 100.0
+    return runs, wkts, runs - (wkts * wicket_value[None, :])
+
+
+def _allocate_phase_overs(cost: np.ndarray, demand: tuple[int, ...], quota: list[int], caps: list[tuple[int, ...]]) -> list[tuple[int, ...]]:
+    """DP over bowlers: table[d] is the cheapest way to cover d overs per phase with the bowlers seen so far."""
+    table = np.full(tuple(d + 1 for d in demand), np.inf)
+    table[(0,) * len(demand)] = 0.0
+    history: list[tuple[list[tuple[int, ...]], np.ndarray]] = []
+    for b in range(len(cost) - 1):
+        choices = [c for c in np.ndindex(*(cap + 1 for cap in caps[b])) if sum(c) <= quota[b]]
+        choice_cost = (np.array(choices) @ cost[b]).tolist()
+        best = np.full(table.shape, np.inf)
+        pick = np.zeros(table.shape, dtype=np.int32)
+        for k, choice in enumerate(choices):
+            dst = tuple(slice(x, None) for x in choice)
+            src = tuple(slice(0, d + 1 - x) for d, x in zip(demand, choice))
+            cand = table[src] + choice_cost[k]
+            better = cand < best[dst]
+            np.copyto(best[dst], cand, where=better)
+            np.copyto(pick[dst], k, where=better)
+        history.append((choices, pick))
+        table = best
+    # The last bowler only has to finish the full demand, so only that one cell is needed:
+    # taking c overs leaves table[demand - c], i.e. the table read backwards.
+    grid = np.indices(table.shape)
+    final = table[(slice(None, None, -1),) * len(demand)] + np.tensordot(cost[-1], grid, axes=1)
+    final[(grid.sum(axis=0) > quota[-1]) | np.any(grid > np.array(caps[-1]).reshape((-1,) + (1,) * len(demand)), axis=0)] = np.inf
+    last = tuple(int(x) for x in np.unravel_index(int(np.argmin(final)), final.shape))
+    if not np.isfinite(final[last]):
+        raise ValueError("Not enough bowling options to cover the remaining overs")
+    alloc: list[tuple[int, ...]] = [last]
+    state = tuple(d - x for d, x in zip(demand, last))
+    for choices, pick in reversed(history):
+        choice = choices[pick[state]]
+        alloc.append(choice)
+        state = tuple(d - x for d, x in zip(state, choice))
+    return alloc[::-1]
+
+
+def _can_finish(left: list[int], n: int, prev: int | None) -> bool:
+    """Whether n more overs can be covered from the quotas in left with no bowler taking two in a row.
+
+    A legal order exists exactly when counts fit under the quotas with each bowler on at most ceil(n/2)
+    overs, and prev (who bowled the over before) on at most floor(n/2) since they cannot open.
+    """
+    half = -(-n // 2)
+    return sum(min(q, n // 2 if b == prev else half) for b, q in enumerate(left)) >= n
+
+
+def _sequence_overs(net: np.ndarray, alloc: list[tuple[int, ...]], phase_of: np.ndarray, left: list[int], prev: int | None) -> list[int]:
+    """Over-by-over order following the phase allocation, cheapest first among bowlers that keep the rest of the innings legal."""
+    left = list(left)
+    planned = [list(a) for a in alloc]
+    plan: list[int] = []
+    for col, k in enumerate(phase_of.tolist()):
+        rest = len(phase_of) - col - 1
+        ready = []
+        for b in range(len(left)):
+            if b == prev or left[b] == 0:
+                continue
+            left[b] -= 1
+            if _can_finish(left, rest, b):
+                ready.append(b)
+            left[b] += 1
+        pick = min(ready, key=lambda b: (-planned[b][k], net[b, col]))
+        planned[pick][k] -= 1
+        left[pick] -= 1
+        plan.append(pick)
+        prev = pick
+    return plan
+
+
+def bowling_over_plan(
+    fmt: str,
+    bowl_xi: list[dict],
+    balls_bowled: int = 0,
+    wickets: int = 0,
+    par: float | None = None,
+    condition: float = 1.0,
+    bowler_overs: dict[str, Any] | None = None,
+    last_bowler: str | None = None,
+) -> dict[str, Any]:
+    """Assign every remaining over to a bowler, minimizing expected runs conceded net of wicket value.
+
+    Over counts per phase come from a DP over bowlers (quota and overs already bowled respected, at most
+    half of a phase's overs each); the innings is then sequenced over by over with no bowler, the
+    part-timer included, taking two overs in a row. Raises ValueError when no legal plan exists.
+    """
+    max_overs = FORMAT_RULES[fmt]["max_overs"]
+    quota = max_overs // 5
+    ref_econ = 7.6 if fmt == "t20" else 5.4
+    ref_avg = 23.0 if fmt == "t20" else 32.0
+    par = FORMAT_RULES[fmt]["default_par"] if par is None else par
+    used = {str(k): overs_to_balls(float(v), max_overs) for k, v in (bowler_overs or {}).items()}
+    bowlers = [p for p in bowl_xi if float(p.get("economy", 0.0)) > 0 and float(p.get("bowl_avg", 0.0)) > 0]
+    bowlers = [dict(p) for p in bowlers] + [{"name": "Part-time", "economy": ref_econ * 1.15, "bowl_avg": ref_avg * 1.3}]
+
+    first_over = -(-balls_bowled // 6)
+    overs = np.arange(first_over, max_overs)
+    starts = [start for start, _, _ in _SIM_PHASES[fmt]] + [max_overs]
+    phase_of = np.searchsorted(starts, overs, side="right") - 1
+    demand = tuple(int((phase_of == k).sum()) for k in range(len(_SIM_PHASES[fmt])))
+    runs, wkts, net = _bowler_over_costs(fmt, bowlers, overs, wickets, par, condition)
+    phase_cost = np.stack([net[:, phase_of == k].mean(axis=1) if demand[k] else np.zeros(len(bowlers)) for k in range(len(demand))], axis=1)
+
+    left = [max(0, quota - -(-used.get(p["name"], 0) // 6)) for p in bowlers[:-1]] + [len(overs)]
+    # last_bowler bowled (or is finishing) the over before the first planned one.
+    prev = next((i for i, p in enumerate(bowlers) if p["name"] == last_bowler), None)
+    if not _can_finish(left, len(overs), prev):
+        raise ValueError("Not enough bowling options to cover the remaining overs without back-to-back overs")
+    caps = [tuple(-(-d // 2) for d in demand) for _ in bowlers]
+    alloc = _allocate_phase_overs(phase_cost, demand, left, caps)
+    plan = _sequence_overs(net, alloc, phase_of, left, prev)
+
+    cols = np.arange(len(plan))
+    picks = np.array(plan, dtype=int)
+    per_bowler = []
+    for b, p in enumerate(bowlers):
+        mine = [int(overs[c]) + 1 for c in cols if plan[c] == b]
+        if not mine:
+            continue
+        phases = [(name, int(a)) for name, a in zip(_PHASE_NAMES, np.bincount(phase_of[picks == b], minlength=len(demand))) if a]
+        per_bowler.append(
+            {
+                "bowler": p["name"],
+                "overs": mine,
+                "phase_overs": dict(phases),
+                "overs_left_after": left[b] - len(mine) if b < len(bowlers) - 1 else None,
+                "expected_runs": round(float(runs[b, picks == b].sum()), 1),
+                "expected_wickets": round(float(wkts[b, picks == b].sum()), 2),
+            }
+        )
+    return {
+        "format": fmt,
+        "first_over": first_over + 1,
+        "over_plan": [bowlers[b]["name"] for b in plan],
+        "bowlers": per_bowler,
+        "expected_runs": round(float(runs[picks, cols].sum()), 1),
+        "expected_wickets": round(float(wkts[picks, cols].sum()), 2),
+        "phase_demand": dict(zip(_PHASE_NAMES, demand)),
+    }
+
+
+def plan_bowling_overs(payload: dict[str, Any]) -> dict[str, Any]:
+    fmt = format_key(payload.get("format"))
+    rules = FORMAT_RULES[fmt]
+    bowling_team = str(payload.get("bowling_team", ""))
+    wickets = int(payload.get("wickets", 0))
+    if wickets < 0 or wickets > 9:
+        raise ValueError("Wickets should be between 0 and 9")
+    balls_bowled = overs_to_balls(float(payload.get("overs", 0.0)), rules["max_overs"])
+    if balls_bowled >= rules["max_overs"] * 6:
+        raise ValueError("No overs left to plan")
+    bowler_overs = payload.get("bowler_overs") or {}
+    if not isinstance(bowler_overs, dict):
+        raise ValueError("bowler_overs must map bowler names to overs bowled")
+    started = time.perf_counter()
+    profile = xi_profile(bowling_team, fmt, payload.get("bowling_xi", []))
+    result = bowling_over_plan(
+        fmt,
+        list(profile.players),
+        balls_bowled,
+        wickets,
+        venue_average(fmt, payload.get("venue")),
+        condition_multiplier(payload.get("pitch"), payload.get("weather")),
+        bowler_overs,
+        payload.get("last_bowler"),
+    )
+    return {**result, "bowling_team": bowling_team, "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 2)}
+
+
+def _sim_batter_rates(fmt: str, xi: Any) -> tuple[np.ndarray, np.ndarray]:
+    """Per batting slot runs-per-ball and dismissal-per-ball rates for the innings simulation."""
+    ref_sr = 140.0 if fmt == "t20" else 90.0
+    ref_avg = 30.0 if fmt == "t20" else 42.0
+    # Column 11 is a sentinel for "no batter left"; those simulations have already ended.
+    bat_rpb = np.full(12, 0.6)
+    bat_wpb = np.full(12, 0.1)
+    for i, p in enumerate(list(xi)[:11]):
+        sr = max(40.0, float(p.get("strike_rate", ref_sr)))
+        avg = max(2.0, float(p.get("bat_avg", ref_avg)))
+        bat_rpb[i] = sr / 100.0
+        bat_wpb[i] = 1.0 / max(4.0, avg / (sr / 100.0))
+    return bat_rpb, bat_wpb
+
+
+def _innings_sim_params(fmt: str, ctx: dict[str, Any], score: int, wickets: int, balls_bowled: int, target: int = 0) -> dict[str, Any]:
+    max_overs = FORMAT_RULES[fmt]["max_overs"]
+    ref_econ = 7.6 if fmt == "t20" else 5.4
+    ref_bowl_avg = 23.0 if fmt == "t20" else 32.0
+
+    bat_rpb, bat_wpb = _sim_batter_rates(fmt, ctx["xi"])
+
+    plan = _bowling_rotation(fmt, list(ctx["bowl_xi"]))
+    bowl_run = np.ones(max_overs)
+    bowl_wkt = np.ones(max_overs)
+    if ctx["bowl_xi"]:
+        for over, p in enumerate(plan):
+            econ = float(p["economy"])
+            bowl_run[over] = _clamp(econ / ref_econ, 0.75, 1.3)
+            bowl_wkt[over] = _clamp((econ / float(p["bowl_avg"])) / (ref_econ / ref_bowl_avg), 0.6, 1.6)
+
+    phase_run, phase_wkt = _phase_factors(fmt)
+    death_start = _SIM_PHASES[fmt][-1][0]
+    phase_run[death_start:] *= ctx["death_context"]["multiplier"]
+    run_shape = (phase_run * bowl_run)[:, None] * bat_rpb[None, :]
+    wicket_shape = (phase_wkt * bowl_wkt)[:, None] * bat_wpb[None, :]
+    # Batters, bowlers and phases shape the innings; its level comes from predict_score for the same state.
+    # Before the first ball there is no live rate to blend, so the anchor is the projection one over in at par.
+    if balls_bowled > 0:
+        anchor = _predict_from_context(fmt, ctx, score, wickets, balls_bowled)["avg"]
+    else:
+        anchor = _predict_from_context(fmt, ctx, int(round(ctx["par"] / max_overs)), 0, 6)["avg"]
+    scale = _sim_pace_scale(run_shape, wicket_shape, wickets, balls_bowled, max_overs * 6, anchor - score)
+    run_rate, wicket_rate = _sim_paced(run_shape, wicket_shape, scale)
+    return {
+        "score": score,
+        "wickets": wickets,
+        "ball": balls_bowled,
+        "max_balls": max_overs * 6,
+        "target": target,
+        "run_rate": run_rate,
+        "wicket_rate": wicket_rate,
+        "bowlers": [p.get("name", "Part-time") for p in plan],
+    }
+
+
+def _sim_expected_runs(run_rate: np.ndarray, wicket_rate: np.ndarray, wickets: int, ball: int, max_balls: int) -> np.ndarray:
+    """Exact expected runs still to come in _simulate_innings without a target, for k rate tables (k, overs, 12).
+
+    A forward pass over (wickets down, other batter, latest arrival on strike): the latest arrival, slot
+    wickets + 1, is always at the crease. Strike changes on odd runs (P = 0.2m) and at the end of each over.
+    """
+    k = run_rate.shape[0]
+    total = np.zeros(k)
+    if wickets >= 10:
+        return total
+    p = np.zeros((k, 10, 11, 2))
+    p[:, wickets, wickets, 0] = 1.0
+    wkt = wicket_rate[:, :, _SIM_STRIKER_SLOTS]
+    runs = run_rate[:, :, _SIM_STRIKER_SLOTS] * (1.0 - wkt)
+    odd = 0.2 * runs
+    even = (1.0 - wkt) - odd
+    arrivals = np.arange(1, 10)
+    for b in range(ball, max_balls):
+        over = b // 6
+        end = b % 6 == 5
+        total += (p * runs[:, over]).sum(axis=(1, 2, 3))
+        keep, flip = (p * odd[:, over], p * even[:, over]) if end else (p * even[:, over], p * odd[:, over])
+        out = p[:, :9] * wkt[:, over, :9]
+        nxt = keep + flip[..., ::-1]
+        # The new batter takes strike, unless the over just ended.
+        f = 0 if end else 1
+        nxt[:, 1:, :, f] += out[..., 1]
+        nxt[:, arrivals, arrivals, f] += out[..., 0].sum(axis=2)
+        p = nxt
+    return total
+
+
+def _sim_paced(run_shape: np.ndarray, wicket_shape: np.ndarray, scales: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Rate tables at each pace scale: runs per ball up by the scale, dismissals per ball down by it."""
+    scales = np.asarray(scales, dtype=float)[..., None, None]
+    return np.clip(run_shape * scales, 0.2, 2.4), np.clip(wicket_shape / scales, 0.005, 0.5)
+
+
+def _sim_pace_scale(run_shape: np.ndarray, wicket_shape: np.ndarray, wickets: int, ball: int, max_balls: int, runs_to_come: float) -> float:
+    """Pace scale that makes the expected simulated total land on the anchor.
+
+    Expected runs are close to a power of the scale, so two passes of three scales each interpolate
+    log scale against log runs: a wide bracket, then a narrow one around its estimate.
+    """
+    if wickets >= 10 or ball >= max_balls:
+        return 1.0
+    target = math.log(max(runs_to_come, 0.5))
+    scale = 1.0
+    for spread in (2.0, 1.1):
+        scales = np.clip(scale * np.array([1.0 / spread, 1.0, spread]), 0.125, 8.0)
+        expected = np.log(np.maximum(_sim_expected_runs(*_sim_paced(run_shape, wicket_shape, scales), wickets, ball, max_balls), 1e-9))
+        if np.any(np.diff(expected) <= 1e-9):
+            return float(scales[np.argmin(np.abs(expected - target))])
+        # Piecewise linear in the logs, carried on past either end of the bracket.
+        i = 0 if target < expected[1] else 1
+        slope = (math.log(scales[i + 1]) - math.log(scales[i])) / (expected[i + 1] - expected[i])
+        scale = _clamp(math.exp(math.log(scales[i]) + (target - expected[i]) * slope), 0.125, 8.0)
+    return scale
+
+
+def _simulate_innings(params: dict[str, Any], rng: np.random.Generator, n: int, target: Any = None) -> dict[str, np.ndarray]:
+    """Play n innings from the params state; target (scalar or per-simulation array) ends a chase once reached.
+
+    With params["record_overs"] the result also holds "by_over": cumulative runs at every remaining over end, shape (n, overs).
+    Rate tables stacked as (k, overs, 12) play k batting orders side by side on the same random draws; results are (k, n).
+    """
+    stacked = params["run_rate"].ndim == 3
+    shape = (len(params["run_rate"]), n) if stacked else (n,)
+    record = bool(params.get("record_overs"))
+    by_over = np.empty(shape + ((params["max_balls"] // 6) - (params["ball"] // 6),), dtype=np.int32) if record else None
+    col = 0
+    runs = np.full(shape, params["score"], dtype=np.int32)
+    wickets = np.full(shape, params["wickets"], dtype=np.int32)
+    balls = np.zeros(shape, dtype=np.int32)
+    striker = np.full(shape, min(11, params["wickets"]), dtype=np.int32)
+    non_striker = np.full(shape, min(11, params["wickets"] + 1), dtype=np.int32)
+    next_in = np.full(shape, min(11, params["wickets"] + 2), dtype=np.int32)
+    live = np.ones(shape, dtype=bool)
+    if target is not None:
+        live &= runs < target
+
+    for ball in range(params["ball"], params["max_balls"]):
+        if not live.any():
+            break
+        over = ball // 6
+        if stacked:
+            m = np.take_along_axis(params["run_rate"][:, over], striker, axis=1)
+            w = np.take_along_axis(params["wicket_rate"][:, over], striker, axis=1)
+        else:
+            m = params["run_rate"][over][striker]
+            w = params["wicket_rate"][over][striker]
+        u = rng.random(n)
+        out = live & (u < w)
+        hit = _SIM_OUTCOME_RUNS[np.searchsorted(_SIM_OUTCOME_EDGES, (u - w) / ((1.0 - w) * m), side="right")]
+        hit = np.where(live & ~out, hit, 0)
+        runs += hit
+        balls += live
+        wickets += out
+        striker = np.where(out, next_in, striker)
+        next_in = np.minimum(11, next_in + out)
+        swap = (hit % 2 == 1) != (ball % 6 == 5)
+        striker, non_striker = np.where(swap, non_striker, striker), np.where(swap, striker, non_striker)
+        live &= wickets < 10
+        if target is not None:
+            live &= runs < target
+        if record and ball % 6 == 5:
+            by_over[..., col] = runs
+            col += 1
+    if not record:
+        return {"runs": runs, "wickets": wickets, "balls": balls}
+    # Innings that ended early stay at their final total for the overs they never reached.
+    by_over[..., col:] = runs[..., None]
+    return {"runs": runs, "wickets": wickets, "balls": balls, "by_over": by_over}
+
+
+def _simulate_innings_chunk(params: dict[str, Any], seed: np.random.SeedSequence, n: int) -> dict[str, np.ndarray]:
+    return _simulate_innings(params, np.random.default_rng(seed), n, params["target"] or None)
+
+
+def _sim_workers_setting() -> int:
+    """Process-pool size from CRICKET_SIM_WORKERS; simulations stay in the calling process unless it is above 1."""
+    raw = os.environ.get("CRICKET_SIM_WORKERS", "1").strip().lower()
+    if raw == "auto":
+        return max(1, min(4, os.cpu_count() or 1))
+    try:
+        return max(1, int(raw))
+    except ValueError:
+        return 1
+
+
+_SIM_WORKERS = _sim_workers_setting()
+
+
+def _sim_pool() -> Any:
+    global _SIM_POOL
+    if _SIM_POOL is None:
+        from concurrent.futures import ProcessPoolExecutor
+
+        _SIM_POOL = ProcessPoolExecutor(max_workers=_SIM_WORKERS)
+    return _SIM_POOL
+
+
+def _run_sim_chunks(
+    worker: Any, args: tuple, n: int, seed: int, chunk: int = _SIM_CHUNK, pool_min: int = _SIM_POOL_MIN
+) -> tuple[list[dict[str, np.ndarray]], int]:
+    """Fixed-size chunks with spawned seeds, so results depend on (seed, n) only, never on worker count."""
+    sizes = [chunk] * (n // chunk) + ([n % chunk] if n % chunk else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if n >= pool_min and _SIM_WORKERS > 1:
+        columns = [[a] * len(sizes) for a in args]
+        return list(_sim_pool().map(worker, *columns, seeds, sizes)), _SIM_WORKERS
+    return [worker(*args, ss, size) for ss, size in zip(seeds, sizes)], 1
+
+
+def _run_innings_sims(params: dict[str, Any], n: int, seed: int) -> tuple[dict[str, np.ndarray], int]:
+    parts, workers = _run_sim_chunks(_simulate_innings_chunk, (params,), n, seed)
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}, workers
+
+
+def simulate_score(payload: dict[str, Any]) -> dict[str, Any]:
+    fmt = format_key(payload.get("format"))
+    rules = FORMAT_RULES[fmt]
+    score = int(payload.get("score", 0))
+    wickets = int(payload.get("wickets", 0))
+    if score < 0:
+        raise ValueError("Score cannot be negative")
+    if wickets < 0 or wickets > 10:
+        raise ValueError("Wickets should be between 0 and 10")
+    balls_bowled = overs_to_balls(float(payload.get("overs", 0.0)), rules["max_overs"])
+    n = int(payload.get("simulations", 10000))
+    if n < 100 or n > 500000:
+        raise ValueError("Simulations should be between 100 and 500000")
+    seed = int(payload.get("seed", 42))
+
+    qs = (5, 10, 25, 50, 75, 90, 95)
+    ctx = _predict_context(payload, fmt)
+    if wickets >= 10 or balls_bowled >= rules["max_overs"] * 6:
+        return {
+            "mode": "simulate",
+            "low": score,
+            "avg": score,
+            "high": score,
+            "percentiles": {f"p{q}": score for q in qs},
+            "par": int(round(ctx["par"])),
+            "simulations": 0,
+            "warnings": ["All out: innings is already closed."] if wickets >= 10 else [],
+            "innings_closed": True,
+        }
+
+    params = _innings_sim_params(fmt, ctx, score, wickets, balls_bowled)
+    started = time.perf_counter()
+    sims, workers = _run_innings_sims(params, n, seed)
+    elapsed = max(1e-9, time.perf_counter() - started)
+
+    totals = sims["runs"]
+    pct = dict(zip((f"p{q}" for q in qs), (int(v) for v in np.percentile(totals, qs).round())))
+    return {
+        "mode": "simulate",
+        "low": pct["p10"],
+        "avg": pct["p50"],
+        "high": pct["p90"],
+        "mean": round(float(totals.mean()), 1),
+        "std": round(float(totals.std()), 1),
+        "percentiles": pct,
+        "par": int(round(ctx["par"])),
+        "all_out_prob": round(float((sims["wickets"] >= 10).mean()), 4),
+        "expected_wickets": round(float(sims["wickets"].mean()), 2),
+        "bowling_plan": params["bowlers"][balls_bowled // 6 :],
+        "simulations": n,
+        "seed": seed,
+        "workers": workers,
+        "elapsed_ms": round(elapsed * 1000.0, 2),
+        "sims_per_sec": round(n / elapsed, 1),
+        "warnings": ctx["warnings"] + list(ctx["xi_check"]["warnings"]),
+        "innings_closed": False,
+    }
+
+
+_ORDER_MIN_GAIN = 0.25
+
+
+def _ordered_xi(xi: tuple, names: Any) -> list[dict]:
+    if not names:
+        return list(xi)
+    by_name = {p["name"]: p for p in xi}
+    if not isinstance(names, list) or sorted(map(str, names)) != sorted(by_name):
+        raise ValueError("batting_order must list each selected XI player exactly once")
+    return [by_name[str(n)] for n in names]
+
+
+def _order_moves(order: list[int], first: int, depth: int, reach: np.ndarray, rpb: np.ndarray, wpb: np.ndarray, min_reach: float) -> tuple[list[tuple[int, int]], int]:
+    """Single promotions/demotions touching the next `depth` slots, minus the ones that cannot change the result.
+
+    A move is pruned when the first slot it disturbs is rarely reached in the baseline simulation, or when
+    the moved batter is no better (promotion) / no worse (demotion) than every batter it jumps over.
+    """
+    moves: list[tuple[int, int]] = []
+    pruned = 0
+    for i in range(first, 11):
+        for j in range(first, 11):
+            if i == j or min(i, j) >= first + depth:
+                continue
+            if reach[min(i, j)] < min_reach:
+                pruned += 1
+                continue
+            p = order[i]
+            jumped = order[j:i] if j < i else order[i + 1 : j + 1]
+            if j < i:
+                dominated = all(rpb[p] <= rpb[q] and wpb[p] >= wpb[q] for q in jumped)
+            else:
+                dominated = all(rpb[p] >= rpb[q] and wpb[p] <= wpb[q] for q in jumped)
+            if dominated:
+                pruned += 1
+                continue
+            moves.append((i, j))
+    return moves, pruned
+
+
+def _batting_order_search(
+    fmt: str, ctx: dict[str, Any], xi: list[dict], score: int, wickets: int, balls_bowled: int, target: int, n: int, seed: int, depth: int, rounds: int, min_reach: float
+) -> dict[str, Any]:
+    """Greedy search over batting-order moves.
+
+    Each round plays the current order and every surviving move side by side on common random numbers: a
+    one-eighth-size screening pass keeps the best fifth of the moves, then the rest get the full run.
+    """
+    params = _innings_sim_params(fmt, {**ctx, "xi": tuple(xi)}, score, wickets, balls_bowled, target)
+    rpb, wpb = _sim_batter_rates(fmt, xi)
+
+    def play(orders: list[list[int]], size: int) -> dict[str, np.ndarray]:
+        cols = np.array([o + [11] for o in orders])
+        stacked = {**params, "run_rate": params["run_rate"][:, cols].transpose(1, 0, 2), "wicket_rate": params["wicket_rate"][:, cols].transpose(1, 0, 2)}
+        return _simulate_innings(stacked, np.random.default_rng(seed), size, target or None)
+
+    def name_order(order: list[int]) -> list[str]:
+        return [xi[i]["name"] for i in order]
+
+    first = wickets + 2
+    order = list(range(len(xi)))
+    base = {k: v[0] for k, v in play([order], n).items()}
+    start = base
+    reorderings: list[dict[str, Any]] = []
+    steps: list[dict[str, Any]] = []
+    evaluated = pruned = screened = 0
+    for round_no in range(rounds if first < len(xi) else 0):
+        reach = np.array([float((base["wickets"] >= max(0, s - 1)).mean()) for s in range(12)])
+        moves, skipped = _order_moves(order, first, depth, reach, rpb, wpb, min_reach)
+        pruned += skipped
+        if not moves:
+            break
+        trials = []
+        for i, j in moves:
+            trial = list(order)
+            trial.insert(j, trial.pop(i))
+            trials.append(trial)
+        if len(moves) > 8:
+            quick = play([order] + trials, max(200, n // 8))["runs"]
+            keep = np.argsort(-(quick[1:] - quick[0]).mean(axis=1), kind="stable")[: max(4, len(moves) // 5)]
+            screened += len(moves) - len(keep)
+            moves, trials = [moves[k] for k in sorted(keep)], [trials[k] for k in sorted(keep)]
+        sims = play(trials, n)
+        evaluated += len(trials)
+        best: tuple[float, int, dict[str, Any]] | None = None
+        for k, (i, j) in enumerate(moves):
+            diff = (sims["runs"][k] - base["runs"]).astype(float)
+            gain = float(diff.mean())
+            se = float(diff.std()) / math.sqrt(n)
+            row = {
+                "player": xi[order[i]]["name"],
+                "from": i + 1,
+                "to": j + 1,
+                "projected_total": round(float(sims["runs"][k].mean()), 1),
+                "gain": round(gain, 2),
+                "gain_se": round(se, 2),
+            }
+            if round_no == 0:
+                reorderings.append(row)
+            if gain >= max(_ORDER_MIN_GAIN, 2.0 * se) and (best is None or gain > best[0]):
+                best = (gain, k, row)
+        if best is None:
+            break
+        _, k, row = best
+        order = trials[k]
+        base = {key: v[k] for key, v in sims.items()}
+        steps.append({**row, "order": name_order(order)})
+
+    reorderings.sort(key=lambda r: r["gain"], reverse=True)
+    start_total = float(start["runs"].mean())
+    final_total = float(base["runs"].mean())
+    out: dict[str, Any] = {
+        "at_crease": [p["name"] for p in xi[wickets:first]],
+        "current_order": [p["name"] for p in xi],
+        "optimized_order": name_order(order),
+        "projected_total": round(start_total, 1),
+        "optimized_total": round(final_total, 1),
+        "gain": round(final_total - start_total, 2),
+        "steps": steps,
+        "reorderings": reorderings,
+        "evaluated": evaluated,
+        "pruned": pruned,
+        "screened": screened,
+    }
+    if target:
+        out["chase_win_pct"] = round(float((start["runs"] >= target).mean()) * 100.0, 1)
+        out["optimized_chase_win_pct"] = round(float((base["runs"] >= target).mean()) * 100.0, 1)
+    return out
+
+
+def optimize_batting_order(payload: dict[str, Any]) -> dict[str, Any]:
+    """Promotion/demotion search over the batters still to come, scored with the seeded innings simulation.
+
+    `batting_order` (names) sets the current order; otherwise the selected XI order is used. The two
+    batters at the crease stay put; `depth` limits moves to those touching the next few slots.
+    """
+    fmt = format_key(payload.get("format"))
+    rules = FORMAT_RULES[fmt]
+    score = int(payload.get("score", 0))
+    wickets = int(payload.get("wickets", 0))
+    if score < 0:
+        raise ValueError("Score cannot be negative")
+    if wickets < 0 or wickets > 10:
+        raise ValueError("Wickets should be between 0 and 10")
+    balls_bowled = overs_to_balls(float(payload.get("overs", 0.0)), rules["max_overs"])
+    target = int(payload.get("target") or 0)
+    n = int(payload.get("simulations", 2000))
+    if n < 200 or n > 20000:
+        raise ValueError("Simulations should be between 200 and 20000")
+    seed = int(payload.get("seed", 42))
+    depth = max(1, min(9, int(payload.get("depth", 4))))
+    rounds = max(1, min(5, int(payload.get("rounds", 2))))
+    min_reach = _clamp(float(payload.get("min_reach", 0.05)), 0.0, 1.0)
+
+    started = time.perf_counter()
+    ctx = _predict_context(payload, fmt)
+    xi = _ordered_xi(ctx["xi"], payload.get("batting_order"))
+    out = {"format": fmt, "batting_team": ctx["batting_team"], "score": score, "wickets": wickets, "balls_bowled": balls_bowled}
+    if wickets >= 10 or balls_bowled >= rules["max_overs"] * 6 or (target and score >= target):
+        names = [p["name"] for p in xi]
+        return {
+            **out,
+            "current_order": names,
+            "optimized_order": names,
+            "projected_total": score,
+            "optimized_total": score,
+            "gain": 0.0,
+            "steps": [],
+            "reorderings": [],
+            "innings_closed": True,
+        }
+    result = _batting_order_search(fmt, ctx, xi, score, wickets, balls_bowled, target, n, seed, depth, rounds, min_reach)
+    return {
+        **out,
+        **result,
+        "simulations": n,
+        "seed": seed,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 2),
+        "innings_closed": False,
+    }
+
+
+def optimize_batting_order_batch(payload: dict[str, Any]) -> dict[str, Any]:
+    """optimize_batting_order for many scenarios (e.g. pre-match collapse/platform plans) sharing one context."""
+    states = payload.get("states")
+    if not isinstance(states, list) or not states:
+        raise ValueError("Provide a non-empty 'states' list")
+    if len(states) > 64:
+        raise ValueError("At most 64 states per batch")
+    shared = payload.get("context") if isinstance(payload.get("context"), dict) else {}
+
+    started = time.perf_counter()
+    results: list[dict[str, Any]] = []
+    for state in states:
+        if not isinstance(state, dict):
+            results.append({"error": "Each state must be an object"})
+            continue
+        try:
+            results.append(optimize_batting_order({**shared, **state}))
+        except ValueError as exc:
+            results.append({"error": str(exc)})
+    return {"results": results, "count": len(results), "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 2)}
+
+
+_SHAPLEY_FEATURES = (
+    ("Venue", ("venue",)),
+    ("Pitch", ("pitch",)),
+    ("Weather", ("weather",)),
+    ("Toss", ("toss_winner", "toss_decision")),
+    ("Bowling XI", ("bowling_team", "bowling_xi")),
+    ("Batting XI", ("selected_xi",)),
+)
+
+
+def shapley_attribution(payload: dict[str, Any]) -> dict[str, Any]:
+    """Exact Shapley values of the predicted average over the match-context features set in the payload.
+
+    Every coalition (2^k payloads, k <= 6) is scored in one _predict_score_many batch; an absent feature
+    falls back to predict_score's own default (no venue, neutral pitch/weather, no toss, no bowling side, default XI).
+    """
+    features = [(name, keys) for name, keys in _SHAPLEY_FEATURES if any(payload.get(k) for k in keys)]
+    k = len(features)
+    neutral = {key: v for key, v in payload.items() if not any(key in keys for _, keys in _SHAPLEY_FEATURES)}
+    coalitions = []
+    for mask in range(1 << k):
+        state = dict(neutral)
+        for i, (_, keys) in enumerate(features):
+            if mask >> i & 1:
+                state.update({key: payload[key] for key in keys if key in payload})
+        coalitions.append(state)
+
+    started = time.perf_counter()
+    results = _predict_score_many(coalitions)
+    elapsed = time.perf_counter() - started
+    for r in results:
+        if "error" in r:
+            raise ValueError(r["error"])
+    value = [float(r["avg"]) for r in results]
+
+    weights = [math.factorial(size) * math.factorial(k - size - 1) / math.factorial(k) for size in range(k)]
+    phi = [0.0] * k
+    for mask in range(1 << k):
+        size = bin(mask).count("1")
+        for i in range(k):
+            if not mask >> i & 1:
+                phi[i] += weights[size] * (value[mask | (1 << i)] - value[mask])
+    return {
+        "baseline": value[0],
+        "prediction": value[-1],
+        "values": {name: round(v, 3) for (name, _), v in zip(features, phi)},
+        "coalitions": len(coalitions),
+        "elapsed_ms": round(elapsed * 1000.0, 2),
+        "full": results[-1],
+    }
 
-    baseline = float(base["par"])
-    live_momentum = (crr - par_rr) * max_overs * (0.58 if fmt == "t20" else 0.75)
-    wicket_pressure = -max(0.0, (wickets - 3) * (5.2 if fmt == "t20" else 3.7))
-    xi_strength = (float(base.get("team_overall", 75.0)) - 75.0) * (1.15 if fmt == "t20" else 1.45)
 
-    toss_hint = base.get("toss_impact", {})
-    toss_delta = ((float(toss_hint.get("bat_advantage", 50.0)) - 50.0) / 50.0) * (6.0 if fmt == "t20" else 9.0)
+def _explain_shapley(payload: dict[str, Any]) -> dict[str, Any]:
+    shap = shapley_attribution(payload)
+    base = shap.pop("full")
+    factors = [{"factor": "Neutral Context Baseline", "impact": round(shap["baseline"], 1), "detail": "No venue, conditions, toss or opposition; default XI"}]
+    details = {
+        "Venue": f"{payload.get('venue')} (par {base.get('par', '-')})",
+        "Pitch": str(payload.get("pitch")),
+        "Weather": str(payload.get("weather")),
+        "Toss": f"{payload.get('toss_winner')} chose to {payload.get('toss_decision') or 'auto'}",
+        "Bowling XI": f"{payload.get('bowling_team')} attack",
+        "Batting XI": f"Selected XI overall {base.get('team_overall', '-')}/100",
+    }
+    factors += [{"factor": name, "impact": round(v, 1), "detail": details[name]} for name, v in shap["values"].items()]
+    drivers = sorted(factors[1:], key=lambda x: abs(x["impact"]), reverse=True)[:3]
+    return {
+        "predicted": {"low": base["low"], "avg": base["avg"], "high": base["high"]},
+        "factors": factors,
+        "top_drivers": drivers,
+        "storyline": " | ".join([f"{d['factor']}: {d['impact']:+.1f}" for d in drivers]),
+        "confidence": base.get("confidence", {}),
+        "method": "shapley",
+        "shapley": shap,
+    }
 
+
+def explain_score(payload: dict[str, Any]) -> dict[str, Any]:
+    if str(payload.get("method", "")).strip().lower() == "shapley":
+        return _explain_shapley(payload)
+    trace: dict[str, Any] = {}
+    base = predict_score(payload, trace)
+    comp = trace["components"]
+    mult = trace["multipliers"]
+    wickets = int(payload.get("wickets", 0))
+    toss_hint = base.get("toss_impact", {})
     death = base.get("death_context", {})
-    death_delta = (float(death.get("multiplier", 1.0)) - 1.0) * baseline * 0.45
     opp = base.get("opponent_death_bowling", {})
-    opposition_delta = (float(opp.get("multiplier", 1.0)) - 1.0) * baseline * 0.4
-
     batter_proj = base.get("batter_projection", {})
-    par_remaining = max(0.0, par_rr * overs_left)
-    batter_delta = float(batter_proj.get("projected_additional_runs", 0.0)) - par_remaining
-    batter_delta *= 0.25
-
-    approx_total = baseline + live_momentum + wicket_pressure + xi_strength + toss_delta + death_delta + opposition_delta + batter_delta
-    residual = float(base["avg"]) - approx_total
 
+    details = {
+        "Innings Closed": "Innings complete; final score",
+        "Venue Baseline": f"Par at {payload.get('venue') or 'default venue'}",
+        "DLS Resource Projection": f"{comp.get('dls_used', 0.0):.1f}% resources used, {wickets} down",
+        "Live Pace Projection": f"CRR {comp.get('crr', 0.0):.2f} x tempo {comp.get('tempo_factor', 0.0):.2f} over remaining overs",
+        "Live Momentum": f"CRR {comp.get('crr', 0.0):.2f} vs par RR {comp.get('par_rr', 0.0):.2f}",
+        "Pitch + Weather": f"Condition multiplier {mult.get('Pitch + Weather', 1.0):.3f}x",
+        "XI Strength": f"XI overall {base.get('team_overall', '-')}/100",
+        "Toss": str(toss_hint.get("suggested_decision", "No toss bias")),
+        "Death Venue Effect": f"Death multiplier {death.get('multiplier', 1.0)}x",
+        "Opposition Death Bowling": f"Attack {opp.get('label', 'Neutral')} ({opp.get('attack_score', '-')})",
+        "Score Limits": "; ".join(c for c in trace["caps"] if not c.startswith(("Late", "Wicket"))) or "Rounded, within format limits",
+        "Remaining Batters Upside": f"+{batter_proj.get('projected_additional_runs', '-')} projected from batters (18% blend)",
+        "Late-Innings Cap": next((c for c in trace["caps"] if c.startswith("Late")), "Not binding"),
+        "Band Centring": "Average re-centred inside the low/high band",
+        "Wicket Shock": next((c for c in trace["caps"] if c.startswith("Wicket")), "Not binding"),
+    }
     factors = [
-        {"factor": "Venue Baseline", "impact": round(baseline, 1), "detail": f"Par at {payload.get('venue') or 'default venue'}"},
-        {"factor": "Live Momentum", "impact": round(live_momentum, 1), "detail": f"CRR {crr:.2f} vs par RR {par_rr:.2f}"},
-        {"factor": "Wicket Pressure", "impact": round(wicket_pressure, 1), "detail": f"{wickets} down, {wickets_in_hand} in hand"},
-        {"factor": "XI Strength", "impact": round(xi_strength, 1), "detail": f"XI overall {base.get('team_overall', '-')}/100"},
-        {"factor": "Toss + Conditions", "impact": round(toss_delta, 1), "detail": str(toss_hint.get("suggested_decision", "No toss bias"))},
-        {"factor": "Death Venue Effect", "impact": round(death_delta, 1), "detail": f"Death multiplier {death.get('multiplier', 1.0)}x"},
-        {"factor": "Opposition Death Bowling", "impact": round(opposition_delta, 1), "detail": f"Attack {opp.get('label', 'Neutral')} ({opp.get('attack_score', '-')})"},
-        {"factor": "Remaining Batters Upside", "impact": round(batter_delta, 1), "detail": f"+{batter_proj.get('projected_additional_runs', '-') } projected from batters"},
-        {"factor": "Model Residual", "impact": round(residual, 1), "detail": "Calibration correction after blending components"},
+        {"factor": st["step"], "impact": round(st["delta"], 1), "detail": details.get(st["step"], "")}
+        for st in trace["steps"]
     ]
     factors_sorted = sorted(factors, key=lambda x: abs(x["impact"]), reverse=True)
-    top_drivers = [f for f in factors_sorted if f["factor"] != "Venue Baseline"][:3]
+    top_drivers = [f for f in factors_sorted if f["factor"] not in {"Venue Baseline", "Innings Closed"}][:3]
     storyline = " | ".join([f"{d['factor']}: {d['impact']:+.1f}" for d in top_drivers])
 
     return {
@@ -832,6 +2736,7 @@ def explain_score(payload: dict[str, Any]) -> dict[str, Any]:
         "top_drivers": top_drivers,
         "storyline": storyline,
         "confidence": base.get("confidence", {}),
+        "trace": trace,
     }
 
 
@@ -841,55 +2746,73 @@ def _deterministic_noise(seed: int) -> float:
     return (frac * 2.0) - 1.0
 
 
-def backtest_report(payload: dict[str, Any]) -> dict[str, Any]:
+_BACKTEST_SHARD = 64
+
+
+def _backtest_setup(payload: dict[str, Any], max_samples: int) -> dict[str, Any]:
     fmt = format_key(payload.get("format"))
-    rules = FORMAT_RULES[fmt]
-    max_overs = rules["max_overs"]
     team1 = str(payload.get("team1", ""))
     team2 = str(payload.get("team2", ""))
     if team1 not in TEAM_DATA or team2 not in TEAM_DATA:
         raise ValueError("Unknown teams for backtest")
 
-    xi1_names = payload.get("xi1") or [p["name"] for p in TEAM_DATA[team1]["squads"][fmt][:11]]
-    xi2_names = payload.get("xi2") or [p["name"] for p in TEAM_DATA[team2]["squads"][fmt][:11]]
     venue = payload.get("venue")
     pitch = payload.get("pitch")
     weather = payload.get("weather")
-
     checkpoints = [2.0, 5.0, 8.0, 11.0, 14.0, 17.0, 19.0] if fmt == "t20" else [5.0, 10.0, 18.0, 26.0, 34.0, 42.0, 48.0]
-    phase_bounds = {"Powerplay": 6 if fmt == "t20" else 10, "Middle": 15 if fmt == "t20" else 40}
+    sample_count = int(payload.get("samples", 42))
+    sample_count = int(_clamp(sample_count, 18, max_samples))
+    xi1 = payload.get("xi1") or [p["name"] for p in TEAM_DATA[team1]["squads"][fmt][:11]]
+    xi2 = payload.get("xi2") or [p["name"] for p in TEAM_DATA[team2]["squads"][fmt][:11]]
+    # Resolve both XIs now so a bad line-up fails before any row is computed or streamed.
+    xi_profile(team1, fmt, xi1)
+    xi_profile(team2, fmt, xi2)
+    return {
+        "format": fmt,
+        "team1": team1,
+        "team2": team2,
+        "xi1": xi1,
+        "xi2": xi2,
+        "venue": venue,
+        "pitch": pitch,
+        "weather": weather,
+        "checkpoints": checkpoints,
+        "scenarios": max(1, sample_count // len(checkpoints)),
+        "seed_base": sum(ord(c) for c in f"{fmt}:{team1}:{team2}:{venue}:{pitch}:{weather}"),
+    }
 
-    rows: list[dict[str, Any]] = []
-    err_abs: list[float] = []
-    err_sq: list[float] = []
-    within = 0
-    over = 0
-    under = 0
-    by_phase: dict[str, list[float]] = {"Powerplay": [], "Middle": [], "Death": []}
 
-    sample_count = int(payload.get("samples", 42))
-    sample_count = int(_clamp(sample_count, 18, 90))
-    scenarios = max(1, sample_count // len(checkpoints))
-    seed_base = sum(ord(c) for c in f"{fmt}:{team1}:{team2}:{venue}:{pitch}:{weather}")
+def _backtest_phase(fmt: str, overs: float) -> str:
+    bounds = {"Powerplay": 6 if fmt == "t20" else 10, "Middle": 15 if fmt == "t20" else 40}
+    return "Powerplay" if overs <= bounds["Powerplay"] else ("Middle" if overs <= bounds["Middle"] else "Death")
+
+
+def _backtest_shard(setup: dict[str, Any], start: int, stop: int) -> list[dict[str, Any]]:
+    """Rows for scenarios [start, stop); every value is seeded by (scenario, checkpoint), so shards are order-free."""
+    fmt = setup["format"]
+    rules = FORMAT_RULES[fmt]
+    max_overs = rules["max_overs"]
+    team1, team2 = setup["team1"], setup["team2"]
+    par = venue_average(fmt, setup["venue"])
+    par_rr = par / max_overs
 
-    for s in range(scenarios):
+    states: list[dict[str, Any]] = []
+    actuals: list[tuple[float, int]] = []
+    for s in range(start, stop):
         batting_team = team1 if s % 2 == 0 else team2
         bowling_team = team2 if batting_team == team1 else team1
-        bat_xi = xi1_names if batting_team == team1 else xi2_names
-        bowl_xi = xi2_names if batting_team == team1 else xi1_names
-        par = venue_average(fmt, venue)
-        par_rr = par / max_overs
+        bat_xi = setup["xi1"] if batting_team == team1 else setup["xi2"]
+        bowl_xi = setup["xi2"] if batting_team == team1 else setup["xi1"]
 
-        for cp in checkpoints:
+        for cp in setup["checkpoints"]:
             progress = cp / max_overs
-            seed = seed_base + (s * 31) + int(cp * 10)
+            seed = setup["seed_base"] + (s * 31) + int(cp * 10)
             noise = _deterministic_noise(seed)
             rr_mult = 0.92 + (progress * 0.2) + (noise * 0.06)
             score = int(round(par_rr * cp * rr_mult))
             score = max(1, score)
             wickets = int(_clamp(round((cp / max_overs) * (4.8 if fmt == "t20" else 6.0) + ((noise + 1.0) * 0.8)), 0, 9))
-
-            pred = predict_score(
+            states.append(
                 {
                     "format": fmt,
                     "batting_team": batting_team,
@@ -898,9 +2821,9 @@ def backtest_report(payload: dict[str, Any]) -> dict[str, Any]:
                     "bowling_xi": bowl_xi,
                     "toss_winner": "Auto",
                     "toss_decision": "auto",
-                    "venue": venue,
-                    "pitch": pitch,
-                    "weather": weather,
+                    "venue": setup["venue"],
+                    "pitch": setup["pitch"],
+                    "weather": setup["weather"],
                     "score": score,
                     "wickets": wickets,
                     "overs": cp,
@@ -912,43 +2835,97 @@ def backtest_report(payload: dict[str, Any]) -> dict[str, Any]:
             actual = score + (momentum_rr * overs_left * (0.9 + ((10 - wickets) / 12.0)))
             actual += (par - actual) * 0.16
             actual += _deterministic_noise(seed + 7) * (10.0 if fmt == "t20" else 18.0)
-            actual = int(round(_clamp(actual, score, rules["score_ceiling"])))
-
-            e = abs(pred["avg"] - actual)
-            err_abs.append(e)
-            err_sq.append(e * e)
-            if pred["low"] <= actual <= pred["high"]:
-                within += 1
-            elif pred["avg"] > actual:
-                over += 1
-            else:
-                under += 1
+            actuals.append((cp, int(round(_clamp(actual, score, rules["score_ceiling"])))))
+
+    rows: list[dict[str, Any]] = []
+    for (cp, actual), pred in zip(actuals, _predict_score_many(states)):
+        if "error" in pred:
+            raise ValueError(pred["error"])
+        phase = _backtest_phase(fmt, cp)
+        rows.append(
+            {
+                "overs": cp,
+                "predicted": pred["avg"],
+                "low": pred["low"],
+                "high": pred["high"],
+                "actual": actual,
+                "phase": phase,
+                "error": round(abs(pred["avg"] - actual), 1),
+            }
+        )
+    return rows
+
+
+class BacktestAccumulator:
+    """Running MAE/RMSE/calibration totals, so large backtests never hold per-row errors."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.abs_sum = 0.0
+        self.sq_sum = 0.0
+        self.within = 0
+        self.over = 0
+        self.under = 0
+        self.phases: dict[str, list[float]] = {"Powerplay": [0, 0.0], "Middle": [0, 0.0], "Death": [0, 0.0]}
+
+    def add(self, row: dict[str, Any]) -> None:
+        e = abs(row["predicted"] - row["actual"])
+        self.count += 1
+        self.abs_sum += e
+        self.sq_sum += e * e
+        if row["low"] <= row["actual"] <= row["high"]:
+            self.within += 1
+        elif row["predicted"] > row["actual"]:
+            self.over += 1
+        else:
+            self.under += 1
+        bucket = self.phases.setdefault(row["phase"], [0, 0.0])
+        bucket[0] += 1
+        bucket[1] += e
+
+    def summary(self) -> dict[str, Any]:
+        if not self.count:
+            raise ValueError("Unable to generate backtest scenarios")
+        return {
+            "samples": self.count,
+            "mae": round(self.abs_sum / self.count, 2),
+            "rmse": round(math.sqrt(self.sq_sum / self.count), 2),
+            "calibration_in_range_pct": round((self.within / self.count) * 100.0, 1),
+            "over_predict_pct": round((self.over / self.count) * 100.0, 1),
+            "under_predict_pct": round((self.under / self.count) * 100.0, 1),
+        }
+
+    def phase_mae(self) -> dict[str, float | None]:
+        return {k: round(total / n, 2) if n else None for k, (n, total) in self.phases.items()}
 
-            phase = "Powerplay" if cp <= phase_bounds["Powerplay"] else ("Middle" if cp <= phase_bounds["Middle"] else "Death")
-            by_phase[phase].append(e)
-            rows.append({"overs": cp, "predicted": pred["avg"], "actual": actual, "phase": phase, "error": round(e, 1)})
 
-    if not rows:
-        raise ValueError("Unable to generate backtest scenarios")
+def _backtest_rows(setup: dict[str, Any], workers: int | None = None) -> Any:
+    """Yield rows shard by shard in scenario order; large runs fan shards out over the process pool."""
+    total = setup["scenarios"]
+    bounds = [(i, min(total, i + _BACKTEST_SHARD)) for i in range(0, total, _BACKTEST_SHARD)]
+    workers = _SIM_WORKERS if workers is None else max(1, min(_SIM_WORKERS, int(workers)))
+    if workers > 1 and len(bounds) > 1:
+        shards = _sim_pool().map(_backtest_shard, [setup] * len(bounds), *zip(*bounds))
+    else:
+        shards = (_backtest_shard(setup, start, stop) for start, stop in bounds)
+    for rows in shards:
+        yield from rows
+
 
-    mae = sum(err_abs) / len(err_abs)
-    rmse = math.sqrt(sum(err_sq) / len(err_sq))
-    phase_mae = {k: round(sum(v) / len(v), 2) if v else None for k, v in by_phase.items()}
-    calibration = round((within / len(rows)) * 100.0, 1)
-    over_pct = round((over / len(rows)) * 100.0, 1)
-    under_pct = round((under / len(rows)) * 100.0, 1)
+def backtest_report(payload: dict[str, Any]) -> dict[str, Any]:
+    if payload.get("source") == "history":
+        return historical_backtest(payload)
+    setup = _backtest_setup(payload, 90)
+    acc = BacktestAccumulator()
+    rows: list[dict[str, Any]] = []
+    for row in _backtest_rows(setup, workers=1):
+        acc.add(row)
+        rows.append({k: row[k] for k in ("overs", "predicted", "actual", "phase", "error")})
 
     preview = rows[: min(24, len(rows))]
     return {
-        "summary": {
-            "samples": len(rows),
-            "mae": round(mae, 2),
-            "rmse": round(rmse, 2),
-            "calibration_in_range_pct": calibration,
-            "over_predict_pct": over_pct,
-            "under_predict_pct": under_pct,
-        },
-        "phase_mae": phase_mae,
+        "summary": acc.summary(),
+        "phase_mae": acc.phase_mae(),
         "rows": preview,
         "notes": [
             "Backtest uses deterministic synthetic innings snapshots for reproducible benchmarking.",
@@ -957,6 +2934,174 @@ def backtest_report(payload: dict[str, Any]) -> dict[str, Any]:
     }
 
 
+def backtest_stream(payload: dict[str, Any]) -> Any:
+    """NDJSON backtest: one line per row, then a summary line (or an error line). Up to 100000 samples, sharded over the process pool."""
+    setup = _backtest_setup(payload, 100000)
+    workers = payload.get("workers")
+
+    def lines() -> Any:
+        started = time.perf_counter()
+        acc = BacktestAccumulator()
+        try:
+            for row in _backtest_rows(setup, workers):
+                acc.add(row)
+                yield json.dumps({"type": "row", **row}) + "\n"
+        except ValueError as exc:
+            # Headers are already sent, so a failure mid-stream ends it with an error line instead of a status code.
+            yield json.dumps({"type": "error", "error": str(exc)}) + "\n"
+            return
+        except Exception:
+            yield json.dumps({"type": "error", "error": "Unable to run backtest"}) + "\n"
+            return
+        yield json.dumps(
+            {
+                "type": "summary",
+                "summary": acc.summary(),
+                "phase_mae": acc.phase_mae(),
+                "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 1),
+            }
+        ) + "\n"
+
+    return lines()
+
+
+def _historical_shard(states: list[dict[str, Any]]) -> np.ndarray:
+    """(low, avg, high) per state, as an int array; runs in a pool worker for large replays."""
+    preds = _predict_score_many(states)
+    return np.array([[p.get("low", -1), p.get("avg", -1), p.get("high", -1)] for p in preds], dtype=int)
+
+
+def _historical_states(payload: dict[str, Any], store: Any) -> dict[str, Any]:
+    """Checkpoint states of real innings in the store, with (format, phase, venue) labels and final totals."""
+    if payload.get("formats"):
+        formats = [format_key(f) for f in payload["formats"]]
+    elif payload.get("format"):
+        formats = [format_key(payload["format"])]
+    else:
+        formats = ["t20", "odi"]
+    innings_numbers = {int(i) for i in (payload.get("innings") or [1])}
+    date_from = int(str(payload.get("from", "0")).replace("-", "")[:8].ljust(8, "0"))
+    date_to = int(str(payload.get("to", "99999999")).replace("-", "")[:8].ljust(8, "9"))
+    limit = int(payload.get("max_innings", 0))
+
+    inn = {k: np.asarray(v) for k, v in store.innings.items()}
+    matches = {k: np.asarray(v) for k, v in store.matches.items()}
+    runs_cum = np.concatenate([[0], np.cumsum(store.deliveries["runs"], dtype=np.int64)])
+    legal_cum = np.concatenate([[0], np.cumsum(store.deliveries["legal"], dtype=np.int64)])
+    wkts_cum = np.concatenate([[0], np.cumsum(store.deliveries["wicket"], dtype=np.int64)])
+
+    # Store names must match a squad exactly: "India Women", "India A" or "England Lions" are other sides.
+    teams = dict(enumerate(store.teams))
+    venues = {i: resolve_venue(name) for i, name in enumerate(store.venues)}
+    match_fmt = matches["format"][inn["match"]]
+    match_date = matches["date"][inn["match"]]
+    keep = np.isin(inn["innings"], list(innings_numbers)) & (match_date >= date_from) & (match_date <= date_to)
+    mens_international = (matches["gender"] == GENDER_CODES["male"]) & (matches["team_type"] == TEAM_TYPE_CODES["international"])
+    senior = mens_international[inn["match"]]
+    skipped = {"not_mens_international": int((keep & ~senior).sum())}
+    keep &= senior
+    known = np.array([teams[b] in TEAM_DATA and teams[w] in TEAM_DATA for b, w in zip(inn["batting"], inn["bowling"])], dtype=bool)
+    skipped["unknown_team"] = int((keep & ~known).sum())
+    keep &= known
+    # Chase target per innings: the stored target, else the first-innings total plus one.
+    first_runs = np.zeros(len(matches["format"]), dtype=np.int64)
+    first = inn["innings"] == 1
+    first_runs[inn["match"][first]] = inn["runs"][first]
+    target = np.where(inn["target"] > 0, inn["target"], first_runs[inn["match"]] + 1)
+    chased_down = (inn["innings"] > 1) & (inn["runs"] >= target)
+
+    states: list[dict[str, Any]] = []
+    meta: list[tuple[str, str, str]] = []
+    innings_rows: list[int] = []
+    used: set[int] = set()
+    actual: list[int] = []
+    for fmt in formats:
+        max_overs = FORMAT_RULES[fmt]["max_overs"]
+        rows = np.flatnonzero(keep & (match_fmt == FORMAT_CODES[fmt]))
+        # An innings that stopped short of its overs with wickets in hand was either a chase that reached
+        # its target or a shortened match; neither final total is the full-innings score being predicted.
+        full = (inn["balls"][rows] >= max_overs * 6) | (inn["wickets"][rows] >= 10)
+        skipped[f"{fmt}_chase_completed"] = int((~full & chased_down[rows]).sum())
+        skipped[f"{fmt}_shortened"] = int((~full & ~chased_down[rows]).sum())
+        rows = rows[full]
+        if limit:
+            rows = rows[:limit]
+        checkpoints = [2.0, 5.0, 8.0, 11.0, 14.0, 17.0, 19.0] if fmt == "t20" else [5.0, 10.0, 18.0, 26.0, 34.0, 42.0, 48.0]
+        for cp in checkpoints:
+            # Delivery index of the cp*6-th legal ball in each innings, via the global legal-ball running count.
+            starts = inn["start"][rows]
+            want = legal_cum[starts] + int(cp * 6)
+            idx = np.searchsorted(legal_cum, want, side="left")
+            live = inn["balls"][rows] > int(cp * 6)
+            idx = np.where(live, idx, starts)
+            score = runs_cum[idx] - runs_cum[starts]
+            wickets = wkts_cum[idx] - wkts_cum[starts]
+            live &= wickets < 10
+            phase = _backtest_phase(fmt, cp)
+            for r, s, w in zip(rows[live].tolist(), score[live].tolist(), wickets[live].tolist()):
+                venue = venues[int(matches["venue"][inn["match"][r]])]
+                states.append(
+                    {
+                        "format": fmt,
+                        "batting_team": teams[int(inn["batting"][r])],
+                        "bowling_team": teams[int(inn["bowling"][r])],
+                        "venue": venue,
+                        "score": s,
+                        "wickets": w,
+                        "overs": cp,
+                    }
+                )
+                meta.append((fmt, phase, venue or "Unmapped venue"))
+                innings_rows.append(r)
+                used.add(r)
+                actual.append(int(inn["runs"][r]))
+    if not states:
+        raise ValueError("No historical innings match this backtest filter")
+    return {"states": states, "meta": meta, "actual": actual, "rows": innings_rows, "innings": len(used), "skipped": skipped}
+
+
+def historical_backtest(payload: dict[str, Any], store: Any = None) -> dict[str, Any]:
+    """Replay real innings from the local history store: predict at checkpoint overs, score against the final total."""
+    started = time.perf_counter()
+    replay = _historical_states(payload, store if store is not None else open_store())
+    states, meta, actual = replay["states"], replay["meta"], replay["actual"]
+
+    shard = 2048
+    chunks = [states[i : i + shard] for i in range(0, len(states), shard)]
+    workers = _SIM_WORKERS if len(chunks) > 1 else 1
+    if workers > 1:
+        preds = np.concatenate(list(_sim_pool().map(_historical_shard, chunks)))
+    else:
+        preds = np.concatenate([_historical_shard(c) for c in chunks])
+
+    overall = BacktestAccumulator()
+    by_format: dict[str, BacktestAccumulator] = {}
+    by_venue: dict[str, BacktestAccumulator] = {}
+    for (fmt, phase, venue), (low, avg, high), real in zip(meta, preds.tolist(), actual):
+        if avg < 0:
+            continue
+        row = {"predicted": avg, "low": low, "high": high, "actual": real, "phase": phase}
+        overall.add(row)
+        by_format.setdefault(fmt, BacktestAccumulator()).add(row)
+        by_venue.setdefault(f"{fmt}:{venue}", BacktestAccumulator()).add(row)
+
+    venue_rows = sorted(by_venue.items(), key=lambda kv: -kv[1].count)[: int(payload.get("venues", 20))]
+    elapsed = max(1e-9, time.perf_counter() - started)
+    return {
+        "source": "history",
+        "summary": overall.summary(),
+        "by_format": {f: {**acc.summary(), "phase_mae": acc.phase_mae()} for f, acc in by_format.items()},
+        "by_venue": [{"format": k.split(":", 1)[0], "venue": k.split(":", 1)[1], **acc.summary()} for k, acc in venue_rows],
+        "innings": replay["innings"],
+        "skipped": replay["skipped"],
+        "states": len(states),
+        "workers": workers,
+        "elapsed_sec": round(elapsed, 2),
+        "states_per_sec": round(len(states) / elapsed, 1),
+        "notes": ["Predictions use each team's default XI; historical line-ups are not mapped to squads."],
+    }
+
+
 def live_demo_matches() -> list[dict[str, Any]]:
     return [{"id": m["id"], "title": m["title"], "format": m["format"], "teams": [m["team1"], m["team2"]]} for m in DEMO_LIVE_MATCHES]
 
@@ -1354,6 +3499,7 @@ def model_card() -> dict[str, Any]:
     return {
         "model_type": "Deterministic hybrid statistical engine (not a generative LLM predictor).",
         "version": "v1.4-rule-hybrid",
+        "coefficients": SCORE_COEFFICIENTS_VERSION,
         "what_it_uses": [
             "DLS-style resource curves (overs and wickets).",
             "Live momentum features (current run rate vs par).",
@@ -1579,60 +3725,62 @@ def _meta_content(html: str, key: str, is_property: bool = True) -> str | None:
     return unescape(m.group(1)).strip() if m else None
 
 
-def _canonical_team(name: Any) -> str:
-    raw_name = str(name or "").strip()
+_TEAM_STOP_WORDS = frozenset({"cricket", "score", "scorecard", "live", "match", "result", "commentary", "full", "card"})
+# Abbreviation tokens, checked in this priority order when the whole string is not an alias.
+_TEAM_TOKENS = (
+    ("sa", "South Africa"),
+    ("nz", "New Zealand"),
+    ("wi", "West Indies"),
+    ("windies", "West Indies"),
+    ("eng", "England"),
+    ("ind", "India"),
+    ("pak", "Pakistan"),
+    ("ban", "Bangladesh"),
+    ("afg", "Afghanistan"),
+    ("aus", "Australia"),
+    ("sl", "Sri Lanka"),
+)
+_TEAM_TOKEN_RANK = {token: (rank, team) for rank, (token, team) in enumerate(_TEAM_TOKENS)}
+_TEAM_NAMES_LOWER = tuple((team.lower(), team) for team in TEAM_DATA)
+_TEAM_NAME_RANK = {tl: (rank, team) for rank, (tl, team) in enumerate(_TEAM_NAMES_LOWER)}
+# All team names as one alternation, built once; the lookahead reports overlapping hits so TEAM_DATA order decides.
+_TEAM_NAME_RE = re.compile("(?=(" + "|".join(re.escape(tl) for tl, _ in _TEAM_NAMES_LOWER) + "))")
+_NON_ALPHA = re.compile(r"[^a-z ]+")
+
+
+@lru_cache(maxsize=4096)
+def _canonical_team_cached(raw_name: str) -> str:
     if not raw_name:
         return raw_name
     key = raw_name.lower()
     if key in TEAM_ALIASES:
         return TEAM_ALIASES[key]
-
-    norm = re.sub(r"[^a-z ]+", " ", key)
-    norm = re.sub(r"\s+", " ", norm).strip()
-    stop_words = {
-        "cricket",
-        "score",
-        "scorecard",
-        "live",
-        "match",
-        "result",
-        "commentary",
-        "full",
-        "card",
-    }
-    tokens = [t for t in norm.split() if t not in stop_words]
+    tokens = [t for t in _NON_ALPHA.sub(" ", key).split() if t not in _TEAM_STOP_WORDS]
     norm = " ".join(tokens)
-
     if norm in TEAM_ALIASES:
         return TEAM_ALIASES[norm]
-    if re.search(r"\bsa\b", norm):
-        return "South Africa"
-    if re.search(r"\bnz\b", norm):
-        return "New Zealand"
-    if re.search(r"\bwi\b|\bwindies\b", norm):
-        return "West Indies"
-    if re.search(r"\beng\b", norm):
-        return "England"
-    if re.search(r"\bind\b", norm):
-        return "India"
-    if re.search(r"\bpak\b", norm):
-        return "Pakistan"
-    if re.search(r"\bban\b", norm):
-        return "Bangladesh"
-    if re.search(r"\bafg\b", norm):
-        return "Afghanistan"
-    if re.search(r"\baus\b", norm):
-        return "Australia"
-    if re.search(r"\bsl\b", norm):
-        return "Sri Lanka"
-
-    for team in TEAM_DATA.keys():
-        tl = team.lower()
-        if tl in norm or norm in tl:
+    hits = [_TEAM_TOKEN_RANK[t] for t in tokens if t in _TEAM_TOKEN_RANK]
+    if hits:
+        return min(hits)[1]
+    names = _TEAM_NAME_RE.findall(norm)
+    if names:
+        return min(_TEAM_NAME_RANK[tl] for tl in names)[1]
+    for tl, team in _TEAM_NAMES_LOWER:
+        if norm in tl:
             return team
     return raw_name
 
 
+def _canonical_team(name: Any) -> str:
+    """Team name from free text: alias table, then abbreviation tokens by priority, then team names within the text."""
+    return _canonical_team_cached(str(name or "").strip())
+
+
+def team_alias_cache_stats() -> dict[str, int]:
+    info = _canonical_team_cached.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize or 0}
+
+
 def _find_teams_from_text(text: str) -> tuple[str, str]:
     matches = re.finditer(r"([A-Za-z .&'-]{2,45})\s+v(?:s|\.)\s+([A-Za-z .&'-]{2,45})", text, flags=re.IGNORECASE)
     for m in matches:
@@ -1781,11 +3929,11 @@ def _extract_venue_from_text(text: str) -> str | None:
         if not m:
             continue
         venue_raw = re.sub(r"\s+", " ", m.group(1)).strip(" ,.-")
+        canonical = resolve_venue(venue_raw)
+        if canonical:
+            return canonical
         if "," in venue_raw and len(venue_raw) >= 8:
             return venue_raw[:80]
-        for v in VENUES:
-            if v["name"].lower() in venue_raw.lower() or venue_raw.lower() in v["name"].lower():
-                return v["name"]
         if len(venue_raw) >= 4 and re.search(r"stadium|ground|park|oval|arena|field", venue_raw, flags=re.IGNORECASE):
             return venue_raw[:80]
     return None
@@ -1805,11 +3953,11 @@ def _extract_venue_from_raw_html(html: str) -> str | None:
         if not m:
             continue
         venue_raw = re.sub(r"\s+", " ", m.group(1)).strip(" ,.-")
+        canonical = resolve_venue(venue_raw)
+        if canonical:
+            return canonical
         if "," in venue_raw and len(venue_raw) >= 8:
             return venue_raw[:80]
-        for v in VENUES:
-            if v["name"].lower() in venue_raw.lower() or venue_raw.lower() in v["name"].lower():
-                return v["name"]
         if len(venue_raw) >= 4 and re.search(r"stadium|ground|park|oval|arena|field", venue_raw, flags=re.IGNORECASE):
             return venue_raw[:80]
     return None
@@ -1962,11 +4110,6 @@ def _extract_exact_innings_overs(text: str, team: str, score: int, wickets: int,
     return None
 
 
-def _name_key(name: str) -> str:
-    norm = re.sub(r"[^a-z]", "", name.lower())
-    return norm
-
-
 def _extract_fow_events(text: str) -> list[dict[str, Any]]:
     events: list[dict[str, Any]] = []
     patterns = re.finditer(r"(\d{1,3})-(\d{1,2})\s*\([^)]*?,\s*(\d{1,2}(?:\.\d)?)\s*ov", text, flags=re.IGNORECASE)
@@ -2207,16 +4350,11 @@ def _extract_raw_player_names_from_html(html: str) -> list[str]:
 
 
 def _map_raw_names_to_local(raw_names: list[str], team: str) -> list[str]:
-    squad = TEAM_DATA[team]["squads"]["t20"] + TEAM_DATA[team]["squads"]["odi"]
-    exact = {p["name"].lower(): p["name"] for p in squad}
-    norm = {_name_key(p["name"]): p["name"] for p in squad}
     out: list[str] = []
     for name in raw_names:
-        lk = name.lower()
-        nk = _name_key(name)
-        mapped = exact.get(lk) or norm.get(nk)
-        if mapped and mapped not in out:
-            out.append(mapped)
+        match = resolve_player(team, name)
+        if match and match.name not in out:
+            out.append(match.name)
         if len(out) >= 11:
             break
     return out
@@ -2357,28 +4495,22 @@ def _extract_cricbuzz_xi_raw(html: str, team1: str, team2: str) -> tuple[list[st
 def _extract_xi_from_html(html: str, team1: str, team2: str) -> tuple[list[str], list[str], list[str], list[str]]:
     ordered = _extract_raw_player_names_from_html(html)
 
-    squad1 = TEAM_DATA[team1]["squads"]["t20"] + TEAM_DATA[team1]["squads"]["odi"]
-    squad2 = TEAM_DATA[team2]["squads"]["t20"] + TEAM_DATA[team2]["squads"]["odi"]
-    squad1_exact = {p["name"].lower(): p["name"] for p in squad1}
-    squad2_exact = {p["name"].lower(): p["name"] for p in squad2}
-    squad1_norm = {_name_key(p["name"]): p["name"] for p in squad1}
-    squad2_norm = {_name_key(p["name"]): p["name"] for p in squad2}
-
     xi1: list[str] = []
     xi2: list[str] = []
     raw1: list[str] = []
     raw2: list[str] = []
     for n in ordered:
-        lk = n.lower()
-        nk = _name_key(n)
-        p1 = squad1_exact.get(lk) or squad1_norm.get(nk)
-        p2 = squad2_exact.get(lk) or squad2_norm.get(nk)
-        if p1 and p1 not in xi1 and len(xi1) < 11:
-            xi1.append(p1)
+        m1 = resolve_player(team1, n)
+        m2 = resolve_player(team2, n)
+        # A looser match on one side never beats a closer match on the other.
+        if m1 and m2 and m2.rank < m1.rank:
+            m1 = None
+        if m1 and m1.name not in xi1 and len(xi1) < 11:
+            xi1.append(m1.name)
             raw1.append(n)
             continue
-        if p2 and p2 not in xi2 and len(xi2) < 11:
-            xi2.append(p2)
+        if m2 and m2.name not in xi2 and len(xi2) < 11:
+            xi2.append(m2.name)
             raw2.append(n)
             continue
 
@@ -2868,9 +5000,51 @@ def uncertainty_fan(payload: dict[str, Any]) -> dict[str, Any]:
     if wickets < 0 or wickets > 10:
         raise ValueError("Wickets should be between 0 and 10")
 
+    if payload.get("mode") == "simulate":
+        return _simulated_fan(payload, fmt, score, wickets, overs_to_balls(overs, max_overs))
     pred = predict_score(payload)
     traj = run_trajectory({"format": fmt, "score": score, "wickets": wickets, "overs": overs})
-    balls_done = overs_to_balls(overs, max_overs)
+    return _fan_from(fmt, score, wickets, overs_to_balls(overs, max_overs), pred, traj)
+
+
+def _simulated_fan(payload: dict[str, Any], fmt: str, score: int, wickets: int, balls_done: int) -> dict[str, Any]:
+    """Fan as per-over empirical quantiles of one batch of innings simulations (cumulative runs at each over end)."""
+    n = int(payload.get("simulations", 2000))
+    if n < 100 or n > 200000:
+        raise ValueError("Simulations should be between 100 and 200000")
+    seed = int(payload.get("seed", 42))
+    band = float(payload.get("band", 80))
+    if not 10 <= band < 100:
+        raise ValueError("Band should be between 10 and 99 percent")
+    q_low, q_high = (100.0 - band) / 2.0, 100.0 - ((100.0 - band) / 2.0)
+
+    labels = [f"{balls_done // 6}.{balls_done % 6}"]
+    low, avg, high = [score], [score], [score]
+    max_balls = FORMAT_RULES[fmt]["max_overs"] * 6
+    if wickets < 10 and balls_done < max_balls:
+        params = _innings_sim_params(fmt, _predict_context(payload, fmt), score, wickets, balls_done)
+        params["record_overs"] = True
+        sims, _ = _run_innings_sims(params, n, seed)
+        qs = np.percentile(sims["by_over"], [q_low, 50.0, q_high], axis=0)
+        first = (balls_done // 6) + 1
+        labels += [str(over) for over in range(first, first + qs.shape[1])]
+        low += np.rint(qs[0]).astype(int).tolist()
+        avg += np.rint(qs[1]).astype(int).tolist()
+        high += np.rint(qs[2]).astype(int).tolist()
+    return {
+        "labels": labels,
+        "low": low,
+        "avg": avg,
+        "high": high,
+        "mode": "simulate",
+        "band_pct": band,
+        "simulations": n if len(labels) > 1 else 0,
+        "seed": seed,
+    }
+
+
+def _fan_from(fmt: str, score: int, wickets: int, balls_done: int, pred: dict[str, Any], traj: dict[str, Any]) -> dict[str, Any]:
+    max_overs = FORMAT_RULES[fmt]["max_overs"]
     current_label = f"{balls_done // 6}.{balls_done % 6}"
     labels = [current_label]
     low = [score]
@@ -3006,14 +5180,6 @@ def viva_report_pdf(payload: dict[str, Any]) -> bytes:
     return _simple_text_pdf(lines)
 
 
-def _player_role(team: str, player_name: str) -> str:
-    all_players = TEAM_DATA[team]["squads"]["t20"] + TEAM_DATA[team]["squads"]["odi"]
-    for p in all_players:
-        if p["name"] == player_name:
-            return str(p.get("role", "Player"))
-    return "Player"
-
-
 def live_analytics_pack(payload: dict[str, Any]) -> dict[str, Any]:
     live = payload.get("live")
     if not isinstance(live, dict):
@@ -3187,23 +5353,38 @@ def live_analytics_pack(payload: dict[str, Any]) -> dict[str, Any]:
         )
     sims = sorted(sims, key=lambda x: x["distance"])[:5]
 
-    # Bowler matchup hints (from known squad roles for the bowling team).
-    bowlers = []
-    live_bowl_xi = live.get("team1_xi", []) if bowling == team1 else live.get("team2_xi", [])
-    if isinstance(live_bowl_xi, list):
-        for name in live_bowl_xi:
-            role = _player_role(bowling, str(name))
-            if "Bowler" in role or "All-Rounder" in role:
-                bowlers.append({"name": name, "role": role})
-    bowlers = bowlers[:5]
-    bowler_matchups = [
-        {
-            "bowler": b["name"],
-            "phase": "Powerplay" if i < 2 else ("Middle" if i < 4 else "Death"),
-            "note": "Use attacking fields" if i < 2 else ("Squeeze singles" if i < 4 else "Yorker-heavy finish"),
-        }
-        for i, b in enumerate(bowlers)
-    ]
+    # Bowler matchups: remaining overs allocated by the quota-aware planner.
+    bowling_plan = None
+    bowler_matchups = []
+    balls_bowled = overs_to_balls(overs, max_overs)
+    if bowling in TEAM_DATA and wickets < 10 and balls_bowled < max_overs * 6:
+        squad = PLAYER_STORE.squad(bowling, fmt)
+        live_bowl_xi = live.get("team1_xi", []) if bowling == team1 else live.get("team2_xi", [])
+        bowl_xi = [p for p in map(squad.find, map(str, live_bowl_xi)) if p] if isinstance(live_bowl_xi, list) else []
+        bowler_overs = live.get("bowler_overs") if isinstance(live.get("bowler_overs"), dict) else None
+        try:
+            bowling_plan = bowling_over_plan(
+                fmt,
+                bowl_xi or list(xi_profile(bowling, fmt, None).players),
+                balls_bowled,
+                wickets,
+                venue_average(fmt, live.get("venue")),
+                bowler_overs=bowler_overs,
+                last_bowler=live.get("last_bowler"),
+            )
+        except ValueError:
+            # Scraped bowler figures can leave no legal plan; report no matchups rather than an illegal one.
+            bowling_plan = None
+        for row in sorted(bowling_plan["bowlers"] if bowling_plan else [], key=lambda r: r["overs"][0]):
+            bowler_matchups.append(
+                {
+                    "bowler": row["bowler"],
+                    "phase": ", ".join(f"{name} x{count}" for name, count in row["phase_overs"].items()),
+                    "note": f"Over{'s' if len(row['overs']) > 1 else ''} {', '.join(map(str, row['overs']))}; ~{row['expected_runs']} runs, {row['expected_wickets']} wkts expected",
+                    "overs": row["overs"],
+                    "expected_runs": row["expected_runs"],
+                }
+            )
 
     coach_notes = [
         f"{batting}: preserve wickets till over {15 if fmt == 't20' else 35} and target acceleration after that.",
@@ -3221,10 +5402,81 @@ def live_analytics_pack(payload: dict[str, Any]) -> dict[str, Any]:
         "similar_matches": sims,
         "similarity_metric_note": "Similarity % compares runs, wickets, and overs progression. 100% is very close; lower values mean less similar.",
         "bowler_matchups": bowler_matchups,
+        "bowling_plan": bowling_plan,
         "coach_notes": coach_notes,
     }
 
 
+# Chase DP: per-ball (runs-per-ball, wicket probability) baselines and how the incoming
+# batter's quality falls away with wickets lost. Aggression levels trade wicket risk for
+# scoring rate; the surface picks the best level for every state.
+_CHASE_BASE = {"t20": (1.35, 0.05), "odi": (0.92, 0.025)}
+_CHASE_POSITION_RUNS = np.array([1.0, 1.0, 1.0, 1.0, 0.98, 0.95, 0.92, 0.86, 0.78, 0.7])
+_CHASE_POSITION_WKTS = np.array([1.0, 1.0, 1.0, 1.05, 1.1, 1.15, 1.25, 1.4, 1.6, 1.8])
+_CHASE_AGGRESSION = (0.75, 1.0, 1.3, 1.65)
+_CHASE_BUCKETS = np.round(np.arange(0.75, 1.2501, 0.05), 2)
+_CHASE_SCALE = 65535.0
+
+
+def _chase_bucket(rate_multiplier: float) -> int:
+    return max(0, min(len(_CHASE_BUCKETS) - 1, int(round((rate_multiplier - 0.75) / 0.05))))
+
+
+@lru_cache(maxsize=32)
+def _chase_surface(fmt: str, bucket: int) -> np.ndarray:
+    """Win probability for every (balls left, wickets lost, runs needed), stored as uint16 (x 65535)."""
+    rules = FORMAT_RULES[fmt]
+    max_balls = rules["max_overs"] * 6
+    max_runs = rules["score_ceiling"] + 30
+    k = float(_CHASE_BUCKETS[bucket])
+    base_m, base_w = _CHASE_BASE[fmt]
+    phase_run, phase_wkt = _phase_factors(fmt)
+    edges = np.concatenate(([0.0], _SIM_OUTCOME_EDGES))
+    shares = np.diff(np.append(edges, 0.405))[:5]
+    shares = dict(zip((6, 4, 3, 2, 1), shares))
+
+    offset = 6
+    prev = np.zeros((11, max_runs + 1 + offset))
+    prev[:, : offset + 1] = 1.0
+    surface = np.empty((max_balls + 1, 10, max_runs + 1), dtype=np.uint16)
+    surface[0] = np.rint(prev[:10, offset:] * _CHASE_SCALE)
+    for b in range(1, max_balls + 1):
+        over = (max_balls - b) // 6
+        m0 = base_m * phase_run[over] * k * _CHASE_POSITION_RUNS
+        w0 = base_w * phase_wkt[over] * _CHASE_POSITION_WKTS / math.sqrt(k)
+        best = np.zeros((10, max_runs))
+        for agg in _CHASE_AGGRESSION:
+            m = np.clip(m0 * agg, 0.2, 2.4)[:, None]
+            w = np.clip(w0 * (agg ** 1.5), 0.003, 0.6)[:, None]
+            stay = (1.0 - 0.405 * m) * prev[:10, offset + 1 :]
+            for runs, share in shares.items():
+                stay = stay + (share * m) * prev[:10, offset + 1 - runs : offset + 1 - runs + max_runs]
+            value = (w * prev[1:, offset + 1 :]) + ((1.0 - w) * stay)
+            best = np.maximum(best, value)
+        cur = prev.copy()
+        cur[:10, offset + 1 :] = best
+        surface[b] = np.rint(cur[:10, offset:] * _CHASE_SCALE)
+        prev = cur
+    return surface
+
+
+def chase_surface_stats() -> dict[str, int]:
+    info = _chase_surface.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize or 0}
+
+
+def chase_win_lookup(fmt: str, runs_needed: int, balls_left: int, wickets: int, rate_multiplier: float = 1.0) -> float:
+    """O(1) chase win probability (0-1) from the DP surface."""
+    if runs_needed <= 0:
+        return 1.0
+    if wickets >= 10 or balls_left <= 0:
+        return 0.0
+    surface = _chase_surface(fmt, _chase_bucket(rate_multiplier))
+    if runs_needed >= surface.shape[2]:
+        return 0.0
+    return float(surface[min(balls_left, surface.shape[0] - 1), max(0, wickets), runs_needed]) / _CHASE_SCALE
+
+
 def win_probability(payload: dict[str, Any]) -> dict[str, Any]:
     fmt = format_key(payload.get("format"))
     rules = FORMAT_RULES[fmt]
@@ -3256,41 +5508,73 @@ def win_probability(payload: dict[str, Any]) -> dict[str, Any]:
         warnings.append("Chasing side innings completed.")
         return {"win_prob": 0, "runs_needed": runs_needed, "balls_left": 0, "crr": round(crr, 2), "rrr": None, "warnings": warnings}
 
-    chasing_team = str(payload.get("chasing_team", ""))
-    bowling_team = str(payload.get("bowling_team", ""))
+    return _win_from_context(fmt, _chase_context(payload, fmt), score, wickets, balls_bowled, target, payload.get("model", "dp"))
 
-    chase_xi = pick_players(get_team_players(chasing_team, fmt), payload.get("chasing_xi", []))
-    bowl_xi = pick_players(get_team_players(bowling_team, fmt), payload.get("bowling_xi", []))
 
-    chase_strength = team_breakdown(chase_xi, fmt)
-    bowl_strength = team_breakdown(bowl_xi, fmt)
-    chase_xi_check = xi_validator(chase_xi, fmt)
-
-    pressure = (rrr - crr)
-    base = 50.0 - (pressure * (13 if fmt == "t20" else 9))
-    base += (10 - wickets) * 3.8
-    base += (balls_left / (rules["max_overs"] * 6) - 0.5) * 18.0
-    base += (chase_strength["overall"] - bowl_strength["overall"]) * 0.35
-    base *= 1 + toss_adjustment(
+def _chase_context(payload: dict[str, Any], fmt: str) -> dict[str, Any]:
+    """Everything win_probability needs that does not change ball to ball."""
+    chasing_team = str(payload.get("chasing_team", ""))
+    bowling_team = str(payload.get("bowling_team", ""))
+    chase_profile = xi_profile(chasing_team, fmt, payload.get("chasing_xi", []))
+    bowl_profile = xi_profile(bowling_team, fmt, payload.get("bowling_xi", []))
+    toss = toss_adjustment(
         fmt,
         payload.get("toss_winner"),
         payload.get("toss_decision"),
         chasing_team=chasing_team,
     )
-
     dew_bonus = next((w["chasing_impact"] for w in WEATHER_TYPES if w["label"] == payload.get("weather")), 0.0)
-    base *= 1 + dew_bonus
+    # Strength gap, toss, dew and venue scoring rate select the DP surface bucket.
+    rate = 1 + ((chase_profile.breakdown["overall"] - bowl_profile.breakdown["overall"]) / 250.0)
+    rate *= (1 + toss) * (1 + dew_bonus)
+    rate *= venue_average(fmt, payload.get("venue")) / FORMAT_RULES[fmt]["default_par"]
+    return {
+        "chase_strength": chase_profile.breakdown,
+        "bowl_strength": bowl_profile.breakdown,
+        "xi_check": chase_profile.validation,
+        "toss": toss,
+        "dew_bonus": dew_bonus,
+        "rate": rate,
+        "toss_impact": toss_impact(fmt, payload.get("venue"), payload.get("weather")),
+    }
+
+
+def _win_from_context(
+    fmt: str, cctx: dict[str, Any], score: int, wickets: int, balls_bowled: int, target: int, model: Any = "dp"
+) -> dict[str, Any]:
+    rules = FORMAT_RULES[fmt]
+    balls_left = (rules["max_overs"] * 6) - balls_bowled
+    runs_needed = max(0, target - score)
+    crr = (score / (balls_bowled / 6.0)) if balls_bowled > 0 else 0.0
+    rrr = (runs_needed / (balls_left / 6.0)) if balls_left > 0 else math.inf
+    chase_strength = cctx["chase_strength"]
+    bowl_strength = cctx["bowl_strength"]
+
+    extra: dict[str, Any] = {}
+    if str(model).strip().lower() == "heuristic":
+        pressure = (rrr - crr)
+        base = 50.0 - (pressure * (13 if fmt == "t20" else 9))
+        base += (10 - wickets) * 3.8
+        base += (balls_left / (rules["max_overs"] * 6) - 0.5) * 18.0
+        base += (chase_strength["overall"] - bowl_strength["overall"]) * 0.35
+        base *= 1 + cctx["toss"]
+        base *= 1 + cctx["dew_bonus"]
+    else:
+        exact = chase_win_lookup(fmt, runs_needed, balls_left, wickets, cctx["rate"])
+        base = exact * 100.0
+        extra = {"model": "dp", "win_prob_exact": round(exact, 4), "rate_bucket": float(_CHASE_BUCKETS[_chase_bucket(cctx["rate"])])}
 
     prob = int(round(max(1, min(99, base))))
     return {
         "win_prob": prob,
+        **extra,
         "runs_needed": runs_needed,
         "balls_left": balls_left,
         "crr": round(crr, 2),
         "rrr": round(rrr, 2),
-        "warnings": warnings + chase_xi_check["warnings"],
-        "xi_validation": chase_xi_check,
-        "toss_impact": toss_impact(fmt, payload.get("venue"), payload.get("weather")),
+        "warnings": list(cctx["xi_check"]["warnings"]),
+        "xi_validation": cctx["xi_check"],
+        "toss_impact": cctx["toss_impact"],
     }
 
 
@@ -3357,21 +5641,126 @@ def dls_target(payload: dict[str, Any]) -> dict[str, Any]:
     }
 
 
-def compare_teams(team1: str, team2: str, fmt: str, xi1: list[str], xi2: list[str], venue: str | None = None, weather: str | None = None) -> dict[str, Any]:
-    a_xi = pick_players(get_team_players(team1, fmt), xi1)
-    b_xi = pick_players(get_team_players(team2, fmt), xi2)
+def _simulate_match_chunk(orders: tuple, seed: np.random.SeedSequence, n: int) -> dict[str, np.ndarray]:
+    """orders[0] applies when team1 wins the toss, orders[1] when team2 does."""
+    rng = np.random.default_rng(seed)
+    team1_toss = rng.random(n) < 0.5
+    team1_runs = np.zeros(n, dtype=np.int32)
+    team2_runs = np.zeros(n, dtype=np.int32)
+    team1_first = np.zeros(n, dtype=bool)
+    for order, mask in zip(orders, (team1_toss, ~team1_toss)):
+        k = int(mask.sum())
+        first = _simulate_innings(order["first"], rng, k)
+        chase = _simulate_innings(order["chase"], rng, k, target=first["runs"] + 1)
+        if order["team1_first"]:
+            team1_runs[mask], team2_runs[mask] = first["runs"], chase["runs"]
+        else:
+            team1_runs[mask], team2_runs[mask] = chase["runs"], first["runs"]
+        team1_first[mask] = order["team1_first"]
+    return {"team1": team1_runs, "team2": team2_runs, "team1_first": team1_first}
+
+
+def _match_orders(team1: str, team2: str, fmt: str, xi1: list[str], xi2: list[str], venue: str | None, weather: str | None) -> tuple[dict[str, Any], ...]:
+    decision = "bowl" if toss_impact(fmt, venue, weather)["chase_advantage"] >= 50 else "bat"
+    chase_bonus = next((w["chasing_impact"] for w in WEATHER_TYPES if w["label"] == weather), 0.0)
+    xis = {team1: xi1, team2: xi2}
+    orders = []
+    for winner in (team1, team2):
+        loser = team2 if winner == team1 else team1
+        bat_first, chasing = (winner, loser) if decision == "bat" else (loser, winner)
+        params = []
+        for batting, bowling in ((bat_first, chasing), (chasing, bat_first)):
+            payload = {
+                "batting_team": batting,
+                "selected_xi": xis[batting],
+                "bowling_team": bowling,
+                "bowling_xi": xis[bowling],
+                "venue": venue,
+                "weather": weather,
+                "toss_winner": winner,
+                "toss_decision": decision,
+            }
+            params.append(_innings_sim_params(fmt, _predict_context(payload, fmt), 0, 0, 0))
+        chase = dict(params[1])
+        chase["run_rate"] = np.clip(chase["run_rate"] * (1 + chase_bonus), 0.2, 2.4)
+        orders.append({"team1_first": bat_first == team1, "first": params[0], "chase": chase})
+    return tuple(orders)
+
+
+def simulate_match(
+    team1: str,
+    team2: str,
+    fmt: str,
+    xi1: list[str],
+    xi2: list[str],
+    venue: str | None = None,
+    weather: str | None = None,
+    simulations: int = 5000,
+    seed: int = 42,
+) -> dict[str, Any]:
+    """Full-match Monte Carlo: coin-toss, toss-winner's preferred decision, first innings, then the chase."""
+    n = int(simulations)
+    if n < 100 or n > 200000:
+        raise ValueError("Simulations should be between 100 and 200000")
+    orders = _match_orders(team1, team2, fmt, xi1, xi2, venue, weather)
+    started = time.perf_counter()
+    # Two innings per simulation: smaller chunks so a default-sized run already spreads over cores.
+    parts, workers = _run_sim_chunks(_simulate_match_chunk, (orders,), n, int(seed), chunk=2500, pool_min=10000)
+    elapsed = max(1e-9, time.perf_counter() - started)
+
+    t1 = np.concatenate([p["team1"] for p in parts])
+    t2 = np.concatenate([p["team2"] for p in parts])
+    t1_first = np.concatenate([p["team1_first"] for p in parts])
+    ties = t1 == t2
+    # A tie goes to a super over, scored as a coin flip.
+    wins = (t1 > t2) + (0.5 * ties)
+    p = float(wins.mean())
+    half_width = 1.96 * float(wins.std()) / math.sqrt(n)
+    first_won = np.where(t1_first, t1 > t2, t2 > t1)
+    return {
+        "team1_win_chance": round(p * 100.0, 1),
+        "team2_win_chance": round((1.0 - p) * 100.0, 1),
+        "ci95": [round(max(0.0, p - half_width) * 100.0, 1), round(min(1.0, p + half_width) * 100.0, 1)],
+        "tie_prob": round(float(ties.mean()), 4),
+        "avg_score": {"team1": round(float(t1.mean()), 1), "team2": round(float(t2.mean()), 1)},
+        "bat_first_win_rate": round(float(first_won[~ties].mean()) if (~ties).any() else 0.0, 4),
+        "simulations": n,
+        "seed": int(seed),
+        "workers": workers,
+        "elapsed_ms": round(elapsed * 1000.0, 2),
+        "sims_per_sec": round(n / elapsed, 1),
+    }
+
+
+def compare_teams(
+    team1: str,
+    team2: str,
+    fmt: str,
+    xi1: list[str],
+    xi2: list[str],
+    venue: str | None = None,
+    weather: str | None = None,
+    simulate: bool = False,
+    simulations: int = 5000,
+    seed: int = 42,
+) -> dict[str, Any]:
+    a_profile = xi_profile(team1, fmt, xi1)
+    b_profile = xi_profile(team2, fmt, xi2)
 
-    a = team_breakdown(a_xi, fmt)
-    b = team_breakdown(b_xi, fmt)
-    a_xi_check = xi_validator(a_xi, fmt)
-    b_xi_check = xi_validator(b_xi, fmt)
+    a = a_profile.breakdown
+    b = b_profile.breakdown
+    a_xi_check = a_profile.validation
+    b_xi_check = b_profile.validation
     diff = a["overall"] - b["overall"]
     team1_win_chance = _clamp(50.0 + (diff * 3.0), 1.0, 99.0)
     h2h = head_to_head_overlay(team1, team2, fmt)
     team1_form = TEAM_RECENT_FORM.get(team1, {}).get(fmt, "N/A")
     team2_form = TEAM_RECENT_FORM.get(team2, {}).get(fmt, "N/A")
+    simulation = simulate_match(team1, team2, fmt, xi1, xi2, venue, weather, simulations, seed) if simulate else None
+    if simulation is not None:
+        team1_win_chance = simulation["team1_win_chance"]
 
-    return {
+    result = {
         "team1": {"name": team1, **a},
         "team2": {"name": team2, **b},
         "edge": team1 if a["overall"] >= b["overall"] else team2,
@@ -3386,6 +5775,394 @@ def compare_teams(team1: str, team2: str, fmt: str, xi1: list[str], xi2: list[st
         "radar_team1": [a["batting"], a["bowling"], a["role_balance"], a["overall"]],
         "radar_team2": [b["batting"], b["bowling"], b["role_balance"], b["overall"]],
     }
+    if simulation is not None:
+        result["simulation"] = simulation
+    return result
+
+
+@lru_cache(maxsize=64)
+def _compare_matrix_cached(fmt: str, teams: tuple[str, ...]) -> MappingProxyType:
+    breakdowns = [xi_profile(team, fmt, None).breakdown for team in teams]
+    ratings = {k: np.array([b[k] for b in breakdowns], dtype=float) for k in ("batting", "bowling", "role_balance", "overall")}
+    # Same arithmetic as compare_teams, for every ordered pair at once: row team vs column team.
+    diff = ratings["overall"][:, None] - ratings["overall"][None, :]
+    win = np.maximum(1.0, np.minimum(99.0, 50.0 + (diff * 3.0)))
+    h2h = [[head_to_head_overlay(a, b, fmt)["team1_wins"] if a != b else 0 for b in teams] for a in teams]
+    return _freeze(
+        {
+            "format": fmt,
+            "teams": list(teams),
+            "ratings": {k: [b[k] for b in breakdowns] for k in ratings},
+            "gap": [[round(v, 2) for v in row] for row in diff.tolist()],
+            "win_chance": [[round(v, 1) for v in row] for row in win.tolist()],
+            "h2h_wins": h2h,
+            "recent_form": [TEAM_RECENT_FORM.get(team, {}).get(fmt, "N/A") for team in teams],
+        }
+    )
+
+
+on_squads_reloaded(_compare_matrix_cached.cache_clear)
+
+
+def compare_matrix_cache_stats() -> dict[str, int]:
+    info = _compare_matrix_cached.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize or 0}
+
+
+def compare_matrix(payload: dict[str, Any]) -> dict[str, Any]:
+    """All-pairs compare_teams on default XIs: gap[i][j] and win_chance[i][j] are teams[i] against teams[j].
+
+    Like unsimulated compare_teams, ratings and win_chance ignore venue and weather; those only feed toss_impact.
+    """
+    fmt = format_key(payload.get("format"))
+    teams = payload.get("teams") or [t["name"] for t in TOP_ODI_TEAMS]
+    unknown = [t for t in teams if t not in TEAM_DATA]
+    if unknown:
+        raise ValueError(f"Unknown teams: {', '.join(map(str, unknown))}")
+    if len(set(teams)) < 2:
+        raise ValueError("Provide at least two distinct teams")
+    started = time.perf_counter()
+    hits = _compare_matrix_cached.cache_info().hits
+    venue = payload.get("venue") or None
+    weather = payload.get("weather") or None
+    result = dict(_compare_matrix_cached(fmt, tuple(teams)))
+    result.update({"venue": venue, "weather": weather, "toss_impact": toss_impact(fmt, venue, weather)})
+    result["cached"] = _compare_matrix_cached.cache_info().hits > hits
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000.0, 3)
+    return result
+
+
+_HOME_EDGE = 4.0
+_HOME_COUNTRIES = {"England": {"England", "Wales"}}
+
+
+def _is_home(team: str, venue: str | None) -> bool:
+    info = _venue_lookup(venue)
+    if not info:
+        return False
+    if team == "West Indies":
+        return info["region"] == "Caribbean"
+    return info["country"] in _HOME_COUNTRIES.get(team, {team})
+
+
+def _host_venues(host: str | None) -> list[str]:
+    if not host:
+        return []
+    return [v["name"] for v in VENUES if _is_home(host, v["name"]) or v["country"] == host]
+
+
+def _neutral_venues(team1: str, team2: str) -> list[str]:
+    return [v["name"] for v in VENUES if not _is_home(team1, v["name"]) and not _is_home(team2, v["name"])]
+
+
+def generate_fixtures(
+    fmt: str, teams: list[str] | None = None, start: date | None = None, host: str | None = None, neutral: bool = False
+) -> list[dict[str, Any]]:
+    """Single round-robin schedule; venues rotate through the host's grounds, or each fixture's home side's grounds.
+
+    With neutral=True and no host, venues rotate through grounds that are home to neither side instead.
+    """
+    teams = teams or [t["name"] for t in TOP_ODI_TEAMS]
+    start = start or date.today()
+    hosted = _host_venues(host)
+    day_jump = 2 if fmt == "t20" else 4
+    fixtures = []
+    idx = 0
+    for i, team1 in enumerate(teams):
+        for team2 in teams[i + 1 :]:
+            d = start + timedelta(days=idx * day_jump)
+            status = "upcoming"
+            if d == start:
+                status = "live"
+            elif d < start:
+                status = "recent"
+            grounds = hosted or (_neutral_venues(team1, team2) if neutral else _host_venues(team1))
+            fixtures.append(
+                {
+                    "date": d.isoformat(),
+                    "format": fmt,
+                    "team1": team1,
+                    "team2": team2,
+                    "title": f"{team1} vs {team2}",
+                    "home": team1,
+                    "away": team2,
+                    "venue": grounds[idx % len(grounds)] if grounds else None,
+                    "status": status,
+                }
+            )
+            idx += 1
+    return fixtures
+
+
+def _match_win_prob(overall: dict[str, float], team1: str, team2: str, venue: str | None) -> float:
+    """compare_teams' rating-gap win chance, shifted by a home edge when the venue is in either side's country."""
+    edge = (_HOME_EDGE if _is_home(team1, venue) else 0.0) - (_HOME_EDGE if _is_home(team2, venue) else 0.0)
+    return _clamp(50.0 + ((overall[team1] - overall[team2]) * 3.0) + edge, 1.0, 99.0) / 100.0
+
+
+def _tournament_chunk(setup: dict[str, Any], seed: np.random.SeedSequence, n: int) -> dict[str, np.ndarray]:
+    """n tournaments: league results as one (n, matches) draw, then seeded 1v4 / 2v3 semi-finals and a final."""
+    rng = np.random.default_rng(seed)
+    teams = len(setup["teams"])
+    home, away, p = setup["home"], setup["away"], setup["p"]
+    knockout = setup["knockout"]
+    home_won = (rng.random((n, len(p))) < p).astype(float)
+    # (n, matches) @ (matches, teams) one-hot sides gives every team's league wins per tournament.
+    wins = (home_won @ np.eye(teams)[home]) + ((1.0 - home_won) @ np.eye(teams)[away])
+    # Net run rate is not simulated; level teams are separated by a random tiebreak.
+    order = np.argsort(-(wins + rng.random((n, teams)) * 0.5), axis=1)
+    rows = np.arange(n)
+
+    def play(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        return np.where(rng.random(n) < knockout[a, b], a, b)
+
+    finalist_1 = play(order[:, 0], order[:, 3])
+    finalist_2 = play(order[:, 1], order[:, 2])
+    champion = play(finalist_1, finalist_2)
+    rank = np.empty_like(order)
+    rank[rows[:, None], order] = np.arange(teams)[None, :]
+    return {
+        "qualified": np.bincount(order[:, :4].ravel(), minlength=teams),
+        "final": np.bincount(np.concatenate([finalist_1, finalist_2]), minlength=teams),
+        "title": np.bincount(champion, minlength=teams),
+        "points": (wins * 2).sum(axis=0),
+        "rank": (rank + 1).sum(axis=0),
+    }
+
+
+def simulate_tournament(payload: dict[str, Any]) -> dict[str, Any]:
+    """Monte Carlo of the full round-robin fixture list plus top-four knockouts, from team_breakdown strengths."""
+    fmt = format_key(payload.get("format"))
+    teams = payload.get("teams") or [t["name"] for t in TOP_ODI_TEAMS]
+    unknown = [t for t in teams if t not in TEAM_DATA]
+    if unknown:
+        raise ValueError(f"Unknown teams: {', '.join(map(str, unknown))}")
+    if len(set(teams)) != len(teams) or len(teams) < 4:
+        raise ValueError("Provide at least four distinct teams")
+    n = int(payload.get("simulations", 20000))
+    if n < 100 or n > 500000:
+        raise ValueError("Simulations should be between 100 and 500000")
+    seed = int(payload.get("seed", 42))
+    host = payload.get("host") or None
+    if host and not _host_venues(host):
+        raise ValueError(f"No venues found for host '{host}'")
+    # Hostless tournaments default to neutral grounds so no side's home edge depends on list order.
+    neutral = bool(payload.get("neutral", host is None))
+
+    overall = {t: xi_profile(t, fmt, None).breakdown["overall"] for t in teams}
+    fixtures = generate_fixtures(fmt, teams, host=host, neutral=neutral)
+    index = {t: i for i, t in enumerate(teams)}
+    knockout_venue = payload.get("knockout_venue") or (_host_venues(host)[0] if host else None)
+    setup = {
+        "teams": teams,
+        "home": np.array([index[f["team1"]] for f in fixtures]),
+        "away": np.array([index[f["team2"]] for f in fixtures]),
+        "p": np.array([_match_win_prob(overall, f["team1"], f["team2"], f["venue"]) for f in fixtures]),
+        "knockout": np.array([[_match_win_prob(overall, a, b, knockout_venue) for b in teams] for a in teams]),
+    }
+    started = time.perf_counter()
+    parts, workers = _run_sim_chunks(_tournament_chunk, (setup,), n, seed, chunk=10000, pool_min=40000)
+    elapsed = max(1e-9, time.perf_counter() - started)
+    totals = {k: sum(part[k] for part in parts) for k in parts[0]}
+
+    table = [
+        {
+            "team": team,
+            "overall": overall[team],
+            "qualify_pct": round(float(totals["qualified"][i]) * 100.0 / n, 2),
+            "final_pct": round(float(totals["final"][i]) * 100.0 / n, 2),
+            "title_pct": round(float(totals["title"][i]) * 100.0 / n, 2),
+            "avg_points": round(float(totals["points"][i]) / n, 2),
+            "avg_rank": round(float(totals["rank"][i]) / n, 2),
+        }
+        for i, team in enumerate(teams)
+    ]
+    table.sort(key=lambda r: (-r["title_pct"], -r["qualify_pct"]))
+    return {
+        "format": fmt,
+        "host": host,
+        "neutral": neutral and host is None,
+        "knockout_venue": knockout_venue,
+        "league_matches": len(fixtures),
+        "teams": table,
+        "simulations": n,
+        "seed": seed,
+        "workers": workers,
+        "elapsed_ms": round(elapsed * 1000.0, 2),
+        "tournaments_per_sec": round(n / elapsed, 1),
+    }
+
+
+@lru_cache(maxsize=None)
+def _trajectory_factors(fmt: str) -> dict[str, np.ndarray]:
+    """Over-wise multipliers for run_trajectory, indexed by over number (0 unused); rhythm is indexed [wickets, over]."""
+    max_overs = FORMAT_RULES[fmt]["max_overs"]
+    overs = range(max_overs + 1)
+    if fmt == "t20":
+        boost = [1.06 if o <= 6 else (0.93 if o <= 15 else 1.18) for o in overs]
+        accel = [0.9 + (0.42 * ((o / max_overs) ** 1.6)) for o in overs]
+    else:
+        boost = [1.04 if o <= 10 else (0.91 if o <= 35 else 1.1) for o in overs]
+        accel = [0.86 + (0.54 * ((o / max_overs) ** 1.9)) for o in overs]
+    return {
+        "phase_boost": np.array(boost),
+        "accel_curve": np.array(accel),
+        "surge": np.array([1.075 if (o % 5 == 0 or o % 7 == 0) else 1.0 for o in overs]),
+        "rhythm": np.array([[1.0 + (0.055 * math.sin((o * 0.84) + (w * 0.45))) for o in overs] for w in range(11)]),
+        "wicket_factor": np.array([_clamp(0.79 + ((10 - w) * 0.028), 0.66, 1.07) for w in range(11)]),
+        "rr_bounds": np.array([4.0, 16.0] if fmt == "t20" else [2.8, 12.2]),
+    }
+
+
+@lru_cache(maxsize=None)
+def _trajectory_factor_lists(fmt: str) -> dict[str, Any]:
+    """_trajectory_factors as plain lists, for the one-state loop where NumPy scalars cost more than they save."""
+    return {k: v.tolist() for k, v in _trajectory_factors(fmt).items()}
+
+
+def _trajectory_path(
+    fmt: str, score: int, wickets: int, over_start: int, current_rr: float, target_f: float | None = None
+) -> list[int]:
+    """Single-state recurrence over the precomputed factor lists; same arithmetic as trajectory_matrix."""
+    f = _trajectory_factor_lists(fmt)
+    max_overs = FORMAT_RULES[fmt]["max_overs"]
+    boost, accel, surge, rhythm = f["phase_boost"], f["accel_curve"], f["surge"], f["rhythm"][wickets]
+    wicket_factor = f["wicket_factor"][wickets]
+    min_rr, max_rr = f["rr_bounds"]
+    upper = max_rr + ((10 - wickets) * 0.22)
+    current = float(score)
+    path = [score] * max_overs
+    if target_f is None:
+        for over in range(over_start, max_overs + 1):
+            over_rr = current_rr * boost[over] * accel[over] * wicket_factor * rhythm[over] * surge[over]
+            current += _clamp(over_rr, min_rr, upper)
+            path[over - 1] = int(round(current))
+        return path
+    scale = max(80.0, target_f * 0.34)
+    for over in range(over_start, max_overs + 1):
+        gap = ((target_f / max_overs) * over) - current
+        chase_factor = _clamp(1.0 + (gap / scale), 0.9, 1.18)
+        over_rr = current_rr * boost[over] * accel[over] * wicket_factor * rhythm[over] * surge[over] * chase_factor
+        current += _clamp(over_rr, min_rr, upper)
+        path[over - 1] = int(round(current))
+    return path
+
+
+def trajectory_matrix(
+    fmt: str, score: np.ndarray, wickets: np.ndarray, balls_done: np.ndarray, target: np.ndarray | None = None
+) -> np.ndarray:
+    """Projected cumulative runs at the end of overs 1..max_overs for many live states, shape (n, max_overs).
+
+    Overs before each state's current over carry its score. Without a target every over's rate is known up front,
+    so the path is one cumulative sum; a chase factor depends on the running projection and is stepped over by over
+    (vectorized across states). Operation order matches the scalar recurrence exactly.
+    """
+    f = _trajectory_factors(fmt)
+    max_overs = FORMAT_RULES[fmt]["max_overs"]
+    score = np.asarray(score)
+    wickets = np.minimum(10, np.asarray(wickets))
+    balls_done = np.asarray(balls_done)
+    over_start = (balls_done + 5) // 6
+    current_rr = score / (balls_done / 6.0)
+    wickets_in_hand = 10 - wickets
+    over_idx = np.arange(1, max_overs + 1)
+    active = over_idx[None, :] >= over_start[:, None]
+
+    over_rr = (
+        current_rr[:, None]
+        * f["phase_boost"][None, 1:]
+        * f["accel_curve"][None, 1:]
+        * f["wicket_factor"][wickets][:, None]
+        * f["rhythm"][wickets][:, 1:]
+        * f["surge"][None, 1:]
+    )
+    min_rr, max_rr = f["rr_bounds"]
+    upper = (max_rr + (wickets_in_hand * 0.22))[:, None]
+    start = score.astype(float)
+    if target is None:
+        over_rr = np.maximum(min_rr, np.minimum(upper, over_rr))
+        over_rr = np.where(active, over_rr, 0.0)
+        path = np.cumsum(np.concatenate([start[:, None], over_rr], axis=1), axis=1)[:, 1:]
+        return np.rint(path).astype(int)
+
+    target = np.asarray(target, dtype=float)
+    chasing = ~np.isnan(target)
+    rate = np.where(chasing, target, 0.0) / max_overs
+    scale = np.maximum(80.0, np.where(chasing, target, 0.0) * 0.34)
+    path = np.empty((len(score), max_overs))
+    current = start
+    for j, over in enumerate(over_idx):
+        gap = (rate * over) - current
+        chase_factor = np.where(chasing, np.maximum(0.9, np.minimum(1.18, 1.0 + (gap / scale))), 1.0)
+        step = np.maximum(min_rr, np.minimum(upper[:, 0], over_rr[:, j] * chase_factor))
+        current = np.where(active[:, j], current + step, current)
+        path[:, j] = current
+    return np.rint(path).astype(int)
+
+
+def run_trajectory_batch(payload: dict[str, Any]) -> dict[str, Any]:
+    """Trajectories for many states in one call: states grouped by format and built with trajectory_matrix.
+
+    Each result has the same shape as run_trajectory for that state, or {"error": ...}.
+    """
+    states = payload.get("states")
+    if not isinstance(states, list) or not states:
+        raise ValueError("Provide a non-empty 'states' list")
+    if len(states) > 20000:
+        raise ValueError("At most 20000 states per batch")
+    shared = payload.get("context") if isinstance(payload.get("context"), dict) else {}
+
+    started = time.perf_counter()
+    results: list[dict[str, Any] | None] = [None] * len(states)
+    pending: dict[str, list[tuple[int, int, int, int, float]]] = {f: [] for f in FORMAT_RULES}
+    inputs: list[tuple[str, int, int, int, Any, Any] | None] = [None] * len(states)
+    for idx, state in enumerate(states):
+        if not isinstance(state, dict):
+            results[idx] = {"error": "Each state must be an object"}
+            continue
+        state = {**shared, **state}
+        try:
+            fmt = format_key(state.get("format"))
+            max_overs = FORMAT_RULES[fmt]["max_overs"]
+            score = int(state.get("score", 0))
+            wickets = int(state.get("wickets", 0))
+            if score < 0:
+                raise ValueError("Score cannot be negative")
+            if wickets < 0 or wickets > 10:
+                raise ValueError("Wickets should be between 0 and 10")
+            balls_done = overs_to_balls(float(state.get("overs", 0.0)), max_overs)
+            if balls_done <= 0:
+                raise ValueError("Overs must be greater than 0 for trajectory")
+            target = state.get("target")
+            target_f = float("nan") if target is None else float(target)
+            inputs[idx] = (fmt, score, wickets, balls_done, target, state.get("current_timeline"))
+            if bool(state.get("innings_complete")) or wickets >= 10 or balls_done >= max_overs * 6:
+                results[idx] = _trajectory_output(*inputs[idx][:5], [], [], inputs[idx][5])
+                continue
+            pending[fmt].append((idx, score, wickets, balls_done, target_f))
+        except ValueError as exc:
+            results[idx] = {"error": str(exc)}
+        except (TypeError, KeyError):
+            results[idx] = {"error": "Unable to build trajectory"}
+
+    for fmt, rows in pending.items():
+        if not rows:
+            continue
+        cols = list(zip(*rows))
+        target = np.array(cols[4])
+        paths = trajectory_matrix(
+            fmt, np.array(cols[1]), np.array(cols[2]), np.array(cols[3]), None if np.isnan(target).all() else target
+        ).tolist()
+        for (idx, _, _, balls_done, _), path in zip(rows, paths):
+            first = (balls_done + 5) // 6
+            labels = [str(o) for o in range(first, len(path) + 1)]
+            results[idx] = _trajectory_output(*inputs[idx][:5], labels, path[first - 1 :], inputs[idx][5])
+
+    elapsed = max(1e-9, time.perf_counter() - started)
+    return {
+        "results": results,
+        "throughput": {"states": len(states), "elapsed_ms": round(elapsed * 1000.0, 2), "states_per_sec": round(len(states) / elapsed, 1)},
+    }
 
 
 def run_trajectory(payload: dict[str, Any]) -> dict[str, Any]:
@@ -3413,52 +6190,49 @@ def run_trajectory(payload: dict[str, Any]) -> dict[str, Any]:
 
     labels: list[str] = []
     projected: list[int] = []
-    chase_line: list[float] = []
 
     if not innings_complete:
-        current_projection = float(score)
         target_f = float(target) if target is not None else None
+        path = _trajectory_path(fmt, score, wickets, over_start, current_rr, target_f)
         for over in range(over_start, max_overs + 1):
-            if fmt == "t20":
-                if over <= 6:
-                    phase_boost = 1.06
-                elif over <= 15:
-                    phase_boost = 0.93
-                else:
-                    phase_boost = 1.18
-                min_rr, max_rr = 4.0, 16.0
-            else:
-                if over <= 10:
-                    phase_boost = 1.04
-                elif over <= 35:
-                    phase_boost = 0.91
-                else:
-                    phase_boost = 1.1
-                min_rr, max_rr = 2.8, 12.2
-
-            phase = over / max_overs
-            accel_curve = (0.9 + (0.42 * (phase ** 1.6))) if fmt == "t20" else (0.86 + (0.54 * (phase ** 1.9)))
-            wicket_factor = _clamp(0.79 + (wickets_in_hand * 0.028), 0.66, 1.07)
-            rhythm = 1.0 + (0.055 * math.sin((over * 0.84) + (wickets * 0.45)))
-            surge = 1.075 if (over % 5 == 0 or over % 7 == 0) else 1.0
-
-            chase_factor = 1.0
-            if target_f is not None:
-                expected_at_over = (target_f / max_overs) * over
-                gap = expected_at_over - current_projection
-                chase_factor = _clamp(1.0 + (gap / max(80.0, target_f * 0.34)), 0.9, 1.18)
-
-            over_rr = current_rr * phase_boost * accel_curve * wicket_factor * rhythm * surge * chase_factor
-            over_rr = _clamp(over_rr, min_rr, max_rr + (wickets_in_hand * 0.22))
-            current_projection += over_rr
             labels.append(str(over))
-            projected.append(int(round(current_projection)))
-            if target is not None:
-                chase_line.append(round((target_f / max_overs) * over, 1))
+            projected.append(path[over - 1])
+
+    return _trajectory_output(fmt, score, wickets, balls_done, target, labels, projected, payload.get("current_timeline"))
+
+
+@lru_cache(maxsize=2048)
+def _timeline_shares(fmt: str, overs_used: int, wickets: int) -> tuple[float, ...]:
+    """Per-over share of the runs so far, for a synthetic current_line when no live timeline is sent."""
+    max_overs = FORMAT_RULES[fmt]["max_overs"]
+    weights: list[float] = []
+    for i in range(1, overs_used + 1):
+        phase = i / max_overs
+        if fmt == "t20":
+            base_w = 1.14 if i <= 6 else (0.9 if i <= 15 else 1.22)
+        else:
+            base_w = 1.08 if i <= 10 else (0.88 if i <= 35 else 1.18)
+        accel = 0.9 + (0.45 * (phase ** 1.8))
+        wobble = 1.0 + (0.06 * math.sin((i * 0.9) + (wickets * 0.35)))
+        weights.append(max(0.28, base_w * accel * wobble))
+    total_w = sum(weights) or 1.0
+    return tuple(w / total_w for w in weights)
+
 
+def _trajectory_output(
+    fmt: str,
+    score: int,
+    wickets: int,
+    balls_done: int,
+    target: Any,
+    labels: list[str],
+    projected: list[int],
+    timeline: Any,
+) -> dict[str, Any]:
+    """Response shape shared by run_trajectory and run_trajectory_batch."""
+    max_overs = FORMAT_RULES[fmt]["max_overs"]
     # Build current timeline line if available from live ingestion.
     current_line: list[int | None] = [None] * max_overs
-    timeline = payload.get("current_timeline")
     if isinstance(timeline, dict) and isinstance(timeline.get("overs"), list) and isinstance(timeline.get("runs"), list):
         overs_list = timeline.get("overs", [])
         runs_list = timeline.get("runs", [])
@@ -3475,20 +6249,9 @@ def run_trajectory(payload: dict[str, Any]) -> dict[str, Any]:
                 continue
     else:
         overs_used = max(1, int(math.ceil(balls_done / 6.0)))
-        weights: list[float] = []
-        for i in range(1, overs_used + 1):
-            phase = i / max_overs
-            if fmt == "t20":
-                base_w = 1.14 if i <= 6 else (0.9 if i <= 15 else 1.22)
-            else:
-                base_w = 1.08 if i <= 10 else (0.88 if i <= 35 else 1.18)
-            accel = 0.9 + (0.45 * (phase ** 1.8))
-            wobble = 1.0 + (0.06 * math.sin((i * 0.9) + (wickets * 0.35)))
-            weights.append(max(0.28, base_w * accel * wobble))
-        total_w = sum(weights) or 1.0
         running = 0.0
-        for i, w in enumerate(weights, start=1):
-            running += score * (w / total_w)
+        for i, share in enumerate(_timeline_shares(fmt, overs_used, wickets), start=1):
+            running += score * share
             current_line[i - 1] = int(round(min(score, running)))
 
     full_labels = [str(i) for i in range(1, max_overs + 1)]
@@ -3502,8 +6265,218 @@ def run_trajectory(payload: dict[str, Any]) -> dict[str, Any]:
     if isinstance(timeline, dict) and isinstance(timeline.get("wicket_overs"), list):
         out["wicket_overs"] = timeline.get("wicket_overs", [])
     if target is not None:
-        if chase_line:
-            out["target_line"] = chase_line
-        else:
-            out["target_line"] = [round((float(target) / max_overs) * over, 1) for over in range(1, max_overs + 1)]
+        first = int(labels[0]) if labels else 1
+        out["target_line"] = [round((float(target) / max_overs) * over, 1) for over in range(first, max_overs + 1)]
     return out
+
+
+class SessionNotFound(Exception):
+    pass
+
+
+_SESSION_LIMIT = 256
+_SESSIONS: OrderedDict[str, MatchSession] = OrderedDict()
+_SESSIONS_LOCK = threading.Lock()
+
+
+SESSION_VIEWS = ("trajectory", "uncertainty")
+
+
+class MatchSession:
+    """Live innings kept server-side: XIs, venue, conditions and chase context resolved once, projections refreshed per ball."""
+
+    SETUP_KEYS = (
+        "batting_team",
+        "selected_xi",
+        "bowling_team",
+        "bowling_xi",
+        "chasing_xi",
+        "venue",
+        "pitch",
+        "weather",
+        "toss_winner",
+        "toss_decision",
+        "model",
+    )
+
+    def __init__(self, payload: dict[str, Any]):
+        self.fmt = format_key(payload.get("format"))
+        self.max_balls = FORMAT_RULES[self.fmt]["max_overs"] * 6
+        self.score = int(payload.get("score", 0))
+        self.wickets = int(payload.get("wickets", 0))
+        if self.score < 0:
+            raise ValueError("Score cannot be negative")
+        if self.wickets < 0 or self.wickets > 10:
+            raise ValueError("Wickets should be between 0 and 10")
+        self.balls = overs_to_balls(float(payload.get("overs", 0.0)), FORMAT_RULES[self.fmt]["max_overs"])
+        self.target = int(payload["target"]) if payload.get("target") not in (None, "") else None
+        if self.target is not None and self.target <= 0:
+            raise ValueError("Target must be greater than 0")
+        self.setup = {k: payload[k] for k in self.SETUP_KEYS if payload.get(k) not in (None, "")}
+        self.extras = 0
+        self.history: list[dict[str, Any]] = []
+        self.version = 0
+        self.lock = threading.Lock()
+
+        self.ctx = _predict_context(payload, self.fmt)
+        self.cctx = None
+        if self.target is not None:
+            chase_payload = {**payload, "chasing_team": payload.get("chasing_team") or payload.get("batting_team")}
+            chase_payload.setdefault("chasing_xi", payload.get("selected_xi", []))
+            self.cctx = _chase_context(chase_payload, self.fmt)
+        self._refresh()
+
+    @property
+    def overs(self) -> float:
+        return float(f"{self.balls // 6}.{self.balls % 6}")
+
+    def _closed_at(self, score: int, wickets: int, balls: int) -> bool:
+        chased = self.target is not None and score >= self.target
+        return wickets >= 10 or balls >= self.max_balls or chased
+
+    @property
+    def closed(self) -> bool:
+        return self._closed_at(self.score, self.wickets, self.balls)
+
+    def _state_payload(self) -> dict[str, Any]:
+        payload = {**self.setup, "format": self.fmt, "score": self.score, "wickets": self.wickets, "overs": self.overs}
+        if self.target is not None:
+            payload["target"] = self.target
+            payload["chasing_team"] = self.setup.get("batting_team", "")
+        return payload
+
+    def _refresh(self) -> None:
+        # Only the score/balls/wickets-dependent halves are recomputed; trajectory and fan are lazy views.
+        self.views: dict[str, Any] = {}
+        if self.balls == 0:
+            self.projection = None
+        elif self.closed:
+            self.projection = predict_score(self._state_payload())
+        else:
+            self.projection = _predict_from_context(self.fmt, self.ctx, self.score, self.wickets, self.balls)
+        self.win = None
+        if self.cctx is not None:
+            if self.closed:
+                self.win = win_probability(self._state_payload())
+            else:
+                self.win = _win_from_context(
+                    self.fmt, self.cctx, self.score, self.wickets, self.balls, self.target, self.setup.get("model", "dp")
+                )
+
+    def apply(self, deltas: list[dict[str, Any]]) -> None:
+        """Apply balls all or nothing: every delta is checked against the running state before any is recorded."""
+        score, extras_total, balls, wickets = self.score, self.extras, self.balls, self.wickets
+        rows = []
+        for delta in deltas:
+            if self._closed_at(score, wickets, balls):
+                raise ValueError("Innings is complete; start a new session")
+            if not isinstance(delta, dict):
+                raise ValueError("Each ball must be an object")
+            runs = int(delta.get("runs", 0))
+            extras = int(delta.get("extras", 0))
+            extra_type = str(delta.get("extra_type", "") or "").strip().lower().replace("-", "").replace(" ", "")
+            if runs < 0 or runs > 7 or extras < 0 or extras > 7:
+                raise ValueError("Runs and extras per ball should be between 0 and 7")
+            if extra_type not in {"", "wide", "noball", "bye", "legbye"}:
+                raise ValueError("extra_type should be wide, noball, bye or legbye")
+            legal = extra_type not in {"wide", "noball"}
+            if not legal and extras == 0:
+                extras = 1
+            wicket = bool(delta.get("wicket", False))
+            score += runs + extras
+            extras_total += extras
+            balls += 1 if legal else 0
+            wickets += 1 if wicket else 0
+            rows.append({"ball": f"{balls // 6}.{balls % 6}", "runs": runs, "extras": extras, "extra_type": extra_type or None, "wicket": wicket})
+        self.score, self.extras, self.balls, self.wickets = score, extras_total, balls, wickets
+        self.history.extend(rows)
+        self.version += 1
+        self._refresh()
+
+    def view(self, name: str) -> Any:
+        if name not in self.views:
+            if self.balls == 0:
+                self.views[name] = None
+            elif name == "trajectory":
+                self.views[name] = run_trajectory(self._state_payload())
+            elif name == "uncertainty":
+                traj = run_trajectory({"format": self.fmt, "score": self.score, "wickets": self.wickets, "overs": self.overs})
+                self.views[name] = _fan_from(self.fmt, self.score, self.wickets, self.balls, self.projection, traj)
+            else:
+                raise ValueError(f"include accepts {', '.join(SESSION_VIEWS)}")
+        return self.views[name]
+
+    def snapshot(self, session_id: str, include: list[str] | None = None) -> dict[str, Any]:
+        out = {
+            "session_id": session_id,
+            "version": self.version,
+            "format": self.fmt,
+            "state": {
+                "score": self.score,
+                "wickets": self.wickets,
+                "overs": self.overs,
+                "balls_bowled": self.balls,
+                "balls_left": self.max_balls - self.balls,
+                "extras": self.extras,
+                "target": self.target,
+                "innings_closed": self.closed,
+            },
+            "projection": self.projection,
+            "win": self.win,
+            "last_ball": self.history[-1] if self.history else None,
+        }
+        for name in include or []:
+            out[name] = self.view(name)
+        return out
+
+
+def _session(session_id: str) -> MatchSession:
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(session_id)
+        if session is None:
+            raise SessionNotFound("Unknown or expired session")
+        _SESSIONS.move_to_end(session_id)
+        return session
+
+
+def _include_list(value: Any) -> list[str]:
+    if isinstance(value, str):
+        value = value.split(",")
+    names = [str(v).strip() for v in value or [] if str(v).strip()]
+    if any(name not in SESSION_VIEWS for name in names):
+        raise ValueError(f"include accepts {', '.join(SESSION_VIEWS)}")
+    return names
+
+
+def create_session(payload: dict[str, Any]) -> dict[str, Any]:
+    include = _include_list(payload.get("include"))
+    session = MatchSession(payload)
+    session_id = uuid.uuid4().hex
+    with _SESSIONS_LOCK:
+        _SESSIONS[session_id] = session
+        while len(_SESSIONS) > _SESSION_LIMIT:
+            _SESSIONS.popitem(last=False)
+    return session.snapshot(session_id, include)
+
+
+def session_snapshot(session_id: str, include: Any = None) -> dict[str, Any]:
+    session = _session(session_id)
+    with session.lock:
+        return session.snapshot(session_id, _include_list(include))
+
+
+def session_update(session_id: str, payload: dict[str, Any]) -> dict[str, Any]:
+    """Apply one ball ({"runs", "wicket", "extras", "extra_type"}) or several ({"balls": [...]})."""
+    session = _session(session_id)
+    deltas = payload.get("balls") if isinstance(payload.get("balls"), list) else [payload]
+    include = _include_list(payload.get("include"))
+    with session.lock:
+        session.apply(deltas)
+        return session.snapshot(session_id, include)
+
+
+def close_session(session_id: str) -> dict[str, Any]:
+    with _SESSIONS_LOCK:
+        if _SESSIONS.pop(session_id, None) is None:
+            raise SessionNotFound("Unknown or expired session")
+    return {"session_id": session_id, "closed": True}
@@ -0,0 +1,408 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+
+STORE_VERSION = 2
+DEFAULT_STORE = os.environ.get(
+    "CRICKET_HISTORY_STORE", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "history_store")
+)
+FORMAT_CODES = {"t20": 0, "odi": 1}
+MATCH_TYPES = {"T20": "t20", "IT20": "t20", "ODI": "odi", "ODM": "odi"}
+# Cricsheet info.gender / info.team_type; anything else is stored as -1.
+GENDER_CODES = {"male": 0, "female": 1}
+TEAM_TYPE_CODES = {"international": 0, "club": 1}
+
+# One row per delivery; `ball` is the legal-ball number within the over (1-6),
+# an illegal delivery carries the number of the ball still to be bowled.
+DELIVERY_COLUMNS = {
+    "match": "<i4",
+    "innings": "<i1",
+    "over": "<i2",
+    "ball": "<i1",
+    "runs": "<i2",
+    "extras": "<i2",
+    "legal": "<i1",
+    "wicket": "<i1",
+    "batter": "<i4",
+    "bowler": "<i4",
+}
+MATCH_COLUMNS = {
+    "format": "<i1",
+    "date": "<i4",
+    "venue": "<i4",
+    "team1": "<i4",
+    "team2": "<i4",
+    "start": "<i8",
+    "gender": "<i1",
+    "team_type": "<i1",
+}
+INNINGS_COLUMNS = {
+    "match": "<i4",
+    "innings": "<i1",
+    "batting": "<i4",
+    "bowling": "<i4",
+    "start": "<i8",
+    "stop": "<i8",
+    "runs": "<i4",
+    "wickets": "<i1",
+    "balls": "<i2",
+    "target": "<i4",
+}
+TABLES = {"deliveries": DELIVERY_COLUMNS, "matches": MATCH_COLUMNS, "innings": INNINGS_COLUMNS}
+
+
+def _load_match_file(path: str) -> dict[str, Any]:
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    try:
+        import yaml
+    except ModuleNotFoundError as exc:
+        raise ValueError("PyYAML is required to read YAML match files") from exc
+    with open(path, encoding="utf-8") as fh:
+        return yaml.safe_load(fh)
+
+
+def _date_code(value: Any) -> int:
+    if isinstance(value, date):
+        return (value.year * 10000) + (value.month * 100) + value.day
+    try:
+        y, m, d = str(value)[:10].split("-")
+        return (int(y) * 10000) + (int(m) * 100) + int(d)
+    except ValueError:
+        return 0
+
+
+def _wicket_count(delivery: dict[str, Any]) -> int:
+    if "wickets" in delivery:
+        return len(delivery["wickets"] or [])
+    wk = delivery.get("wicket")
+    if isinstance(wk, list):
+        return len(wk)
+    return 1 if wk else 0
+
+
+def _innings_blocks(raw: list[Any]) -> list[tuple[dict[str, Any], list[tuple[int, dict[str, Any]]]]]:
+    """Both Cricsheet layouts as (innings header, [(over, delivery), ...]); super overs are dropped."""
+    blocks = []
+    for item in raw or []:
+        if "overs" in item or "team" in item:
+            # JSON layout: {"team": ..., "overs": [{"over": 0, "deliveries": [...]}]}
+            if item.get("super_over"):
+                continue
+            balls = [(int(o["over"]), d) for o in item.get("overs", []) for d in o.get("deliveries", [])]
+            blocks.append((item, balls))
+            continue
+        # YAML layout: {"1st innings": {"team": ..., "deliveries": [{0.1: {...}}, ...]}}
+        for name, body in item.items():
+            if "super" in str(name).lower():
+                continue
+            balls = [(int(float(k)), d) for entry in body.get("deliveries", []) for k, d in entry.items()]
+            blocks.append((body, balls))
+    return blocks
+
+
+def parse_match(path: str) -> dict[str, Any] | None:
+    """One match file as plain lists, or None when it is not a limited-overs match."""
+    doc = _load_match_file(path)
+    info = doc.get("info", {})
+    fmt = MATCH_TYPES.get(str(info.get("match_type", "")).upper())
+    if fmt is None:
+        return None
+    teams = [str(t) for t in info.get("teams", [])][:2]
+    if len(teams) < 2:
+        return None
+
+    innings = []
+    for header, balls in _innings_blocks(doc.get("innings", [])):
+        team = str(header.get("team", ""))
+        rows = []
+        legal_in_over = 0
+        current_over = -1
+        for over, d in balls:
+            if over != current_over:
+                current_over, legal_in_over = over, 0
+            extras = d.get("extras") or {}
+            legal = 0 if ("wides" in extras or "noballs" in extras) else 1
+            legal_in_over += legal
+            runs = d.get("runs", {})
+            rows.append(
+                (
+                    over,
+                    legal_in_over if legal else legal_in_over + 1,
+                    int(runs.get("total", 0)),
+                    int(runs.get("extras", 0)),
+                    legal,
+                    _wicket_count(d),
+                    str(d.get("batter") or d.get("batsman") or ""),
+                    str(d.get("bowler", "")),
+                )
+            )
+        target = header.get("target", {})
+        innings.append({"team": team, "target": int(target.get("runs", 0)) if isinstance(target, dict) else 0, "balls": rows})
+
+    return {
+        "id": os.path.splitext(os.path.basename(path))[0],
+        "format": fmt,
+        "date": _date_code((info.get("dates") or [""])[0]),
+        "venue": str(info.get("venue", "")),
+        "gender": str(info.get("gender", "")).lower(),
+        "team_type": str(info.get("team_type", "")).lower(),
+        "teams": teams,
+        "innings": innings,
+    }
+
+
+def _safe_parse(path: str) -> tuple[str, dict[str, Any] | None, str]:
+    try:
+        return path, parse_match(path), ""
+    except Exception as exc:  # one bad file should not stop an ingest run
+        return path, None, f"{type(exc).__name__}: {exc}"
+
+
+class HistoryStore:
+    """Read-only view of a store directory; every column is a memory-mapped 1-D array."""
+
+    def __init__(self, path: str = DEFAULT_STORE) -> None:
+        self.path = path
+        self.manifest = _read_manifest(path)
+        self.players: list[str] = self.manifest["players"]
+        self.venues: list[str] = self.manifest["venues"]
+        self.teams: list[str] = self.manifest["teams"]
+        self.match_ids: list[str] = self.manifest["match_ids"]
+        self.deliveries = self._table("deliveries")
+        self.matches = self._table("matches")
+        self.innings = self._table("innings")
+
+    def _table(self, table: str) -> dict[str, np.ndarray]:
+        n = self.manifest["counts"][table]
+        cols = {}
+        for col, dtype in TABLES[table].items():
+            file = os.path.join(self.path, f"{table}.{col}.bin")
+            cols[col] = np.memmap(file, dtype=dtype, mode="r", shape=(n,)) if n else np.zeros(0, dtype=dtype)
+        return cols
+
+    def __len__(self) -> int:
+        return len(self.match_ids)
+
+    def innings_deliveries(self, row: int) -> dict[str, np.ndarray]:
+        lo, hi = int(self.innings["start"][row]), int(self.innings["stop"][row])
+        return {k: v[lo:hi] for k, v in self.deliveries.items()}
+
+    def stats(self) -> dict[str, Any]:
+        fmt = np.asarray(self.matches["format"])
+        return {
+            "path": self.path,
+            "matches": len(self),
+            "innings": self.manifest["counts"]["innings"],
+            "deliveries": self.manifest["counts"]["deliveries"],
+            "by_format": {f: int((fmt == code).sum()) for f, code in FORMAT_CODES.items()},
+            "by_gender": {g: int((np.asarray(self.matches["gender"]) == code).sum()) for g, code in GENDER_CODES.items()},
+            "by_team_type": {t: int((np.asarray(self.matches["team_type"]) == code).sum()) for t, code in TEAM_TYPE_CODES.items()},
+            "players": len(self.players),
+            "venues": len(self.venues),
+            "updated": self.manifest.get("updated"),
+        }
+
+
+def _empty_manifest() -> dict[str, Any]:
+    return {
+        "version": STORE_VERSION,
+        "counts": {t: 0 for t in TABLES},
+        "dtypes": {t: dict(cols) for t, cols in TABLES.items()},
+        "players": [],
+        "venues": [],
+        "teams": [],
+        "match_ids": [],
+        "files": [],
+        "updated": None,
+    }
+
+
+def _read_manifest(path: str) -> dict[str, Any]:
+    file = os.path.join(path, "manifest.json")
+    if not os.path.exists(file):
+        raise ValueError(f"No history store at {path}; run `python -m api.history ingest <dir>` first")
+    with open(file, encoding="utf-8") as fh:
+        manifest = json.load(fh)
+    if manifest.get("version") != STORE_VERSION:
+        raise ValueError(f"History store version {manifest.get('version')} is not supported; re-ingest into a fresh store")
+    return manifest
+
+
+def _write_manifest(path: str, manifest: dict[str, Any]) -> None:
+    tmp = os.path.join(path, "manifest.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh)
+    os.replace(tmp, os.path.join(path, "manifest.json"))
+
+
+@lru_cache(maxsize=4)
+def _open_store(path: str, stamp: int) -> HistoryStore:
+    return HistoryStore(path)
+
+
+def open_store(path: str | None = None) -> HistoryStore:
+    """Cached store handle; re-opened automatically after an append rewrites the manifest."""
+    path = path or DEFAULT_STORE
+    try:
+        stamp = os.stat(os.path.join(path, "manifest.json")).st_mtime_ns
+    except OSError:
+        raise ValueError(f"No history store at {path}; run `python -m api.history ingest <dir>` first")
+    return _open_store(path, stamp)
+
+
+def _match_files(source: str) -> list[str]:
+    found = []
+    for root, _, files in os.walk(source):
+        for name in files:
+            if name.endswith((".json", ".yaml", ".yml")) and name != "manifest.json":
+                found.append(os.path.join(root, name))
+    return sorted(found)
+
+
+def ingest(source: str, store: str | None = None, workers: int | None = None) -> dict[str, Any]:
+    """Parse match files under `source` that the store has not seen yet and append them column by column."""
+    store = store or DEFAULT_STORE
+    started = time.perf_counter()
+    os.makedirs(store, exist_ok=True)
+    try:
+        manifest = _read_manifest(store)
+    except ValueError:
+        manifest = _empty_manifest()
+
+    seen = set(manifest["files"])
+    paths = [p for p in _match_files(source) if os.path.relpath(p, source) not in seen]
+    workers = max(1, min(4, os.cpu_count() or 1)) if workers is None else max(1, int(workers))
+    if workers > 1 and len(paths) > 64:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(_safe_parse, paths, chunksize=32))
+    else:
+        parsed = [_safe_parse(p) for p in paths]
+
+    lookups = {k: {name: i for i, name in enumerate(manifest[k])} for k in ("players", "venues", "teams")}
+
+    def lookup(kind: str, name: str) -> int:
+        table = lookups[kind]
+        if name not in table:
+            table[name] = len(manifest[kind])
+            manifest[kind].append(name)
+        return table[name]
+
+    new: dict[str, dict[str, list[int]]] = {t: {c: [] for c in cols} for t, cols in TABLES.items()}
+    d, m, inn = new["deliveries"], new["matches"], new["innings"]
+    delivery_row = manifest["counts"]["deliveries"]
+    known_ids = set(manifest["match_ids"])
+    skipped, duplicates, errors = 0, 0, []
+    for path, match, error in parsed:
+        rel = os.path.relpath(path, source)
+        if error:
+            errors.append({"file": rel, "error": error})
+            continue
+        manifest["files"].append(rel)
+        if match is None:
+            skipped += 1
+            continue
+        # The same match can arrive twice (JSON and YAML downloads, overlapping archives).
+        if match["id"] in known_ids:
+            duplicates += 1
+            continue
+        known_ids.add(match["id"])
+        match_row = len(manifest["match_ids"])
+        manifest["match_ids"].append(match["id"])
+        team_ids = [lookup("teams", t) for t in match["teams"]]
+        m["format"].append(FORMAT_CODES[match["format"]])
+        m["date"].append(match["date"])
+        m["venue"].append(lookup("venues", match["venue"]))
+        m["team1"].append(team_ids[0])
+        m["team2"].append(team_ids[1])
+        m["start"].append(delivery_row)
+        m["gender"].append(GENDER_CODES.get(match["gender"], -1))
+        m["team_type"].append(TEAM_TYPE_CODES.get(match["team_type"], -1))
+        for number, block in enumerate(match["innings"], start=1):
+            batting = lookup("teams", block["team"])
+            bowling = team_ids[1] if batting == team_ids[0] else team_ids[0]
+            inn["match"].append(match_row)
+            inn["innings"].append(number)
+            inn["batting"].append(batting)
+            inn["bowling"].append(bowling)
+            inn["start"].append(delivery_row)
+            inn["target"].append(block["target"])
+            runs = wickets = balls = 0
+            for over, ball, total, extras, legal, wicket, batter, bowler in block["balls"]:
+                d["match"].append(match_row)
+                d["innings"].append(number)
+                d["over"].append(over)
+                d["ball"].append(ball)
+                d["runs"].append(total)
+                d["extras"].append(extras)
+                d["legal"].append(legal)
+                d["wicket"].append(wicket)
+                d["batter"].append(lookup("players", batter))
+                d["bowler"].append(lookup("players", bowler))
+                runs += total
+                wickets += wicket
+                balls += legal
+            delivery_row += len(block["balls"])
+            inn["stop"].append(delivery_row)
+            inn["runs"].append(runs)
+            inn["wickets"].append(min(10, wickets))
+            inn["balls"].append(balls)
+
+    for table, cols in TABLES.items():
+        count = manifest["counts"][table]
+        for col, dtype in cols.items():
+            file = os.path.join(store, f"{table}.{col}.bin")
+            with open(file, "ab") as fh:
+                # Drop any tail left by an interrupted append before writing past the recorded count.
+                fh.truncate(count * np.dtype(dtype).itemsize)
+                np.asarray(new[table][col], dtype=dtype).tofile(fh)
+        manifest["counts"][table] = count + len(new[table][next(iter(cols))])
+    manifest["updated"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    _write_manifest(store, manifest)
+
+    return {
+        "store": store,
+        "files_seen": len(paths),
+        "matches_added": len(m["format"]),
+        "deliveries_added": len(d["match"]),
+        "skipped_non_limited_overs": skipped,
+        "skipped_duplicates": duplicates,
+        "errors": errors[:20],
+        "error_count": len(errors),
+        "elapsed_sec": round(time.perf_counter() - started, 2),
+        "totals": dict(manifest["counts"]),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Cricsheet ball-by-ball files -> columnar history store")
+    parser.add_argument("--store", default=DEFAULT_STORE)
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest_cmd = sub.add_parser("ingest", help="append new match files from a directory")
+    ingest_cmd.add_argument("source")
+    ingest_cmd.add_argument("--workers", type=int, default=None)
+    sub.add_parser("info", help="print store counts and load time")
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        print(json.dumps(ingest(args.source, args.store, args.workers), indent=2))
+        return
+    started = time.perf_counter()
+    store = HistoryStore(args.store)
+    report = store.stats()
+    report["load_ms"] = round((time.perf_counter() - started) * 1000.0, 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
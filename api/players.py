@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, NamedTuple
+
+import numpy as np
+
+try:
+    from api.data import TEAM_DATA, on_squads_reloaded
+except ModuleNotFoundError:
+    from data import TEAM_DATA, on_squads_reloaded
+
+ROLES = ("Batter", "WK-Batter", "All-Rounder", "Bowler")
+ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+STAT_COLUMNS = ("bat_avg", "strike_rate", "bowl_avg", "economy", "rating")
+# Resolution tiers, best first; a lower rank wins when a raw name matches players on both sides.
+MATCH_METHODS = ("exact", "normalized", "initials", "fuzzy")
+_NAME_MARKERS = re.compile(r"\((?:[^)]*\b(?:c|capt|captain|wk|vc|sub)\b[^)]*)\)|[\u2020*]|\s+\b(?:captain|wk)$", re.IGNORECASE)
+
+
+class SquadColumns(NamedTuple):
+    """One team/format squad as read-only columns; row i is TEAM_DATA[team]["squads"][fmt][i].
+
+    index maps each name to its rows (a tuple, since a squad may list the same name twice).
+    """
+
+    team: str
+    fmt: str
+    names: tuple
+    index: MappingProxyType
+    bat_avg: np.ndarray
+    strike_rate: np.ndarray
+    bowl_avg: np.ndarray
+    economy: np.ndarray
+    rating: np.ndarray
+    role: np.ndarray
+    records: tuple
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def select(self, names: Any) -> np.ndarray:
+        """Squad-order indices of every row named in names; names not in the squad are skipped."""
+        return np.array(sorted(i for n in set(names or ()) for i in self.index.get(n, ())), dtype=np.intp)
+
+    def find(self, name: str) -> dict | None:
+        rows = self.index.get(name)
+        return self.records[rows[0]] if rows else None
+
+    def players(self, idx: Any) -> list[dict]:
+        return [self.records[i] for i in idx]
+
+
+def _columns(team: str, fmt: str, players: list[dict]) -> SquadColumns:
+    cols = {}
+    for key in STAT_COLUMNS:
+        col = np.array([float(p[key]) for p in players])
+        col.setflags(write=False)
+        cols[key] = col
+    role = np.array([ROLE_CODES.get(p["role"], -1) for p in players], dtype=np.int8)
+    role.setflags(write=False)
+    names = tuple(p["name"] for p in players)
+    index: dict[str, tuple] = {}
+    for i, name in enumerate(names):
+        index[name] = index.get(name, ()) + (i,)
+    return SquadColumns(
+        team=team,
+        fmt=fmt,
+        names=names,
+        index=MappingProxyType(index),
+        role=role,
+        records=tuple(players),
+        **cols,
+    )
+
+
+def name_key(name: str) -> str:
+    return re.sub(r"[^a-z]", "", name.lower())
+
+
+def _initials_key(name: str) -> tuple[str, str] | None:
+    """(initials, surname) for "Virat Kohli", "V Kohli", "V. Kohli" or "Kohli V"; tokens of one or two letters stay whole."""
+    tokens = re.findall(r"[a-z]+", name.lower())
+    if len(tokens) < 2:
+        return None
+    if len(tokens[-1]) <= 2 < len(tokens[0]):
+        tokens = tokens[1:] + tokens[:1]
+    return "".join(t if len(t) <= 2 else t[0] for t in tokens[:-1]), tokens[-1]
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        cur = [i]
+        for j, cb in enumerate(b, start=1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+class PlayerMatch(NamedTuple):
+    name: str
+    method: str
+
+    @property
+    def rank(self) -> int:
+        return MATCH_METHODS.index(self.method)
+
+
+class NameIndex:
+    """Lookup tables from scraped spellings to one team's squad names (both formats)."""
+
+    def __init__(self, names: list[str]) -> None:
+        self.exact = {n.lower(): n for n in names}
+        self.normalized = {name_key(n): n for n in names}
+        initials: dict[str, set[str]] = {}
+        for n in names:
+            key = _initials_key(n)
+            if key is None:
+                continue
+            for k in {f"{key[0]} {key[1]}", f"{key[0][:1]} {key[1]}", key[1]}:
+                initials.setdefault(k, set()).add(n)
+        # A key shared by two players (two Yadavs, two Ms) is ambiguous and left out.
+        self.initials = {k: next(iter(v)) for k, v in initials.items() if len(v) == 1}
+        # (first initial, surname, name) for the fuzzy tier, which only forgives surname typos.
+        self.surnames = tuple((key[0][:1], key[1], n) for n, key in ((n, _initials_key(n)) for n in dict.fromkeys(names)) if key is not None)
+
+    def resolve(self, raw: str) -> PlayerMatch | None:
+        name = re.sub(r"\s+", " ", raw).strip()
+        found = self.exact.get(name.lower()) or self.normalized.get(name_key(name))
+        if found:
+            return PlayerMatch(found, "exact" if name.lower() in self.exact else "normalized")
+        name = _NAME_MARKERS.sub("", name).strip(" ,.-")
+        key = name_key(name)
+        if not key:
+            return None
+        found = self.exact.get(name.lower()) or self.normalized.get(key)
+        if found:
+            return PlayerMatch(found, "normalized")
+        parts = _initials_key(name)
+        if parts is not None:
+            found = self.initials.get(f"{parts[0]} {parts[1]}") or self.initials.get(f"{parts[0][:1]} {parts[1]}")
+        elif len(key) > 3:
+            found = self.initials.get(key)
+        if found:
+            return PlayerMatch(found, "initials")
+        # A different first name is a different player ("Mohit Sharma" is not Rohit Sharma), so the
+        # first initial must match exactly and only the surname may be misspelt.
+        if parts is None or len(parts[1]) <= 4:
+            return None
+        limit = 1 if len(parts[1]) <= 8 else 2
+        scored = sorted((_edit_distance(parts[1], surname, limit), n) for initial, surname, n in self.surnames if initial == parts[0][:1])
+        if scored and scored[0][0] <= limit and (len(scored) == 1 or scored[1][0] > scored[0][0]):
+            return PlayerMatch(scored[0][1], "fuzzy")
+        return None
+
+
+@lru_cache(maxsize=8192)
+def resolve_player(team: str, raw: str) -> PlayerMatch | None:
+    """Map a scraped player name to the team's squad name, or None when nothing matches unambiguously."""
+    index = PLAYER_STORE.names.get(team)
+    return index.resolve(str(raw)) if index is not None else None
+
+
+def player_name_cache_stats() -> dict[str, int]:
+    info = resolve_player.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize or 0}
+
+
+class PlayerStore:
+    """Array-backed view of TEAM_DATA squads, rebuilt whenever squads reload."""
+
+    def __init__(self) -> None:
+        self.squads: dict[tuple[str, str], SquadColumns] = {}
+        self.roles: dict[str, MappingProxyType] = {}
+        self.names: dict[str, NameIndex] = {}
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        squads = {}
+        roles = {}
+        names = {}
+        for team, info in TEAM_DATA.items():
+            team_roles: dict[str, str] = {}
+            for fmt, players in info["squads"].items():
+                squads[(team, fmt)] = _columns(team, fmt, players)
+                for p in players:
+                    team_roles.setdefault(p["name"], str(p.get("role", "Player")))
+            roles[team] = MappingProxyType(team_roles)
+            names[team] = NameIndex([p["name"] for fmt in ("t20", "odi") for p in info["squads"].get(fmt, [])])
+        self.squads, self.roles, self.names = squads, roles, names
+        resolve_player.cache_clear()
+
+    def squad(self, team: str, fmt: str) -> SquadColumns:
+        cols = self.squads.get((team, fmt))
+        if cols is None:
+            raise ValueError("Unknown team")
+        return cols
+
+    def role(self, team: str, name: str) -> str:
+        """Role of a player in either format's squad, "Player" when unknown."""
+        return self.roles.get(team, MappingProxyType({})).get(name, "Player")
+
+
+PLAYER_STORE = PlayerStore()
+on_squads_reloaded(PLAYER_STORE.rebuild)
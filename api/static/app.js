@@ -835,13 +835,13 @@ async function handleTeamSelection() {
 
   const [t1, t2] = state.selectedTeams;
   const [s1, s2] = await Promise.all([
-    api(`/api/squad?team=${encodeURIComponent(t1)}&format=${state.format}`),
-    api(`/api/squad?team=${encodeURIComponent(t2)}&format=${state.format}`),
+    api(`/api/squad?team=${encodeURIComponent(t1)}&format=${state.format}&optimize=1`),
+    api(`/api/squad?team=${encodeURIComponent(t2)}&format=${state.format}&optimize=1`),
   ]);
   state.squads.team1 = s1;
   state.squads.team2 = s2;
-  state.selectedXI.team1 = new Set(autoPickXI(s1.players, state.format));
-  state.selectedXI.team2 = new Set(autoPickXI(s2.players, state.format));
+  state.selectedXI.team1 = new Set(s1.suggested_xi || autoPickXI(s1.players, state.format));
+  state.selectedXI.team2 = new Set(s2.suggested_xi || autoPickXI(s2.players, state.format));
 
   renderXIPanels();
   populateContextSelectors();
@@ -0,0 +1,31 @@
+"""predict_score, run_trajectory and backtest_report against outputs recorded on the baseline tree (commit 5b64fe9)."""
+
+import json
+import os
+
+import pytest
+
+from api.engine import backtest_report, predict_score, run_trajectory
+
+with open(os.path.join(os.path.dirname(__file__), "fixtures", "baseline_outputs.json"), encoding="utf-8") as fh:
+    BASELINE = json.load(fh)
+
+
+def _plain(value):
+    # Frozen XI data serializes as plain dicts and lists, as it does over HTTP.
+    return json.loads(json.dumps(value, default=dict))
+
+
+@pytest.mark.parametrize("case", BASELINE["predict_score"], ids=lambda c: f"{c['payload']['format']}-{c['payload']['overs']}")
+def test_predict_score_matches_baseline(case):
+    assert _plain(predict_score(case["payload"])) == case["expected"]
+
+
+@pytest.mark.parametrize("case", BASELINE["run_trajectory"], ids=lambda c: f"{c['payload']['format']}-{c['payload']['overs']}")
+def test_run_trajectory_matches_baseline(case):
+    assert _plain(run_trajectory(case["payload"])) == case["expected"]
+
+
+@pytest.mark.parametrize("case", BASELINE["backtest_report"], ids=lambda c: c["payload"]["format"])
+def test_backtest_report_matches_baseline(case):
+    assert _plain(backtest_report(case["payload"])) == case["expected"]
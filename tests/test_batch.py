@@ -0,0 +1,118 @@
+"""Batch and vectorized routes give exactly what the scalar calls they replace give."""
+
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from api.data import FORMAT_RULES, PITCH_TYPES, TEAM_DATA, VENUES, WEATHER_TYPES
+from api.engine import (
+    get_team_players,
+    optimize_xi,
+    predict_grid,
+    predict_score,
+    predict_score_batch,
+    run_trajectory,
+    run_trajectory_batch,
+    team_breakdown,
+    xi_validator,
+)
+
+TEAMS = list(TEAM_DATA)
+
+
+def _live_states(count, seed, shared_setups=None):
+    rng = np.random.default_rng(seed)
+    venues = [None] + [v["name"] for v in VENUES]
+    setups = []
+    for _ in range(shared_setups or count):
+        batting, bowling = rng.choice(len(TEAMS), size=2, replace=False)
+        setups.append(
+            {
+                "batting_team": TEAMS[batting],
+                "bowling_team": TEAMS[bowling],
+                "venue": venues[int(rng.integers(len(venues)))],
+                "pitch": PITCH_TYPES[int(rng.integers(len(PITCH_TYPES)))]["type"],
+                "weather": WEATHER_TYPES[int(rng.integers(len(WEATHER_TYPES)))]["label"],
+                "toss_winner": TEAMS[batting] if rng.random() < 0.5 else None,
+                "toss_decision": "bat",
+            }
+        )
+    states = []
+    for i in range(count):
+        fmt = "t20" if i % 2 else "odi"
+        balls = int(rng.integers(1, FORMAT_RULES[fmt]["max_overs"] * 6 + 1))
+        states.append(
+            {
+                **setups[i % len(setups)],
+                "format": fmt,
+                "score": int(balls * rng.uniform(0.6, 1.6)),
+                "wickets": int(rng.integers(0, 11)),
+                "overs": float(f"{balls // 6}.{balls % 6}"),
+            }
+        )
+    return states
+
+
+def _scalar_or_error(fn, state):
+    try:
+        return fn(state)
+    except ValueError as exc:
+        return {"error": str(exc)}
+
+
+@pytest.mark.parametrize("shared_setups", [4, None], ids=["shared-setups", "all-distinct"])
+def test_predict_score_batch_matches_scalar(shared_setups):
+    states = _live_states(300, seed=11, shared_setups=shared_setups)
+    states += [{"format": "t20", "score": -1, "wickets": 0, "overs": 3}, {"format": "odi", "score": 10, "wickets": 0, "overs": 0}, "not a state"]
+    results = predict_score_batch({"states": states})["results"]
+    assert results[-1] == {"error": "Each state must be an object"}
+    assert results[:-1] == [_scalar_or_error(predict_score, s) for s in states[:-1]]
+
+
+def test_predict_score_batch_shared_context():
+    context = {"batting_team": "India", "bowling_team": "Australia", "venue": "Eden Gardens"}
+    states = [{"format": "t20", "score": 40 + i, "wickets": i % 10, "overs": 5 + i / 10} for i in range(6)]
+    results = predict_score_batch({"states": states, "context": context})["results"]
+    assert results == [predict_score({**context, **s}) for s in states]
+
+
+def test_run_trajectory_batch_matches_scalar():
+    rng = np.random.default_rng(5)
+    states = []
+    for i in range(400):
+        fmt = "t20" if i % 2 else "odi"
+        balls = int(rng.integers(1, FORMAT_RULES[fmt]["max_overs"] * 6))
+        state = {"format": fmt, "score": int(rng.integers(0, balls * 2)), "wickets": int(rng.integers(0, 10)), "overs": float(f"{balls // 6}.{balls % 6}")}
+        if i % 3 == 0:
+            state["target"] = int(rng.integers(100, 360))
+        states.append(state)
+    states.append({"format": "t20", "score": 10, "wickets": 11, "overs": 2})
+    results = run_trajectory_batch({"states": states})["results"]
+    assert results == [_scalar_or_error(run_trajectory, s) for s in states]
+
+
+def test_predict_grid_matches_scalar():
+    context = {"format": "odi", "batting_team": "England", "bowling_team": "India", "venue": "Lord's", "weather": "Cloudy"}
+    grid = predict_grid({**context, "score_axis": [20, 95, 180, 260], "wickets_axis": [0, 3, 7, 9, 10], "overs_axis": [0.1, 12.4, 33, 49.5, 50]})
+    axes = grid["axes"]
+    for i, score in enumerate(axes["score"]):
+        for j, wickets in enumerate(axes["wickets"]):
+            for k, overs in enumerate(axes["overs"]):
+                expected = predict_score({**context, "score": score, "wickets": wickets, "overs": overs})
+                assert (grid["low"][i][j][k], grid["avg"][i][j][k], grid["high"][i][j][k]) == (expected["low"], expected["avg"], expected["high"])
+
+
+@pytest.mark.parametrize("team,fmt", [("India", "t20"), ("Afghanistan", "odi")])
+def test_optimize_xi_matches_exhaustive_scalar_search(team, fmt):
+    squad = get_team_players(team, fmt)
+    best = (99, 0.0)
+    for combo in combinations(range(len(squad)), 11):
+        xi = [squad[i] for i in combo]
+        if len({p["name"] for p in xi}) < 11:
+            continue
+        breakdown = team_breakdown(xi, fmt)
+        unmet = len(xi_validator(xi, fmt)["warnings"]) + (breakdown["roles"]["WK-Batter"] < 1)
+        best = min(best, (unmet, -breakdown["overall"]))
+    top = optimize_xi({"team": team, "format": fmt, "top_k": 1})["xis"][0]
+    assert (len(top["unmet"]), -top["breakdown"]["overall"]) == best
@@ -0,0 +1,39 @@
+"""Squad-derived caches are dropped on reload_squads() and rebuilt from the new squads."""
+
+from copy import deepcopy
+
+from api.data import ODI_SQUADS, reload_squads
+from api.engine import compare_matrix, compare_matrix_cache_stats, optimize_xi, predict_score, xi_profile, xi_profile_cache_stats
+from api.players import PLAYER_STORE, player_name_cache_stats, resolve_player
+
+
+def test_reload_clears_caches():
+    xi_profile("India", "odi", None)
+    compare_matrix({"format": "t20", "teams": ["India", "Australia", "England"]})
+    optimize_xi({"team": "India", "format": "t20", "top_k": 1})
+    resolve_player("India", "V Kohli")
+    assert xi_profile_cache_stats()["size"] and compare_matrix_cache_stats()["size"] and player_name_cache_stats()["size"]
+
+    reload_squads()
+    assert xi_profile_cache_stats()["size"] == 0
+    assert compare_matrix_cache_stats()["size"] == 0
+    assert player_name_cache_stats()["size"] == 0
+
+
+def test_reload_serves_new_squad_data():
+    original = deepcopy(ODI_SQUADS["India"])
+    state = {"format": "odi", "batting_team": "India", "bowling_team": "Australia", "score": 120, "wickets": 2, "overs": 25}
+    before = (xi_profile("India", "odi", None).breakdown["overall"], predict_score(state)["avg"])
+    boosted = deepcopy(original)
+    for player in boosted:
+        player["strike_rate"] = player.get("strike_rate", 90.0) * 1.3
+        player["bat_avg"] = player.get("bat_avg", 30.0) * 1.3
+    try:
+        reload_squads({"India": boosted})
+        profile = xi_profile("India", "odi", None)
+        assert profile.players[0]["strike_rate"] == boosted[0]["strike_rate"]
+        assert PLAYER_STORE.squad("India", "odi").players([0])[0]["strike_rate"] == boosted[0]["strike_rate"]
+        assert (profile.breakdown["overall"], predict_score(state)["avg"]) != before
+    finally:
+        reload_squads({"India": original})
+    assert (xi_profile("India", "odi", None).breakdown["overall"], predict_score(state)["avg"]) == before
@@ -0,0 +1,69 @@
+"""Live match sessions: incremental updates agree with from-scratch calls, and bad updates change nothing."""
+
+import pytest
+
+from api.engine import close_session, create_session, predict_score, session_snapshot, session_update, win_probability
+
+SETUP = {"format": "t20", "batting_team": "India", "bowling_team": "Australia", "venue": "Eden Gardens", "weather": "Heavy dew"}
+
+
+@pytest.fixture
+def session():
+    created = create_session({**SETUP, "score": 62, "wickets": 1, "overs": 7.2})
+    yield created["session_id"]
+    close_session(created["session_id"])
+
+
+def test_updates_match_predict_score(session):
+    snap = session_update(session, {"balls": [{"runs": 4}, {"runs": 0, "wicket": True}, {"runs": 1, "extra_type": "wide"}, {"runs": 6}]})
+    assert snap["state"] == {
+        "score": 74,
+        "wickets": 2,
+        "overs": 7.5,
+        "balls_bowled": 47,
+        "balls_left": 73,
+        "extras": 1,
+        "target": None,
+        "innings_closed": False,
+    }
+    assert snap["projection"] == predict_score({**SETUP, "score": 74, "wickets": 2, "overs": 7.5})
+    assert session_snapshot(session)["version"] == 1
+
+
+def test_chase_win_matches_win_probability():
+    created = create_session({**SETUP, "score": 120, "wickets": 4, "overs": 15.0, "target": 171, "model": "heuristic"})
+    try:
+        snap = session_update(created["session_id"], {"runs": 2})
+        state = {**SETUP, "score": 122, "wickets": 4, "overs": 15.1, "target": 171, "chasing_team": "India", "model": "heuristic"}
+        assert snap["win"] == win_probability(state)
+    finally:
+        close_session(created["session_id"])
+
+
+@pytest.mark.parametrize(
+    "balls",
+    [
+        [{"runs": 1}, {"runs": 9}],
+        [{"runs": 1}, {"runs": 0, "extra_type": "beamer"}],
+        [{"runs": 2}, "four"],
+    ],
+    ids=["runs-out-of-range", "unknown-extra", "not-an-object"],
+)
+def test_failed_multi_ball_update_rolls_back(session, balls):
+    before = session_snapshot(session, ["trajectory"])
+    with pytest.raises(ValueError):
+        session_update(session, {"balls": balls})
+    assert session_snapshot(session, ["trajectory"]) == before
+
+
+def test_closed_innings_rejects_more_balls():
+    created = create_session({**SETUP, "score": 150, "wickets": 9, "overs": 18.0})
+    session_id = created["session_id"]
+    try:
+        snap = session_update(session_id, {"runs": 0, "wicket": True})
+        assert snap["state"]["innings_closed"]
+        with pytest.raises(ValueError):
+            session_update(session_id, {"runs": 1})
+        assert session_snapshot(session_id)["version"] == snap["version"]
+    finally:
+        close_session(session_id)
@@ -0,0 +1,30 @@
+"""Simulated innings stay calibrated to predict_score and are reproducible for a seed."""
+
+import pytest
+
+from api.benchmarks import CALIBRATION_TOLERANCE_PCT, CALIBRATION_TOLERANCE_RUNS
+from api.engine import predict_score, simulate_score
+
+STATES = [
+    {"format": "t20", "batting_team": "India", "bowling_team": "Australia", "venue": "Eden Gardens", "score": 80, "wickets": 2, "overs": 10},
+    {"format": "t20", "batting_team": "Pakistan", "bowling_team": "England", "venue": None, "score": 144, "wickets": 8, "overs": 16.3},
+    {"format": "t20", "batting_team": "Afghanistan", "bowling_team": "India", "venue": "Wankhede Stadium", "weather": "Heavy dew", "score": 31, "wickets": 0, "overs": 3.4},
+    {"format": "odi", "batting_team": "England", "bowling_team": "South Africa", "venue": "Lord's", "pitch": "Green seam-friendly", "score": 53, "wickets": 3, "overs": 9.3},
+    {"format": "odi", "batting_team": "New Zealand", "bowling_team": "Sri Lanka", "venue": None, "score": 186, "wickets": 9, "overs": 40.5},
+    {"format": "odi", "batting_team": "Australia", "bowling_team": "India", "venue": "Eden Gardens", "score": 240, "wickets": 4, "overs": 42},
+]
+
+
+@pytest.mark.parametrize("state", STATES, ids=lambda s: f"{s['format']}-{s['score']}/{s['wickets']}")
+def test_simulated_mean_within_tolerance_of_predict_score(state):
+    avg = predict_score(state)["avg"]
+    mean = simulate_score({**state, "simulations": 4000, "seed": 3})["mean"]
+    assert abs(mean - avg) <= max(CALIBRATION_TOLERANCE_RUNS, avg * CALIBRATION_TOLERANCE_PCT / 100.0)
+
+
+def test_simulation_is_reproducible_for_a_seed():
+    payload = {**STATES[0], "simulations": 2000, "seed": 11}
+    first, second = simulate_score(payload), simulate_score(payload)
+    for timing in ("elapsed_ms", "sims_per_sec"):
+        first.pop(timing), second.pop(timing)
+    assert first == second